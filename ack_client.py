@@ -0,0 +1,310 @@
+import http.client
+import json
+import queue
+import socket
+import ssl
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Callable, Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CONNECT_TIMEOUT = 1.0   # seconds to open a connection
+READ_TIMEOUT = 2.0      # seconds to wait for the server's answer
+RETRIES = 2             # retries for failed connections, and for 502/503/504 answers to GET requests
+BACKOFF_FACTOR = 0.2    # retry after 0.2 s, 0.4 s, ...
+STREAM_ENDPOINT = "/auto_acknowledge/ingest"
+DISPATCH_QUEUE_SIZE = 8  # acknowledgments waiting for the sender thread
+STALE_SECONDS = 5.0      # older acknowledgments are dropped instead of sent
+
+
+class AcknowledgeClient:
+    def __init__(self, url: str, ack_type: str, station: str = "default",
+                 connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 retries: int = RETRIES, backoff_factor: float = BACKOFF_FACTOR) -> None:
+        """Send acknowledgments over a pooled keep-alive connection.
+
+        The connection stays open between acknowledgments, so a warm acknowledgment is
+        a single round trip. Acknowledgments are only retried when the connection
+        failed, never after a read timeout or a gateway error, because the server may
+        already have accepted the swipe and would turn the page twice.
+        """
+        self.url = url
+        self.ack_type = ack_type
+        self.station = station
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(total=retries, connect=retries, read=0, status=retries,
+                      status_forcelist=(502, 503, 504), allowed_methods=frozenset({"GET"}),
+                      backoff_factor=backoff_factor, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def build_payload(self, direction: str, **extra: Any) -> Dict[str, Any]:
+        """Return the request body for an acknowledgment."""
+        if extra.get("trace"):
+            extra["trace"]["hops"]["sent"] = time.time()
+        return dict({"type": self.ack_type, "direction": direction, "station": self.station}, **extra)
+
+    def send(self, direction: str, **extra: Any) -> bool:
+        """Send an acknowledgment and return whether the server accepted it."""
+        payload = self.build_payload(direction, **extra)
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        except requests.exceptions.ConnectionError as e:
+            print(f"❌ Connection error: {e}")
+            return False
+        except requests.exceptions.Timeout as e:
+            print(f"❌ Request timed out: {e}")
+            return False
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Failed to send HTTP request: {e}")
+            return False
+
+        if response.status_code == 200:
+            print(f"✅ Sent {direction} {self.ack_type} acknowledgment to server")
+            return True
+        print(f"❌ Server returned error code: {response.status_code}")
+        return False
+
+    def warm_up(self) -> bool:
+        """Open the connection ahead of the first acknowledgment."""
+        try:
+            self.session.get(self.url, params={"cursor": 0, "station": self.station}, timeout=self.timeout)
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Could not reach server at {self.url}: {e}")
+            return False
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.session.close()
+
+
+class StreamConfirmation:
+    """Waits for the server to confirm one streamed acknowledgment."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.answer: Optional[Dict[str, Any]] = None  # None if the stream ended first
+
+
+class StreamingAcknowledgeClient(AcknowledgeClient):
+    def __init__(self, url: str, ack_type: str, station: str = "default", **kwargs: Any) -> None:
+        """Send acknowledgments as JSON lines over one long-running streamed request.
+
+        Once the stream is open an acknowledgment costs a single write, with no
+        request framing. The server answers every line on the same connection, and
+        ``send`` only reports an acknowledgment as delivered once that answer arrived.
+        Nothing is queued while the stream is down: acknowledgments are then sent as
+        regular requests, and a background thread reconnects.
+        """
+        super().__init__(url, ack_type, station, **kwargs)
+        self.stream_url = urlsplit(url.split("/auto_acknowledge")[0] + STREAM_ENDPOINT)
+        self.lock = threading.Lock()  # one writer at a time, and no write while the socket is replaced
+        self.sock: Optional[socket.socket] = None
+        self.waiting: Dict[str, StreamConfirmation] = {}
+        self.connected = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="ack-stream", daemon=True)
+        self.thread.start()
+
+    def send(self, direction: str, **extra: Any) -> bool:
+        if not self.connected.is_set():
+            return super().send(direction, **extra)
+        ack_id = uuid.uuid4().hex
+        confirmation = self.waiting[ack_id] = StreamConfirmation()
+        line = (json.dumps(dict(self.build_payload(direction, **extra), id=ack_id)) + "\n").encode("utf-8")
+        try:
+            self._write(b"%x\r\n%s\r\n" % (len(line), line))
+        except OSError as e:
+            # The line did not go out, so sending it again cannot turn the page twice
+            self.waiting.pop(ack_id, None)
+            print(f"⚠️ Acknowledgment stream interrupted: {e}, sending a regular request")
+            self._disconnect()
+            return super().send(direction, **extra)
+
+        confirmed = confirmation.done.wait(self.timeout[1])
+        self.waiting.pop(ack_id, None)
+        if not confirmed or confirmation.answer is None:
+            # Like a read timeout: the server may have it, so it is not sent again
+            print(f"❌ Streamed {direction} acknowledgment was not confirmed by the server")
+            return False
+        print(f"✅ Streamed {direction} {self.ack_type} acknowledgment to server")
+        return True
+
+    def close(self) -> None:
+        self.stopped.set()
+        try:
+            self._write(b"0\r\n\r\n")  # end of the request body
+        except OSError:
+            pass
+        self._disconnect()
+        super().close()
+
+    def _write(self, data: bytes) -> None:
+        with self.lock:
+            if self.sock is None:
+                raise OSError("stream is closed")
+            self.sock.sendall(data)
+
+    def _connect(self) -> socket.socket:
+        host, port = self.stream_url.hostname, self.stream_url.port
+        secure = self.stream_url.scheme == "https"
+        sock = socket.create_connection((host, port or (443 if secure else 80)), timeout=self.timeout[0])
+        # Every line is a small write that is waited for, do not hold it back for more data
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        sock.sendall((f"POST {self.stream_url.path} HTTP/1.1\r\nHost: {self.stream_url.netloc}\r\n"
+                      "Content-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n").encode("ascii"))
+        # No timeout from here on, the request lasts as long as the client
+        sock.settimeout(None)
+        return sock
+
+    def _disconnect(self) -> None:
+        """Close the stream and fail every acknowledgment still waiting for its answer."""
+        self.connected.clear()
+        with self.lock:
+            sock, self.sock = self.sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        for confirmation in list(self.waiting.values()):
+            confirmation.done.set()
+
+    def _run(self) -> None:
+        delay = BACKOFF_FACTOR
+        while not self.stopped.is_set():
+            try:
+                sock = self._connect()
+                with self.lock:
+                    self.sock = sock
+                self.connected.set()
+                # The server answers each line as soon as it handled it
+                response = http.client.HTTPResponse(sock, method="POST")
+                response.begin()
+                if response.status != 200:
+                    raise http.client.HTTPException(f"server returned {response.status}")
+                delay = BACKOFF_FACTOR
+                for answer in response:
+                    answer = json.loads(answer)
+                    confirmation = self.waiting.get(answer.get("id"))
+                    if confirmation is not None:
+                        confirmation.answer = answer
+                        confirmation.done.set()
+            except (OSError, ValueError, http.client.HTTPException) as e:
+                if not self.stopped.is_set():
+                    print(f"⚠️ Acknowledgment stream interrupted: {e}")
+            self._disconnect()
+            self.stopped.wait(delay)
+            delay = min(delay * 2, 5.0)
+
+
+class DeliveryResult(NamedTuple):
+    """Outcome of an acknowledgment handed to an AcknowledgeDispatcher."""
+    direction: str
+    delivered: bool
+    queued_seconds: float  # from submit until the sender thread picked it up
+    send_seconds: float    # the request itself
+
+
+class AcknowledgeDispatcher:
+    def __init__(self, client: AcknowledgeClient, max_pending: int = DISPATCH_QUEUE_SIZE,
+                 stale_seconds: float = STALE_SECONDS) -> None:
+        """Send acknowledgments from a background thread, so the caller never waits for the server.
+
+        At most ``max_pending`` acknowledgments wait to be sent; further ones are
+        refused. An acknowledgment that waited longer than ``stale_seconds``, for
+        example while the server was unreachable, is dropped, because moving the
+        page that late would surprise the operator.
+        """
+        self.client = client
+        self.stale_seconds = stale_seconds
+        self.pending: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, name="ack-dispatch", daemon=True)
+        self.thread.start()
+
+    def submit(self, direction: str, on_result: Optional[Callable[[DeliveryResult], None]] = None,
+               **extra: Any) -> bool:
+        """Queue an acknowledgment and return at once.
+
+        ``on_result`` is called on the sender thread with the DeliveryResult. Returns
+        False if the queue is full; ``on_result`` is then called right away.
+        """
+        try:
+            self.pending.put_nowait((direction, extra, on_result, time.perf_counter()))
+            return True
+        except queue.Full:
+            print(f"⚠️ {self.pending.maxsize} acknowledgments still waiting, dropping {direction}")
+            self._report(on_result, DeliveryResult(direction, False, 0.0, 0.0))
+            return False
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Stop the sender thread after it has sent what is queued, waiting at most ``timeout`` seconds."""
+        try:
+            self.pending.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout=timeout)
+
+    @staticmethod
+    def _report(on_result: Optional[Callable[[DeliveryResult], None]], result: DeliveryResult) -> None:
+        if on_result is None:
+            return
+        try:
+            on_result(result)
+        except Exception as e:
+            print(f"⚠️ Acknowledgment result callback failed: {e}")
+
+    def _run(self) -> None:
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            direction, extra, on_result, submitted = item
+            queued_seconds = time.perf_counter() - submitted
+            if queued_seconds > self.stale_seconds:
+                print(f"⚠️ Dropping {direction} acknowledgment, it waited {queued_seconds:.1f} s")
+                self._report(on_result, DeliveryResult(direction, False, queued_seconds, 0.0))
+                continue
+            start = time.perf_counter()
+            delivered = self.client.send(direction, **extra)
+            self._report(on_result, DeliveryResult(direction, delivered, queued_seconds, time.perf_counter() - start))
+
+
+def start_trace(**hops: float) -> Dict[str, Any]:
+    """Start tracing an acknowledgment at the moment it is detected.
+
+    ``hops`` are earlier timestamps of the detection (``time.time()``), for example
+    when the camera frame was captured. The server adds its own hops up to the
+    rendered page and lists them on ``/traces``.
+    """
+    return {"id": uuid.uuid4().hex, "hops": dict(hops, detected=time.time())}
+
+
+@lru_cache(maxsize=None)
+def get_acknowledge_client(url: str, ack_type: str, station: str = "default",
+                           streaming: bool = False) -> AcknowledgeClient:
+    """Return the shared client for an endpoint, so all acknowledgments reuse one connection."""
+    if streaming:
+        return StreamingAcknowledgeClient(url, ack_type, station)
+    return AcknowledgeClient(url, ack_type, station)
+
+
+@lru_cache(maxsize=None)
+def get_acknowledge_dispatcher(url: str, ack_type: str, station: str = "default",
+                               streaming: bool = False) -> AcknowledgeDispatcher:
+    """Return the shared background sender for an endpoint, built on the shared client."""
+    return AcknowledgeDispatcher(get_acknowledge_client(url, ack_type, station, streaming))
@@ -1,16 +1,53 @@
+import os
 from flask import Flask, render_template
+from werkzeug.serving import WSGIRequestHandler
 from blueprint.blueprint_router import create_blueprint as create_blueprint_blueprint
 from pick_by_light.pick_by_light_router import create_blueprint as create_pick_by_light_blueprint
+from blueprint.station import StationRegistry
+from blueprint.state_store import MemoryStateStore, SqliteStateStore
 from pick_by_light.pick_by_light_controller import PickByLightController
+from pick_by_light.inventory_store import InventoryStore
+from pick_by_light.controller_service import ControllerClient, controller_authkey, parse_address, parse_station_controllers
+from metrics.metrics_router import create_blueprint as create_metrics_blueprint
+from metrics.registry import ENABLED as METRICS_ENABLED
 
-pick_by_light_controller = PickByLightController()
-blueprint_blueprint = create_blueprint_blueprint(pick_by_light_controller)
+INVENTORY_PATH = os.environ.get('ASSYS_INVENTORY_PATH', 'inventory')
+HIGHLIGHT_EFFECT = os.environ.get('ASSYS_HIGHLIGHT_EFFECT', 'static')  # static, pulse, blink or chase
+SIMULATE_LEDS = os.environ.get('ASSYS_SIMULATE_LEDS', '0').lower() in ('1', 'true', 'yes')  # No LED strip attached
+STATE_DB = os.environ.get('ASSYS_STATE_DB')  # Share station state between worker processes
+CONTROLLER_ADDRESS = os.environ.get('ASSYS_CONTROLLER_ADDRESS')  # Use the LED strip of the controller service
+STATION_CONTROLLERS = parse_station_controllers(os.environ.get('ASSYS_STATION_CONTROLLERS', ''))  # Own strips of some stations
+
+if STATE_DB and not CONTROLLER_ADDRESS:
+    # A shared state database means several workers; each would drive the LED strip itself
+    raise RuntimeError('ASSYS_STATE_DB requires ASSYS_CONTROLLER_ADDRESS: start pick_by_light.controller_service '
+                       'and point the workers at it, so only one process owns the LED strip')
+
+if CONTROLLER_ADDRESS:
+    controller_address = parse_address(CONTROLLER_ADDRESS)
+    pick_by_light_controller = ControllerClient(controller_address, controller_authkey(controller_address))
+else:
+    pick_by_light_controller = PickByLightController(store=InventoryStore(INVENTORY_PATH),
+                                                     highlight_effect=HIGHLIGHT_EFFECT,
+                                                     simulate=SIMULATE_LEDS)
+state_store = SqliteStateStore(STATE_DB) if STATE_DB else MemoryStateStore()
+stations = StationRegistry(pick_by_light_controller, state_store)
+for station_id, address in STATION_CONTROLLERS.items():
+    stations.bind_controller(station_id, ControllerClient(address, controller_authkey(address)))
+blueprint_blueprint = create_blueprint_blueprint(pick_by_light_controller, stations)
 pick_by_light_blueprint = create_pick_by_light_blueprint(pick_by_light_controller)
 
 app = Flask(__name__)
 app.secret_key = 'demo_secret_key_12345'  # Für Demo-Zwecke
 app.register_blueprint(blueprint_blueprint)
 app.register_blueprint(pick_by_light_blueprint)
+if METRICS_ENABLED:
+    app.register_blueprint(create_metrics_blueprint())
+
+class StreamingRequestHandler(WSGIRequestHandler):
+    # The development server writes every streamed chunk in pieces; without this each
+    # push event and ingest answer waits for the client's delayed ACK (about 40 ms)
+    disable_nagle_algorithm = True
 
 @app.route('/', methods=['GET'])
 
@@ -18,4 +55,4 @@ def index():
     return render_template('index.html')
 
 if __name__ == "__main__":
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=True, host='0.0.0.0', port=5000, request_handler=StreamingRequestHandler)
@@ -0,0 +1,279 @@
+import math
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from typing import Deque, List, NamedTuple, Optional
+
+import speech_recognition as sr
+
+RING_SECONDS = 30.0      # audio kept for the segmenter, it only falls this far behind if something is badly wrong
+REOPEN_DELAY = 1.0       # wait before reopening the microphone after a read error
+CLOSE_TIMEOUT = 2.0      # longer than one read and one reopen delay
+MAX_UTTERANCE_AGE = 5.0  # older utterances are skipped, a command is pointless once the worker moved on
+MAX_PENDING = 8          # utterances waiting for recognition, the oldest is dropped beyond that
+
+
+class AudioChunk(NamedTuple):
+    """One buffer of raw audio as read from the microphone."""
+    index: int
+    data: bytes
+    captured_at: float  # wall-clock time at the end of the buffer
+
+
+class AudioRingBuffer:
+    def __init__(self, capacity: int) -> None:
+        """The last ``capacity`` chunks, numbered continuously so a reader can follow at its own pace."""
+        self.chunks: Deque[AudioChunk] = deque(maxlen=capacity)
+        self.condition = threading.Condition()
+        self.next_index = 0
+        self.lost = 0  # chunks overwritten before they were read
+        self.closed = False
+
+    def append(self, data: bytes, captured_at: float) -> None:
+        with self.condition:
+            self.chunks.append(AudioChunk(self.next_index, data, captured_at))
+            self.next_index += 1
+            self.condition.notify_all()
+
+    def read(self, index: int, timeout: Optional[float] = None) -> Optional[AudioChunk]:
+        """Wait for chunk ``index``; if it was already overwritten, return the oldest one still there.
+
+        Returns ``None`` on timeout or once the buffer is closed.
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: index < self.next_index or self.closed, timeout) or self.closed:
+                return None
+            oldest = self.chunks[0].index
+            if index < oldest:
+                self.lost += oldest - index
+                index = oldest
+            return self.chunks[index - oldest]
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class MicrophoneCapture:
+    def __init__(self, microphone: sr.Microphone, ring_seconds: float = RING_SECONDS) -> None:
+        """Keep one input stream open and copy everything it records into a ring buffer.
+
+        The thread does nothing but read, so the device buffer never overflows
+        while speech is cut or recognized elsewhere.
+        """
+        self.microphone = microphone
+        self.source = microphone.__enter__()
+        self.sample_rate = self.source.SAMPLE_RATE
+        self.sample_width = self.source.SAMPLE_WIDTH
+        self.chunk_size = self.source.CHUNK
+        self.chunk_seconds = self.chunk_size / self.sample_rate
+        self.ring = AudioRingBuffer(max(1, int(ring_seconds / self.chunk_seconds)))
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="microphone-capture", daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        while self.running:
+            try:
+                data = self.source.stream.read(self.chunk_size)
+            except (OSError, AttributeError) as e:
+                if not self.running:
+                    break
+                print(f"Error reading from microphone: {e}, reopening it")
+                self._reopen()
+                continue
+            self.ring.append(data, time.time())
+
+    def _reopen(self) -> None:
+        try:
+            self.microphone.__exit__(None, None, None)
+        except (OSError, AttributeError):
+            pass
+        while self.running:
+            time.sleep(REOPEN_DELAY)
+            if not self.running:
+                return
+            try:
+                self.source = self.microphone.__enter__()
+                return
+            except (OSError, AttributeError) as e:
+                print(f"Cannot reopen microphone: {e}")
+
+    def close(self) -> None:
+        self.running = False
+        self.ring.close()
+        self.thread.join(timeout=CLOSE_TIMEOUT)
+        if self.thread.is_alive():
+            # Closing the stream under a blocked read can crash PortAudio, leave it to the process exit
+            print("⚠️ Microphone thread did not stop, not closing the microphone")
+            return
+        try:
+            self.microphone.__exit__(None, None, None)
+        except (OSError, AttributeError):
+            pass
+
+
+class Utterance(NamedTuple):
+    """A stretch of speech cut out of the stream."""
+    audio: sr.AudioData
+    started_at: float  # wall-clock times of the first and last voiced chunk
+    ended_at: float
+    detected_at: float  # when the pause after it was long enough to close it
+    text: Optional[str] = None  # already recognized while it was spoken, if the segmenter has a decoder
+
+
+class SpeechDecoder(ABC):
+    """Recognizer fed with the audio of an utterance while it is still being spoken."""
+
+    @abstractmethod
+    def feed(self, data: bytes) -> None:
+        """Decode one more chunk of the current utterance."""
+
+    @abstractmethod
+    def finish(self) -> str:
+        """Return the text of the current utterance and get ready for the next one."""
+
+    @abstractmethod
+    def discard(self) -> None:
+        """Forget the current utterance, it was noise."""
+
+
+def chunk_energy(data: bytes) -> float:
+    """Root mean square of 16 bit samples, the energy measure of SpeechRecognition."""
+    samples = array('h', data)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(sample * sample for sample in samples) / len(samples))
+
+
+class VoiceActivitySegmenter:
+    def __init__(self, capture: MicrophoneCapture, recognizer: sr.Recognizer,
+                 phrase_limit: Optional[float] = None, max_age: float = MAX_UTTERANCE_AGE,
+                 max_pending: int = MAX_PENDING, decoder: Optional[SpeechDecoder] = None) -> None:
+        """Cut utterances out of the captured stream and queue them for recognition.
+
+        Uses the energy settings of ``recognizer`` the way ``Recognizer.listen`` does:
+        speech starts above ``energy_threshold`` (adapted to the background noise if
+        ``dynamic_energy_threshold`` is set), ends after ``pause_threshold`` seconds of
+        silence or ``phrase_limit`` seconds, and keeps ``non_speaking_duration`` of
+        silence around it. Shorter speech than ``phrase_threshold`` is dropped as noise.
+
+        If recognition falls behind, at most ``max_pending`` utterances wait and
+        ``get`` skips those that ended more than ``max_age`` seconds ago (0 keeps all).
+
+        A ``decoder`` is fed every chunk of speech as it is cut, so only the end of
+        the last word is left to decode once the pause is detected; its text comes
+        with the utterance.
+        """
+        self.capture = capture
+        self.recognizer = recognizer
+        self.phrase_limit = phrase_limit
+        self.max_age = max_age
+        self.decoder = decoder
+        self.segments: "queue.Queue[Utterance]" = queue.Queue(maxsize=max(1, max_pending))
+        self.dropped = 0  # utterances never recognized because they were too old or too many
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="voice-activity", daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        recognizer = self.recognizer
+        chunk_seconds = self.capture.chunk_seconds
+        margin_chunks = max(1, math.ceil(recognizer.non_speaking_duration / chunk_seconds))
+        damping = recognizer.dynamic_energy_adjustment_damping ** chunk_seconds
+        before: Deque[AudioChunk] = deque(maxlen=margin_chunks)
+        speech: List[AudioChunk] = []
+        voiced_seconds = silent_seconds = 0.0
+        first_voiced: Optional[AudioChunk] = None
+        last_voiced: Optional[AudioChunk] = None
+        index = 0
+
+        while self.running:
+            chunk = self.capture.ring.read(index, timeout=0.5)
+            if chunk is None:
+                continue
+            index = chunk.index + 1
+            energy = chunk_energy(chunk.data)
+            loud = energy > recognizer.energy_threshold
+
+            if not speech:
+                if loud:
+                    speech = list(before) + [chunk]
+                    voiced_seconds, silent_seconds = chunk_seconds, 0.0
+                    first_voiced = last_voiced = chunk
+                    before.clear()
+                    if self.decoder:
+                        for part in speech:
+                            self.decoder.feed(part.data)
+                else:
+                    if recognizer.dynamic_energy_threshold:
+                        target = energy * recognizer.dynamic_energy_ratio
+                        recognizer.energy_threshold = recognizer.energy_threshold * damping + target * (1 - damping)
+                    before.append(chunk)
+                continue
+
+            speech.append(chunk)
+            if self.decoder:
+                self.decoder.feed(chunk.data)
+            if loud:
+                voiced_seconds += chunk_seconds
+                silent_seconds = 0.0
+                last_voiced = chunk
+            else:
+                silent_seconds += chunk_seconds
+            too_long = self.phrase_limit and len(speech) * chunk_seconds >= self.phrase_limit
+            if silent_seconds < recognizer.pause_threshold and not too_long:
+                continue
+
+            if voiced_seconds >= recognizer.phrase_threshold:
+                detected_at = time.time()
+                # Keep a short margin of the trailing silence, like the leading one
+                trailing = max(0, int(silent_seconds / chunk_seconds) - margin_chunks)
+                kept = speech[:len(speech) - trailing]
+                audio = sr.AudioData(b"".join(part.data for part in kept),
+                                     self.capture.sample_rate, self.capture.sample_width)
+                text = self.decoder.finish() if self.decoder else None
+                self._put(Utterance(audio, first_voiced.captured_at, last_voiced.captured_at, detected_at, text))
+            elif self.decoder:
+                self.decoder.discard()
+            speech = []
+
+    def _put(self, utterance: Utterance) -> None:
+        while True:
+            try:
+                self.segments.put_nowait(utterance)
+                return
+            except queue.Full:
+                pass
+            try:
+                oldest = self.segments.get_nowait()
+            except queue.Empty:
+                continue
+            self.dropped += 1
+            print(f"⚠️ Recognition is falling behind, dropped an utterance from {time.time() - oldest.ended_at:.1f} s ago")
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Utterance]:
+        """The next utterance that is not too old, or ``None`` if there was none within ``timeout``."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            try:
+                utterance = self.segments.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            age = time.time() - utterance.ended_at
+            if not self.max_age or age <= self.max_age:
+                return utterance
+            self.dropped += 1
+            print(f"⚠️ Skipped an utterance from {age:.1f} s ago, recognition is falling behind")
+
+    def pending(self) -> int:
+        return self.segments.qsize()
+
+    def close(self) -> None:
+        self.running = False
+        self.thread.join(timeout=1.0)
@@ -4,8 +4,20 @@ import requests
 import os
 import argparse
 import math
-from typing import Optional, Tuple, Any, NamedTuple
-from dataclasses import dataclass
+import signal
+import threading
+import time
+from typing import Callable, Optional, Tuple, Any, NamedTuple, Dict
+from dataclasses import dataclass, field
+from ack_client import DeliveryResult, get_acknowledge_client, get_acknowledge_dispatcher, start_trace
+from camera_capture import LatestFrameCapture, MotionGate, StageTimings
+from hand_region import AdaptiveScale, HandRegionTracker
+from hand_trajectory import HandTrajectory
+from hand_features import PALM_TRIANGLE, HandFeatures, extract_features
+from landmark_stream import LandmarkRecorder
+from camera_preview import MjpegPreview
+
+ACK_STATUS_SECONDS = 2.0  # how long the result of a swipe stays on screen
 
 
 @dataclass
@@ -18,14 +30,36 @@ class GestureConfig:
     angle_threshold: float
     min_fingers: int
     show_debug: bool
+    station: str = "default"
+    swipe_window: float = 1.0  # seconds a swipe may take to cover the threshold
+    min_velocity: float = 1.0  # hand sizes per second the hand must still move at in the swipe direction
+    cooldown_seconds: float = 3.0  # no further swipe for this long after one fired
+    stream_acks: bool = False
+    stats_interval: float = 10.0  # seconds between timing reports, 0 disables them
+    motion_threshold: float = 0.01  # changed fraction of the frame that wakes up hand inference, 0 disables the gate
+    idle_after: float = 30.0  # seconds without motion before polling slowly
+    idle_fps: float = 4.0
+    adaptive_roi: bool = False  # search downscaled frames, then track the hand on a crop
+    target_fps: float = 20.0
+    headless: bool = False  # no window and no drawing, stop with SIGINT/SIGTERM
+    preview_port: int = 0  # serve an MJPEG preview on this local port, 0 disables it
+    preview_fps: float = 2.0
+    record_landmarks: Optional[str] = None  # JSON lines file for gesture_replay.py
 
 
 @dataclass
 class GestureState:
     """State for gesture tracking."""
-    open_hand_start_pos: Optional[Tuple[float, float]] = None
-    open_hand_start_size: Optional[float] = None
-    gesture_cooldown: int = 0
+    trajectory: HandTrajectory = field(default_factory=HandTrajectory)
+    swipe_fired: bool = False  # The current movement already fired a swipe
+    frame_time: float = 0.0  # Monotonic capture time of the current frame, for all gesture timing
+    cooldown_until: float = 0.0  # Frame time before which no swipe fires
+    frame_captured_at: float = 0.0  # Wall-clock times of the current frame, for tracing
+    inference_done_at: float = 0.0
+    last_swipe: Optional[str] = None
+    last_swipe_at: float = 0.0  # Frame time
+    swipe_id: int = 0  # Counts the swipes that fired, results of older ones are ignored
+    last_ack: Optional[Tuple[int, DeliveryResult]] = None  # Swipe id and result, set by the sender thread
 
 
 class MediaPipeComponents(NamedTuple):
@@ -36,15 +70,20 @@ class MediaPipeComponents(NamedTuple):
     mp_drawing_styles: Any
 
 
-def initialize_mediapipe_hands() -> MediaPipeComponents:
-    """Initialize MediaPipe Hands module and return related objects."""
-    mp_hands = mp.solutions.hands
-    hands = mp_hands.Hands(
-        static_image_mode=False,
+def create_hands(mp_hands, static_image_mode: bool = False) -> Any:
+    """Create a MediaPipe Hands instance for a single hand."""
+    return mp_hands.Hands(
+        static_image_mode=static_image_mode,
         max_num_hands=1,
         min_detection_confidence=0.5,
         min_tracking_confidence=0.5
     )
+
+
+def initialize_mediapipe_hands(static_image_mode: bool = False) -> MediaPipeComponents:
+    """Initialize MediaPipe Hands module and return related objects."""
+    mp_hands = mp.solutions.hands
+    hands = create_hands(mp_hands, static_image_mode)
     mp_drawing = mp.solutions.drawing_utils
     mp_drawing_styles = mp.solutions.drawing_styles
     return MediaPipeComponents(mp_hands, hands, mp_drawing, mp_drawing_styles)
@@ -56,49 +95,47 @@ def process_frame(image, hands) -> Any:
     return hands.process(image_rgb)
 
 
-def draw_hand_triangle(image, landmarks, w, h):
-    """Draw triangle for hand size calculation."""
-    wrist = landmarks[0]
-    index_mcp = landmarks[5]
-    pinky_mcp = landmarks[17]
+def create_region_tracker(mp_components: MediaPipeComponents, config: GestureConfig) -> HandRegionTracker:
+    """Search with the static-image instance of ``mp_components`` and track on crops with a second instance."""
+    # Video mode follows the hand within a crop without palm detection; the tracker resets it when the crop moves
+    tracking_hands = create_hands(mp_components.mp_hands)
+    return HandRegionTracker(mp_components.hands, tracking_hands, AdaptiveScale(config.target_fps))
+
 
-    wrist_px = (int(wrist.x * w), int(wrist.y * h))
-    index_px = (int(index_mcp.x * w), int(index_mcp.y * h))
-    pinky_px = (int(pinky_mcp.x * w), int(pinky_mcp.y * h))
+def draw_hand_triangle(image, points, w, h):
+    """Draw triangle for hand size calculation."""
+    wrist_px, index_px, pinky_px = [(int(x * w), int(y * h)) for x, y in points[PALM_TRIANGLE, :2]]
 
     cv2.line(image, wrist_px, index_px, (255, 0, 0), 2)
     cv2.line(image, wrist_px, pinky_px, (255, 0, 0), 2)
     cv2.line(image, index_px, pinky_px, (255, 0, 0), 2)
 
 
-def draw_hand_center(image, landmarks, w, h):
+def draw_hand_center(image, hand_center, w, h):
     """Draw hand center point."""
-    hand_center = calculate_hand_center(landmarks)
     center_px = (int(hand_center[0] * w), int(hand_center[1] * h))
     cv2.circle(image, center_px, 5, (0, 255, 255), -1)
 
 
-def draw_finger_debug_info(image, landmarks):
+def draw_finger_debug_info(image, features: HandFeatures):
     """Draw finger extension debug information."""
-    finger_states = check_finger_extensions(landmarks)
-    for i, (finger_name, is_extended) in enumerate(finger_states.items()):
+    for i, (finger_name, is_extended) in enumerate(features.finger_states().items()):
         color = (0, 255, 0) if is_extended else (0, 0, 255)
         status = 'Y' if is_extended else 'N'
         cv2.putText(image, f"{finger_name}: {status}",
                    (10, 200 + i * 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
 
 
-def draw_debug_information(image, hand_landmarks, show_debug):
+def draw_debug_information(image, features: HandFeatures, show_debug):
     """Draw debug information for hand tracking."""
     if not show_debug:
         return
 
-    landmarks = hand_landmarks.landmark
     h, w, _ = image.shape
 
-    draw_hand_triangle(image, landmarks, w, h)
-    draw_hand_center(image, landmarks, w, h)
-    draw_finger_debug_info(image, landmarks)
+    draw_hand_triangle(image, features.points, w, h)
+    draw_hand_center(image, features.center, w, h)
+    draw_finger_debug_info(image, features)
 
 
 def draw_basic_landmarks(image, hand_landmarks, mp_hands, mp_drawing, mp_drawing_styles):
@@ -112,81 +149,20 @@ def draw_basic_landmarks(image, hand_landmarks, mp_hands, mp_drawing, mp_drawing
     )
 
 
-def draw_hand_landmarks(image, results, mp_hands, mp_drawing, mp_drawing_styles, show_debug=False) -> None:
-    """Draw landmarks on detected hands with optional debug information."""
+def draw_hand_landmarks(image, results, mp_hands, mp_drawing, mp_drawing_styles,
+                        features: HandFeatures, show_debug=False) -> None:
+    """Draw landmarks on detected hands with optional debug information for the tracked one."""
     if not results.multi_hand_landmarks:
         return
 
     for hand_landmarks in results.multi_hand_landmarks:
         draw_basic_landmarks(image, hand_landmarks, mp_hands, mp_drawing, mp_drawing_styles)
-        draw_debug_information(image, hand_landmarks, show_debug)
-
-
-def calculate_euclidean_distance(point1, point2) -> float:
-    """Calculate Euclidean distance between two points."""
-    return math.sqrt((point1.x - point2.x)**2 + (point1.y - point2.y)**2)
-
+    draw_debug_information(image, features, show_debug)
 
-def calculate_hand_size(landmarks) -> float:
-    """Calculate hand size using triangle formed by wrist and finger bases."""
-    wrist = landmarks.landmark[0]
-    index_mcp = landmarks.landmark[5]
-    pinky_mcp = landmarks.landmark[17]
 
-    distances = [
-        calculate_euclidean_distance(wrist, index_mcp),
-        calculate_euclidean_distance(wrist, pinky_mcp),
-        calculate_euclidean_distance(index_mcp, pinky_mcp)
-    ]
-
-    return max(distances)
-
-
-def check_thumb_extension(landmarks) -> bool:
-    """Check if thumb is extended."""
-    thumb_tip = landmarks.landmark[4]
-    thumb_mcp = landmarks.landmark[2]
-    wrist = landmarks.landmark[0]
-
-    thumb_tip_dist = calculate_euclidean_distance(wrist, thumb_tip)
-    thumb_mcp_dist = calculate_euclidean_distance(wrist, thumb_mcp)
-    return thumb_tip_dist > thumb_mcp_dist * 1.1
-
-
-def check_finger_extension(landmarks, tip_idx, pip_idx) -> bool:
-    """Check if a finger is extended by comparing tip and PIP positions."""
-    tip = landmarks.landmark[tip_idx]
-    pip = landmarks.landmark[pip_idx]
-    return tip.y < pip.y
-
-
-def check_finger_extensions(landmarks) -> dict:
-    """Check which fingers are extended using a more robust method."""
-    return {
-        'Thumb': check_thumb_extension(landmarks),
-        'Index': check_finger_extension(landmarks, 8, 6),
-        'Middle': check_finger_extension(landmarks, 12, 10),
-        'Ring': check_finger_extension(landmarks, 16, 14),
-        'Pinky': check_finger_extension(landmarks, 20, 18)
-    }
-
-
-def is_hand_open(landmarks, min_fingers_extended=3) -> bool:
+def is_hand_open(features: HandFeatures, min_fingers_extended=3) -> bool:
     """Determine if hand is open by checking finger extensions."""
-    finger_states = check_finger_extensions(landmarks)
-    extended_count = sum(1 for is_extended in finger_states.values() if is_extended)
-    return extended_count >= min_fingers_extended
-
-
-def calculate_hand_center(landmarks) -> Tuple[float, float]:
-    """Calculate the center point of the hand using triangle centroid."""
-    wrist = landmarks.landmark[0]
-    index_mcp = landmarks.landmark[5]
-    pinky_mcp = landmarks.landmark[17]
-
-    center_x = (wrist.x + index_mcp.x + pinky_mcp.x) / 3
-    center_y = (wrist.y + index_mcp.y + pinky_mcp.y) / 3
-    return center_x, center_y
+    return features.extended_count() >= min_fingers_extended
 
 
 def calculate_swipe_metrics(start_pos: Tuple[float, float], end_pos: Tuple[float, float],
@@ -229,76 +205,31 @@ def detect_swipe_gesture(start_pos: Tuple[float, float], end_pos: Tuple[float, f
     return determine_swipe_direction(dx, scaled_distance, angle_deg)
 
 
-def test_server_connection(server_url: str) -> bool:
-    """Test server connection and return success status."""
-    try:
-        requests.get(server_url, timeout=2)
-        return True
-    except requests.exceptions.RequestException as e:
-        print(f"⚠️ Server connection test failed: {e}")
-        print(f"⚠️ Make sure the server is running at {server_url}")
-        return False
-
-
-def send_http_request(url: str, payload: dict) -> bool:
-    """Send HTTP POST request with payload."""
-    try:
-        headers = {"Content-Type": "application/json"}
-        response = requests.post(url, json=payload, headers=headers, timeout=5)
-
-        print(f"HTTP request sent with direction '{payload['direction']}'. Response: {response.status_code}")
-        print(f"Response body: {response.text}")
-
-        if response.status_code == 200:
-            print(f"✅ Successfully sent {payload['direction']} gesture to server")
-            return True
-        else:
-            print(f"❌ Server returned error code: {response.status_code}")
-            return False
-
-    except requests.exceptions.ConnectionError as e:
-        print(f"❌ Connection error: {e}")
-        return False
-    except requests.exceptions.Timeout as e:
-        print(f"❌ Request timed out: {e}")
-        return False
-    except Exception as e:
-        print(f"❌ Failed to send HTTP request: {e}")
-        return False
-
-
-def get_server_url(url: str) -> str:
-    """Get server URL, using default if none provided."""
-    if url:
-        return url.split('/auto_acknowledge')[0]
-
-    server_url = os.environ.get("ASSYS_SERVER_URL", "http://192.168.178.130:5000")
-    return server_url
-
-
-def send_acknowledge_request(url: str = "", direction: str = "next") -> bool:
-    """Send HTTP POST request to acknowledge endpoint with specified direction."""
-    server_url = get_server_url(url)
-
-    if not url:
-        url = f"{server_url}/auto_acknowledge"
-        print(f"Using server URL: {url}")
-
-    if not test_server_connection(server_url):
-        return False
+def dispatch_acknowledge_request(config: GestureConfig, direction: str, state: GestureState, swipe_id: int,
+                                 trace: Optional[Dict[str, Any]] = None) -> bool:
+    """Hand the acknowledgment of swipe ``swipe_id`` to the background sender.
 
-    payload = {"type": "gesture", "direction": direction}
-    print(f"Sending request to: {url}")
-    print(f"Payload: {payload}")
+    Its result arrives in ``state.last_ack`` unless another swipe fired in the meantime.
+    """
+    def record_result(result: DeliveryResult) -> None:
+        if result.delivered:
+            print(f"Acknowledgment {result.direction} delivered in {result.send_seconds * 1000:.0f} ms")
+        if swipe_id != state.swipe_id:
+            print(f"Ignoring the late result of swipe {swipe_id}, swipe {state.swipe_id} is shown")
+            return
+        state.last_ack = (swipe_id, result)
 
-    return send_http_request(url, payload)
+    dispatcher = get_acknowledge_dispatcher(config.acknowledgment_url, "gesture", config.station, config.stream_acks)
+    return dispatcher.submit(direction, on_result=record_result, trace=trace)
 
 
-def parse_arguments() -> argparse.Namespace:
-    """Parse command line arguments."""
-    parser = argparse.ArgumentParser(description='Camera-based gesture recognition for auto-acknowledgment')
-    parser.add_argument('--camera', '-c', type=int, default=0,
-                        help='Camera device number (default: 0)')
+def add_gesture_arguments(parser: argparse.ArgumentParser, single_camera: bool = True) -> None:
+    """Add the recognizer options, shared with gesture_service.py which assigns camera and station itself."""
+    if single_camera:
+        parser.add_argument('--camera', '-c', type=int, default=0,
+                            help='Camera device number (default: 0)')
+        parser.add_argument('--station', type=str, default=os.environ.get('ASSYS_STATION_ID', 'default'),
+                            help='Assembly station this camera belongs to (default: from ASSYS_STATION_ID env or "default")')
     parser.add_argument('--server-url', '-s', type=str,
                         default=os.environ.get('ASSYS_SERVER_URL', 'http://192.168.178.130:5000'),
                         help='Server URL for acknowledgment (default: from ASSYS_SERVER_URL env or http://192.168.178.130:5000)')
@@ -308,10 +239,45 @@ def parse_arguments() -> argparse.Namespace:
                         help='Minimum scaled movement to detect a swipe (default: 2.0)')
     parser.add_argument('--angle-threshold', '-a', type=float, default=30.0,
                         help='Maximum angle from horizontal for swipe detection (default: 30.0 degrees)')
+    parser.add_argument('--swipe-window', type=float, default=1.0,
+                        help='Seconds within which a swipe must cover the threshold (default: 1.0)')
+    parser.add_argument('--cooldown', type=float, default=3.0,
+                        help='Seconds after a swipe during which no further swipe is detected (default: 3.0)')
+    parser.add_argument('--min-velocity', type=float, default=1.0,
+                        help='Minimum current speed of the hand in the swipe direction, in hand sizes per second (default: 1.0)')
     parser.add_argument('--min-fingers', '-mf', type=int, default=3,
                         help='Minimum fingers extended for open hand detection (default: 3)')
     parser.add_argument('--debug', '-d', action='store_true',
                         help='Show visual debug information (hand landmarks, distances)')
+    parser.add_argument('--stream-acks', action='store_true',
+                        help='Send acknowledgments over one long-running streamed request instead of one request each')
+    parser.add_argument('--stats-interval', type=float, default=10.0,
+                        help='Seconds between frame rate and stage timing reports, 0 to disable (default: 10)')
+    parser.add_argument('--motion-threshold', type=float, default=0.01,
+                        help='Fraction of the image that must change to run hand tracking, 0 to track on every frame (default: 0.01)')
+    parser.add_argument('--idle-after', type=float, default=30.0,
+                        help='Seconds without motion or hands before switching to idle mode, 0 to never idle (default: 30)')
+    parser.add_argument('--idle-fps', type=float, default=4.0,
+                        help='Frames checked per second for motion in idle mode (default: 4)')
+    parser.add_argument('--adaptive-roi', action='store_true',
+                        help='Search hands on a downscaled frame and track them on a crop, adapting the resolution to --target-fps')
+    parser.add_argument('--target-fps', type=float, default=20.0,
+                        help='Frame rate the adaptive resolution aims for (default: 20)')
+    parser.add_argument('--headless', action='store_true',
+                        default=os.environ.get('ASSYS_HEADLESS', '').lower() in ('1', 'true', 'yes'),
+                        help='Run without window and drawing, stop with Ctrl+C or SIGTERM (default: from ASSYS_HEADLESS env)')
+    parser.add_argument('--preview-port', type=int, default=0,
+                        help='Serve an MJPEG preview of the annotated camera image on this local port (default: off)')
+    parser.add_argument('--preview-fps', type=float, default=2.0,
+                        help='Frames per second of the preview (default: 2)')
+    parser.add_argument('--record-landmarks', type=str, metavar='FILE',
+                        help='Record the hand landmarks of every frame for gesture_replay.py')
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Camera-based gesture recognition for auto-acknowledgment')
+    add_gesture_arguments(parser)
     return parser.parse_args()
 
 
@@ -360,7 +326,22 @@ def create_gesture_config(args) -> GestureConfig:
         swipe_threshold=args.swipe_threshold,
         angle_threshold=args.angle_threshold,
         min_fingers=args.min_fingers,
-        show_debug=args.debug
+        swipe_window=args.swipe_window,
+        min_velocity=args.min_velocity,
+        cooldown_seconds=args.cooldown,
+        show_debug=args.debug,
+        station=args.station,
+        stream_acks=args.stream_acks,
+        stats_interval=args.stats_interval,
+        motion_threshold=args.motion_threshold,
+        idle_after=args.idle_after,
+        idle_fps=args.idle_fps,
+        adaptive_roi=args.adaptive_roi,
+        target_fps=args.target_fps,
+        headless=args.headless,
+        preview_port=args.preview_port,
+        preview_fps=args.preview_fps,
+        record_landmarks=args.record_landmarks
     )
 
 
@@ -372,14 +353,23 @@ def print_startup_info(config: GestureConfig) -> None:
     print(f"Swipe threshold: {config.swipe_threshold}")
     print(f"Angle threshold: {config.angle_threshold}°")
     print(f"Minimum fingers for open hand: {config.min_fingers}")
+    print(f"Swipe window: {config.swipe_window} s, cooldown: {config.cooldown_seconds} s, "
+          f"minimum velocity: {config.min_velocity} hand sizes/s")
     print(f"Debug mode: {config.show_debug}")
+    print(f"Station: {config.station}")
+    print(f"Streamed acknowledgments: {config.stream_acks}")
+    print(f"Motion threshold: {config.motion_threshold} (idle after {config.idle_after:.0f} s at {config.idle_fps} fps)")
+    print(f"Adaptive region tracking: {config.adaptive_roi} (target {config.target_fps} fps)")
+    print(f"Headless: {config.headless}")
 
 
 def test_server_connection_at_startup(config: GestureConfig) -> None:
     """Test server connection at startup and print status."""
     print("\nTesting connection to server...")
+    client = get_acknowledge_client(config.acknowledgment_url, "gesture", config.station, config.stream_acks)
     try:
-        response = requests.get(config.server_url, timeout=2)
+        # Going through the acknowledgment client leaves its connection open for the first swipe
+        response = client.session.get(config.server_url, timeout=client.timeout)
         if response.status_code == 200:
             print("✅ Server connection successful!")
         else:
@@ -412,16 +402,20 @@ def draw_tracking_line(image, start_pos, current_pos, frame_width, frame_height,
     cv2.line(image, start_px, current_px, color, thickness)
 
 
-def draw_hand_status(image, is_open: bool, hand_center=None, hand_size=None, show_debug=False):
+def draw_hand_status(image, is_open: bool, features: Optional[HandFeatures] = None, show_debug=False):
     """Draw hand status information on image."""
     font = cv2.FONT_HERSHEY_SIMPLEX
 
     if is_open:
         cv2.putText(image, "OPEN HAND", (10, 70), font, 0.8, (0, 255, 0), 2, cv2.LINE_AA)
-        if show_debug and hand_center and hand_size:
-            cv2.putText(image, f"Size: {hand_size:.3f}", (10, 140), font, 0.6, (255, 255, 0), 2, cv2.LINE_AA)
+        if show_debug and features is not None:
+            hand_center = features.center
+            cv2.putText(image, f"Size: {features.size:.3f}", (10, 140), font, 0.6, (255, 255, 0), 2, cv2.LINE_AA)
             cv2.putText(image, f"Center: ({hand_center[0]:.2f}, {hand_center[1]:.2f})",
                        (10, 160), font, 0.6, (255, 255, 0), 2, cv2.LINE_AA)
+            palm_side = "palm" if features.palm_normal[2] < 0 else "back"
+            cv2.putText(image, f"Roll: {features.roll:.0f} deg ({palm_side})",
+                       (10, 180), font, 0.6, (255, 255, 0), 2, cv2.LINE_AA)
     else:
         cv2.putText(image, "CLOSED HAND", (10, 70), font, 0.8, (0, 0, 255), 2, cv2.LINE_AA)
 
@@ -453,136 +447,292 @@ def draw_threshold_info(image, config: GestureConfig, current_distance=None, fra
                     (start_x, start_y + 3 * line_height), font, font_scale, distance_color, thickness)
 
 
-def handle_open_hand(image, hand_landmarks, state: GestureState, config: GestureConfig,
+def handle_open_hand(image, features: HandFeatures, state: GestureState, config: GestureConfig,
                     frame_width: int, frame_height: int) -> None:
-    """Handle open hand detection and tracking."""
-    hand_center = calculate_hand_center(hand_landmarks)
-    hand_size = calculate_hand_size(hand_landmarks)
-
-    if state.open_hand_start_pos is None:
-        state.open_hand_start_pos = hand_center
-        state.open_hand_start_size = hand_size
-        print("Open hand detected - starting gesture tracking")
+    """Handle open hand detection and tracking, drawing on ``image`` unless it is None."""
+    hand_center = features.center
 
-    if state.open_hand_start_pos and config.show_debug:
-        draw_tracking_line(image, state.open_hand_start_pos, hand_center,
-                          frame_width, frame_height, (0, 255, 255))
-
-    # Calculate current scaled distance for display
-    current_distance = None
-    if state.open_hand_start_pos and state.open_hand_start_size:
-        dx = hand_center[0] - state.open_hand_start_pos[0]
-        dy = hand_center[1] - state.open_hand_start_pos[1]
-        raw_distance = math.sqrt(dx**2 + dy**2)
-        current_distance = raw_distance / state.open_hand_start_size if state.open_hand_start_size > 0 else 0
+    # After a swipe the same movement must not fire again, wait for the hand to close or leave
+    if not state.swipe_fired:
+        if not state.trajectory:
+            print("Open hand detected - starting gesture tracking")
+        state.trajectory.add(state.frame_time, hand_center, features.size)
+        handle_gesture_detection(state, config)
 
-    draw_hand_status(image, True, hand_center, hand_size, config.show_debug)
-    draw_threshold_info(image, config, current_distance, frame_width)
+    if image is None:
+        return
 
+    start = state.trajectory.first()
+    if start and config.show_debug:
+        draw_tracking_line(image, (start.x, start.y), hand_center,
+                          frame_width, frame_height, (0, 255, 255))
 
-def handle_gesture_detection(image, hand_landmarks, state: GestureState, config: GestureConfig,
-                           frame_width: int, frame_height: int) -> None:
-    """Handle gesture detection when hand is closed."""
-    if not (state.open_hand_start_pos and state.gesture_cooldown <= 0 and state.open_hand_start_size):
-        return
+    draw_hand_status(image, True, features, config.show_debug)
+    draw_threshold_info(image, config, state.trajectory.scaled_distance() if start else None, frame_width)
 
-    final_hand_center = calculate_hand_center(hand_landmarks)
 
-    if config.show_debug:
-        draw_tracking_line(image, state.open_hand_start_pos, final_hand_center,
-                          frame_width, frame_height, (255, 0, 255))
+def handle_gesture_detection(state: GestureState, config: GestureConfig) -> Optional[str]:
+    """Fire a swipe as soon as the recent trajectory of the open hand crosses the thresholds."""
+    trajectory = state.trajectory
+    if state.swipe_fired or len(trajectory) < 2 or state.frame_time < state.cooldown_until:
+        return None
 
+    start, end = trajectory.first(), trajectory.last()
     swipe_direction = detect_swipe_gesture(
-        state.open_hand_start_pos, final_hand_center, state.open_hand_start_size,
+        (start.x, start.y), (end.x, end.y), trajectory.hand_size(),
         config.swipe_threshold, config.angle_threshold
     )
+    if not swipe_direction:
+        return None
+    # Covering the distance is not enough, the hand must still be moving that way: a hand
+    # that drifted slowly across the window or already stopped is not swiping
+    velocity_x, _ = trajectory.velocity()
+    if (-velocity_x if swipe_direction == "next" else velocity_x) < config.min_velocity:
+        return None
 
-    if swipe_direction:
-        print(f"Swipe {swipe_direction} detected. Sending acknowledgment...")
-        request_success = send_acknowledge_request(config.acknowledgment_url, swipe_direction)
-        state.gesture_cooldown = 60
+    trace = start_trace(frame_captured=state.frame_captured_at, inference_done=state.inference_done_at)
+    print(f"Swipe {swipe_direction} detected after {(end.t - start.t) * 1000:.0f} ms at "
+          f"{abs(velocity_x):.1f} hand sizes/s (trace {trace['id']}). Sending acknowledgment...")
+    state.last_swipe = swipe_direction
+    state.last_swipe_at = state.frame_time
+    state.swipe_id += 1
+    # Returns at once, the video loop keeps running while the server answers
+    dispatch_acknowledge_request(config, swipe_direction, state, state.swipe_id, trace)
+    state.cooldown_until = state.frame_time + config.cooldown_seconds
+    state.swipe_fired = True
+    trajectory.clear()
+    return swipe_direction
+
+
+def draw_ack_status(image, state: GestureState, frame_width: int, frame_height: int) -> None:
+    """Draw the last swipe and whether its acknowledgment was delivered."""
+    if not state.last_swipe or state.frame_time - state.last_swipe_at > ACK_STATUS_SECONDS:
+        return
 
-        color = (0, 255, 0) if request_success else (0, 0, 255)
-        status_text = "✓" if request_success else "✗"
-        direction_text = f"Swipe {swipe_direction.upper()} {status_text}"
-        cv2.putText(image, direction_text, (frame_width//2 - 150, frame_height - 50),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2, cv2.LINE_AA)
+    # The sender thread may still report an older swipe
+    last_ack = state.last_ack
+    result = last_ack[1] if last_ack is not None and last_ack[0] == state.swipe_id else None
+    if result is None:
+        color, status_text = (255, 255, 0), "..."
+    elif result.delivered:
+        color, status_text = (0, 255, 0), "✓"
+    else:
+        color, status_text = (0, 0, 255), "✗"
+    direction_text = f"Swipe {state.last_swipe.upper()} {status_text}"
+    cv2.putText(image, direction_text, (frame_width//2 - 150, frame_height - 50),
+               cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2, cv2.LINE_AA)
+
+
+def reset_gesture_tracking(state: GestureState) -> None:
+    """Forget the current movement, the next open hand starts a new one."""
+    state.trajectory.clear()
+    state.swipe_fired = False
 
 
-def handle_closed_hand(image, hand_landmarks, state: GestureState, config: GestureConfig,
+def handle_closed_hand(image, features: HandFeatures, state: GestureState, config: GestureConfig,
                       frame_width: int, frame_height: int) -> None:
     """Handle closed hand detection and gesture processing."""
-    draw_hand_status(image, False)
-    draw_threshold_info(image, config, None, frame_width)
-    handle_gesture_detection(image, hand_landmarks, state, config, frame_width, frame_height)
+    if image is not None:
+        draw_hand_status(image, False)
+        draw_threshold_info(image, config, None, frame_width)
 
-    state.open_hand_start_pos = None
-    state.open_hand_start_size = None
+    # The trajectory only holds open-hand positions, closing the hand ends the movement
+    handle_gesture_detection(state, config)
+    reset_gesture_tracking(state)
 
 
 def handle_no_hand_detected(state: GestureState, image, config: GestureConfig, frame_width: int) -> None:
     """Handle case when no hand is detected."""
-    if state.open_hand_start_pos and state.gesture_cooldown <= 0:
-        print("Hand lost - checking for swipe gesture")
-        state.open_hand_start_pos = None
-        state.open_hand_start_size = None
+    if state.trajectory:
+        print("Hand lost - resetting gesture tracking")
+    reset_gesture_tracking(state)
 
     # Still show threshold info even when no hand is detected
-    draw_threshold_info(image, config, None, frame_width)
+    if image is not None:
+        draw_threshold_info(image, config, None, frame_width)
 
 
-def draw_cooldown_timer(image, gesture_cooldown: int, frame_height: int) -> None:
+def draw_cooldown_timer(image, remaining_time: float, frame_height: int) -> None:
     """Draw cooldown timer on image."""
-    if gesture_cooldown <= 0:
+    if remaining_time <= 0:
         return
 
-    remaining_time = gesture_cooldown / 20.0
     cv2.putText(image, f"Cooldown: {remaining_time:.1f}s", (10, frame_height - 30),
                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2, cv2.LINE_AA)
 
 
 def process_frame_with_hands(image, results, mp_components: MediaPipeComponents,
                            state: GestureState, config: GestureConfig,
-                           frame_width: int, frame_height: int) -> None:
-    """Process frame when hands are detected."""
-    hand_landmarks = results.multi_hand_landmarks[0]
-    draw_hand_landmarks(image, results, mp_components.mp_hands,
-                       mp_components.mp_drawing, mp_components.mp_drawing_styles, config.show_debug)
-
-    if is_hand_open(hand_landmarks, config.min_fingers):
-        handle_open_hand(image, hand_landmarks, state, config, frame_width, frame_height)
+                           frame_width: int, frame_height: int, features: Optional[HandFeatures] = None) -> None:
+    """Process frame when hands are detected.
+
+    The features of the tracked hand are computed once here, or passed in when a
+    replay computed them for many frames at once, and shared by all later steps.
+    """
+    if features is None:
+        features = extract_features(results.multi_hand_landmarks[0])
+    if image is not None:
+        draw_hand_landmarks(image, results, mp_components.mp_hands,
+                           mp_components.mp_drawing, mp_components.mp_drawing_styles, features, config.show_debug)
+
+    if is_hand_open(features, config.min_fingers):
+        handle_open_hand(image, features, state, config, frame_width, frame_height)
     else:
-        handle_closed_hand(image, hand_landmarks, state, config, frame_width, frame_height)
+        handle_closed_hand(image, features, state, config, frame_width, frame_height)
+
+
+def report_timings(timings: StageTimings, capture: LatestFrameCapture, dropped_before: int) -> int:
+    """Print frame rate, dropped frames and stage timings since the last report."""
+    dropped = capture.dropped - dropped_before
+    print(f"⏱ {timings.summary()} | dropped {dropped} of {timings.frames + dropped} frames")
+    timings.reset()
+    return capture.dropped
 
 
-def run_main_loop(cap, mp_components: MediaPipeComponents, config: GestureConfig,
-                 frame_width: int, frame_height: int) -> None:
-    """Run the main processing loop."""
-    state = GestureState()
+def install_signal_handlers(stop: threading.Event) -> None:
+    """Stop the loop cleanly on Ctrl+C or when the service manager terminates the process."""
+    def request_stop(signum, frame) -> None:
+        print(f"Received {signal.Signals(signum).name}, stopping...")
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+
+def draw_overlay(image, state: GestureState, idle: bool, frame_width: int, frame_height: int) -> None:
+    """Draw the instructions and the status of the loop."""
     font = cv2.FONT_HERSHEY_SIMPLEX
     instruction_text = "Open hand and swipe: Left = Next | Right = Back | Q = Quit"
-
-    while cap.isOpened():
-        success, image = cap.read()
-        if not success:
-            print("Ignoring empty camera frame.")
+    cv2.putText(image, instruction_text, (10, 30), font, 0.6, (255, 255, 255), 2, cv2.LINE_AA)
+    draw_cooldown_timer(image, state.cooldown_until - state.frame_time, frame_height)
+    draw_ack_status(image, state, frame_width, frame_height)
+    if idle:
+        cv2.putText(image, "IDLE", (10, 100), font, 0.8, (128, 128, 128), 2, cv2.LINE_AA)
+
+
+def run_main_loop(capture: LatestFrameCapture, mp_components: MediaPipeComponents, config: GestureConfig,
+                 frame_width: int, frame_height: int, stop: Optional[threading.Event] = None,
+                 preview: Optional[MjpegPreview] = None, recorder: Optional[LandmarkRecorder] = None,
+                 on_frame: Optional[Callable[[], None]] = None) -> None:
+    """Run the main processing loop on the newest camera frame.
+
+    Frames are only annotated when they are shown, in the window or on ``preview``.
+    ``on_frame`` is called after every processed frame, gesture_service.py counts them with it.
+    """
+    stop = stop or threading.Event()
+    state = GestureState(trajectory=HandTrajectory(config.swipe_window))
+    timings = StageTimings(enabled=config.stats_interval > 0)
+    dropped_reported = 0
+    gate = MotionGate(config.motion_threshold, idle_after=config.idle_after)
+    idle = False
+    tracker = create_region_tracker(mp_components, config) if config.adaptive_roi else None
+
+    while capture.is_running() and not stop.is_set():
+        if gate.is_idle() != idle:
+            idle = not idle
+            print("No motion, switching to idle mode" if idle else "Motion detected, tracking hands")
+        if idle:
+            # Frames in between are skipped by the capture thread, only the newest one is checked
+            with timings.stage("idle"):
+                stop.wait(1.0 / config.idle_fps)
+
+        with timings.stage("wait"):
+            frame = capture.read(timeout=1.0)
+        if frame is None:
+            print("No camera frame received.")
             continue
+        image = frame.image
+        state.frame_captured_at = frame.captured_at
+        state.frame_time = frame.captured_tick
+        # How long the frame sat in the capture slot before processing started
+        timings.record("age", time.perf_counter() - frame.captured_tick)
+
+        with timings.stage("gate"):
+            run_inference = gate.should_infer(image)
+        results = None
+        if run_inference:
+            inference_start = time.perf_counter()
+            with timings.stage("inference"):
+                if tracker:
+                    results = tracker.process(image)
+                    timings.count(tracker.last_mode)
+                else:
+                    results = process_frame(image, mp_components.hands)
+            inference_seconds = time.perf_counter() - inference_start
+            if results.multi_hand_landmarks:
+                gate.hand_seen()
+        else:
+            timings.count("gated")
+        state.inference_done_at = time.time()
+        if recorder:
+            recorder.write(state.frame_time, results)
+
+        publish = preview is not None and preview.due()
+        canvas = image if publish or not config.headless else None
+
+        with timings.stage("gesture"):
+            if results and results.multi_hand_landmarks:
+                process_frame_with_hands(canvas, results, mp_components, state, config, frame_width, frame_height)
+            else:
+                handle_no_hand_detected(state, canvas, config, frame_width)
+
+            if canvas is not None:
+                draw_overlay(canvas, state, idle, frame_width, frame_height)
+
+        key = -1
+        if canvas is not None:
+            with timings.stage("display"):
+                if publish:
+                    preview.publish(canvas)
+                if not config.headless:
+                    cv2.imshow('MediaPipe Hand Gesture Recognition', canvas)
+                    key = cv2.waitKey(5) & 0xFF
+        timings.frame_done()
+        if on_frame:
+            on_frame()
+
+        if tracker and run_inference:
+            # Only the inference depends on the scale, drawing and the preview must not shrink it
+            scale = tracker.scale.scale
+            if tracker.scale.update(inference_seconds) != scale:
+                print(f"Inference scale {scale:.1f} -> {tracker.scale.scale:.1f}")
+
+        if config.stats_interval > 0 and timings.elapsed() >= config.stats_interval:
+            dropped_reported = report_timings(timings, capture, dropped_reported)
+
+        if key == ord('q'):
+            break
 
-        results = process_frame(image, mp_components.hands)
-        cv2.putText(image, instruction_text, (10, 30), font, 0.6, (255, 255, 255), 2, cv2.LINE_AA)
 
-        if results and results.multi_hand_landmarks:
-            process_frame_with_hands(image, results, mp_components, state, config, frame_width, frame_height)
-        else:
-            handle_no_hand_detected(state, image, config, frame_width)
+def run_recognizer(config: GestureConfig, stop: threading.Event,
+                   on_frame: Optional[Callable[[], None]] = None) -> bool:
+    """Open the camera and recognize gestures until ``stop`` is set. Returns False if the camera gives no image."""
+    # With region tracking the main instance only searches whole frames, each one on its own
+    mp_components = initialize_mediapipe_hands(static_image_mode=config.adaptive_roi)
+    cap, frame_dimensions = initialize_camera(config.camera_device)
 
-        state.gesture_cooldown = max(0, state.gesture_cooldown - 1)
-        draw_cooldown_timer(image, state.gesture_cooldown, frame_height)
+    if not cap or not frame_dimensions:
+        return False
 
-        cv2.imshow('MediaPipe Hand Gesture Recognition', image)
+    frame_width, frame_height = frame_dimensions
+    capture = LatestFrameCapture(cap)
+    preview = MjpegPreview(config.preview_port, config.preview_fps) if config.preview_port else None
+    recorder = LandmarkRecorder(config.record_landmarks) if config.record_landmarks else None
 
-        if cv2.waitKey(5) & 0xFF == ord('q'):
-            break
+    try:
+        run_main_loop(capture, mp_components, config, frame_width, frame_height, stop, preview, recorder, on_frame)
+    finally:
+        capture.release()
+        if recorder:
+            recorder.close()
+            print(f"Recorded landmarks of {recorder.frames} frames to {config.record_landmarks}")
+        if preview:
+            preview.close()
+        if not config.headless:
+            cv2.destroyAllWindows()
+        get_acknowledge_dispatcher(config.acknowledgment_url, "gesture", config.station, config.stream_acks).close()
+        get_acknowledge_client(config.acknowledgment_url, "gesture", config.station, config.stream_acks).close()
+    return True
 
 
 def main() -> None:
@@ -594,19 +744,9 @@ def main() -> None:
     print_startup_info(config)
     test_server_connection_at_startup(config)
 
-    mp_components = initialize_mediapipe_hands()
-    cap, frame_dimensions = initialize_camera(config.camera_device)
-
-    if not cap or not frame_dimensions:
-        return
-
-    frame_width, frame_height = frame_dimensions
-
-    try:
-        run_main_loop(cap, mp_components, config, frame_width, frame_height)
-    finally:
-        cap.release()
-        cv2.destroyAllWindows()
+    stop = threading.Event()
+    install_signal_handlers(stop)
+    run_recognizer(config, stop)
 
 
 if __name__ == "__main__":
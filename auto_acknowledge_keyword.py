@@ -1,12 +1,15 @@
 import speech_recognition as sr
-import requests
+from ack_client import get_acknowledge_client, start_trace
+from audio_capture import MAX_UTTERANCE_AGE, MicrophoneCapture, VoiceActivitySegmenter
+from keyword_backends import BACKENDS, DEFAULT_MODEL_PATH, BackendUnavailable, VoskBackend, create_backend
 import os
 import time
 import argparse
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
 
-def send_acknowledge_request(url: str | None = None, direction: str = "next") -> bool:
+def send_acknowledge_request(url: str | None = None, direction: str = "next", station: str = "default",
+                             streaming: bool = False, trace: Optional[Dict[str, Any]] = None) -> bool:
     """Send HTTP POST request to acknowledge endpoint."""
     # Use default URL if none provided
     if url is None:
@@ -14,15 +17,8 @@ def send_acknowledge_request(url: str | None = None, direction: str = "next") ->
         server_url = os.environ.get("ASSYS_SERVER_URL", "http://localhost:5000")
         url = f"{server_url}/auto_acknowledge"
 
-    try:
-        payload = {"type": "voice", "direction": direction}
-        headers = {"Content-Type": "application/json"}
-        response = requests.post(url, json=payload, headers=headers)
-        print(f"HTTP request sent with direction '{direction}'. Response: {response.status_code}")
-        return True
-    except Exception as e:
-        print(f"Failed to send HTTP request: {e}")
-        return False
+    # Reuses one keep-alive connection with bounded timeouts for all acknowledgments
+    return get_acknowledge_client(url, "voice", station, streaming).send(direction, trace=trace)
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -42,6 +38,22 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument('--cooldown', '-c', type=float, 
                         default=float(os.environ.get('SPEECH_COOLDOWN', '2.0')),
                         help='Cooldown period between acknowledgments (default: 2.0 seconds)')
+    parser.add_argument('--phrase-limit', type=float,
+                        default=float(os.environ.get('SPEECH_PHRASE_LIMIT', '3.0')),
+                        help='Maximum length of an utterance in seconds, 0 for no limit (default: 3.0)')
+    parser.add_argument('--max-age', type=float,
+                        default=float(os.environ.get('SPEECH_MAX_AGE', str(MAX_UTTERANCE_AGE))),
+                        help=f'Skip utterances that ended longer ago than this when recognition falls behind, '
+                             f'0 to keep all (default: {MAX_UTTERANCE_AGE:g} seconds)')
+    parser.add_argument('--backend', '-b', choices=BACKENDS, default=os.environ.get('SPEECH_BACKEND', 'auto'),
+                        help='Recognition backend: offline "vosk", cloud "google", or "auto" for vosk if installed, '
+                             'else google (default: from SPEECH_BACKEND env or auto)')
+    parser.add_argument('--model', '-m', type=str, default=os.environ.get('SPEECH_MODEL_PATH', DEFAULT_MODEL_PATH),
+                        help=f'Directory of the Vosk model (default: from SPEECH_MODEL_PATH env or {DEFAULT_MODEL_PATH})')
+    parser.add_argument('--station', type=str, default=os.environ.get('ASSYS_STATION_ID', 'default'),
+                        help='Assembly station this microphone belongs to (default: from ASSYS_STATION_ID env or "default")')
+    parser.add_argument('--stream-acks', action='store_true',
+                        help='Send acknowledgments over one long-running streamed request instead of one request each')
     return parser.parse_args()
 
 
@@ -98,6 +110,13 @@ def main() -> None:
     
     # Get wake words
     wake_words = get_wake_words()
+
+    try:
+        backend = create_backend(args.backend, recognizer, wake_words, args.model)
+    except BackendUnavailable as e:
+        print(f"❌ Offline recognition unavailable: {e}")
+        return
+    phrase_limit = args.phrase_limit or None
     
     print("Starting keyword recognition")
     print(f"Using acknowledgment URL: {acknowledgment_url}")
@@ -105,53 +124,79 @@ def main() -> None:
     print(f"Back words: {', '.join(wake_words['back'])}")
     print(f"Energy threshold: {recognizer.energy_threshold}")
     print(f"Pause threshold: {recognizer.pause_threshold}")
+    print(f"Phrase limit: {f'{phrase_limit} seconds' if phrase_limit else 'none'}")
+    print(f"Maximum utterance age: {f'{args.max_age} seconds' if args.max_age else 'none'}")
+    print(f"Recognition backend: {backend.describe()}")
+    if isinstance(backend, VoskBackend) and backend.missing:
+        print(f"⚠️ Not in the model's vocabulary, will not be recognized: {', '.join(backend.missing)}")
     print(f"Cooldown period: {args.cooldown} seconds")
+    print(f"Station: {args.station}")
+    print(f"Streamed acknowledgments: {args.stream_acks}")
+
+    # Open the connection now so the first keyword is not slowed down by the handshake
+    get_acknowledge_client(acknowledgment_url, "voice", args.station, args.stream_acks).warm_up()
     
     # Track last acknowledgment time to prevent rapid-fire triggers
     last_acknowledgment_time = 0
-    
+
+    # One stream stays open; utterances are cut on their own thread and queued,
+    # so nothing said while an earlier one is recognized gets lost. The offline
+    # model decodes on that thread while the words are spoken
+    capture = MicrophoneCapture(sr.Microphone())
+    segmenter = VoiceActivitySegmenter(capture, recognizer, phrase_limit, args.max_age,
+                                       decoder=backend.decoder(capture.sample_rate))
+    print("Listening for keywords...")
+
     # Main recognition loop
-    while True:
-        with sr.Microphone() as source:
-            print("Listening for keywords...")
+    try:
+        while True:
+            utterance = segmenter.get(timeout=1.0)
+            if utterance is None:
+                continue
+            speech_end_at = utterance.detected_at
+
+            # Try to recognize speech
             try:
-                audio = recognizer.listen(source)
-                
-                # Try to recognize speech
-                try:
-                    text = recognizer.recognize_google(audio).lower()
-                    print(f"Recognized: '{text}'")
-                    
-                    # Check if any wake word is in the recognized text
-                    direction = None
-                    if any(word in text for word in wake_words["next"]):
-                        direction = "next"
-                    elif any(word in text for word in wake_words["back"]):
-                        direction = "back"
-                    
-                    if direction:
-                        # Check cooldown period
-                        current_time = time.time()
-                        if current_time - last_acknowledgment_time >= args.cooldown:
-                            print(f"Wake word detected for direction '{direction}'. Sending acknowledgment...")
-                            if send_acknowledge_request(acknowledgment_url, direction):
-                                last_acknowledgment_time = current_time
-                        else:
-                            cooldown_remaining = args.cooldown - (current_time - last_acknowledgment_time)
-                            print(f"Wake word detected but in cooldown period. {cooldown_remaining:.1f}s remaining.")
-                            
-                except sr.UnknownValueError:
-                    # Speech was unintelligible
-                    pass
-                except sr.RequestError as e:
-                    print(f"Could not request results from Google Speech Recognition service; {e}")
-                    
-            except KeyboardInterrupt:
-                print("\nKeyword recognition stopped by user.")
-                break
+                text = utterance.text if utterance.text is not None else backend.recognize(utterance.audio)
+                recognized_at = time.time()
+                if not text:
+                    continue
+                waiting = f", {segmenter.pending()} more waiting" if segmenter.pending() else ""
+                print(f"Recognized: '{text}' ({(recognized_at - speech_end_at) * 1000:.0f} ms after end of speech{waiting})")
+
+                # Check if any wake word is in the recognized text
+                direction = None
+                if any(word in text for word in wake_words["next"]):
+                    direction = "next"
+                elif any(word in text for word in wake_words["back"]):
+                    direction = "back"
+
+                if direction:
+                    # Cooldown by the time the words were spoken, queued utterances are judged fairly
+                    spoken_at = utterance.ended_at
+                    if spoken_at - last_acknowledgment_time >= args.cooldown:
+                        trace = start_trace(speech_end=speech_end_at, recognized=recognized_at)
+                        print(f"Wake word detected for direction '{direction}' (trace {trace['id']}). Sending acknowledgment...")
+                        if send_acknowledge_request(acknowledgment_url, direction, args.station, args.stream_acks, trace):
+                            last_acknowledgment_time = spoken_at
+                    else:
+                        cooldown_remaining = args.cooldown - (spoken_at - last_acknowledgment_time)
+                        print(f"Wake word detected but in cooldown period. {cooldown_remaining:.1f}s remaining.")
+
+            except sr.RequestError as e:
+                print(f"Could not request results from Google Speech Recognition service; {e}")
             except Exception as e:
                 print(f"Error in recognition loop: {e}")
                 time.sleep(1)  # Prevent CPU-intensive crash loops
+    except KeyboardInterrupt:
+        print("\nKeyword recognition stopped by user.")
+    finally:
+        segmenter.close()
+        capture.close()
+        if segmenter.dropped:
+            print(f"⚠️ {segmenter.dropped} utterances were dropped because recognition fell behind")
+        if capture.ring.lost:
+            print(f"⚠️ {capture.ring.lost * capture.chunk_seconds:.1f} s of audio were not examined in time")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+import threading
+import time
+from typing import Dict, List, Optional, Any
+from blueprint.state_store import StateStore
+from blueprint.tracing import TraceHop
+
+SHARED_POLL_SECONDS = 0.1      # How often waiting readers look for events published by other processes
+MAX_SHARED_POLL_SECONDS = 1.0  # The poll interval doubles up to this while the shared store does not change
+
+
+class AcknowledgeChannel:
+    def __init__(self, store: StateStore, station_id: str) -> None:
+        """Ordered log of a station's acknowledgment events that clients read through their own cursor.
+
+        Every event gets a monotonically increasing sequence number. A client passes the
+        last sequence number it handled and receives everything after it in order, so
+        bursts are neither collapsed nor consumed by another tab. The events themselves
+        live in the state store; the channel only wakes up readers in this process.
+        """
+        self.store = store
+        self.station_id = station_id
+        self.condition = threading.Condition()
+
+    @property
+    def epoch(self) -> str:
+        """Epoch of the sequence numbers, it changes when the log starts over."""
+        return self.store.epoch
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the latest event."""
+        return self.store.last_seq(self.station_id)
+
+    def publish(self, event: Dict[str, Any], trace_hops: Optional[List[TraceHop]] = None) -> Dict[str, Any]:
+        """Append the event with the next sequence number and wake up every waiting reader.
+
+        ``trace_hops`` of the event's trace are written together with the event.
+        """
+        event = self.store.append_event(self.station_id, dict(event, epoch=self.epoch), trace_hops)
+        with self.condition:
+            self.condition.notify_all()
+        return event
+
+    def resume_cursor(self, cursor: Optional[int], epoch: Optional[str] = None) -> int:
+        """Cursor to continue a client from.
+
+        A client without a cursor starts after the latest event. A cursor of another epoch,
+        or one beyond the latest event, was handed out before the log started over, so the
+        client gets the whole retained log of the current epoch.
+        """
+        if cursor is None:
+            return self.last_seq
+        if (epoch and epoch != self.epoch) or cursor > self.last_seq:
+            return 0
+        return cursor
+
+    def read(self, cursor: int) -> List[Dict[str, Any]]:
+        """Return all retained events after ``cursor`` in order."""
+        return self.store.read_events(self.station_id, cursor)
+
+    def wait(self, cursor: int, timeout: float) -> List[Dict[str, Any]]:
+        """Block until there are events after ``cursor`` or the timeout passes."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                version = self.store.data_version()
+                events = self.read(cursor)
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                if not self.store.shared:
+                    self.condition.wait(remaining)
+                    continue
+                # Other processes cannot notify us, so a shared store is polled. Its data version
+                # is cheap to check, and the interval grows while no other process writes
+                poll = SHARED_POLL_SECONDS
+                while not self.condition.wait(min(remaining, poll)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self.store.data_version() != version:
+                        break
+                    poll = min(poll * 2, MAX_SHARED_POLL_SECONDS)
+
+    def consume_next(self) -> Optional[Dict[str, Any]]:
+        """Return the next event for cursorless clients, each event only once."""
+        return self.store.consume_next_event(self.station_id)
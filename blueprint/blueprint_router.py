@@ -1,71 +1,172 @@
-from flask import Blueprint, render_template, redirect, url_for, request, jsonify
-from blueprint.render import render_blueprint, render_control_views
+from flask import Blueprint, Response, render_template, redirect, url_for, request, jsonify, session, stream_with_context
+from blueprint.render import CONTROL_VIEWS, render_blueprint, render_blueprint_png, render_control_views, render_control_views_png
+from blueprint.manifest import build_manifest, steps_digest
 from blueprint.loader import select_random_blueprint, load_blueprint
+from blueprint.station import StationRegistry, StationSession, DEFAULT_STATION
+from blueprint.tracing import BROWSER_HOPS, ENABLED as TRACING_ENABLED, parse_trace, received_hops, summarize_trace
 from pick_by_light.pick_by_light_controller import PickByLightController
-from collections import Counter
-
-# Global state to ensure accessibility across all route functions
-state = {
-    "auto_acknowledged": False,
-    "auto_gesture_ack": True,  # Enable by default for better usability
-    "auto_voice_ack": True,    # Enable by default for better usability
-    "auto_direction": "next",
-    "block_locations_by_step" : set()  # Set of (step: int, location: str)
-}
-
-
-
-def store_block_location(step: int, location: str):
-    state["block_locations_by_step"].add((step, location))
-
-def remove_stored_blocks(pick_by_light_controller: PickByLightController):
-    print(state["block_locations_by_step"])
-    location_counts = Counter(location for _, location in state["block_locations_by_step"])
-
-    # Entferne pro Location so viele Einheiten, wie gezählt
-    for location, count in location_counts.items():
-        for _ in range(count):
-            pick_by_light_controller.remove_block(location)
-
-    # Danach leeren
-    state["block_locations_by_step"].clear()
-
-
-
-
-
-
-def create_blueprint(pick_by_light_controller: PickByLightController) -> Blueprint:
+from metrics.registry import instrument_blueprint
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import time
+
+MAX_LOOK_AHEAD = 5
+KEEPALIVE_SECONDS = 15  # Comment sent on idle push connections so dead ones get noticed
+MAX_TRACE_RESULTS = 100
+IMAGE_MAX_AGE = 300  # Seconds browsers may reuse a step image without asking again
+IMMUTABLE_MAX_AGE = 31536000  # Images requested by their content hash never change
+MISSING_BLOCK_WARNING = "Der benötigte Klemmbaustein ist nicht im Zwischenlager vorhanden"
+
+
+def remember_station() -> None:
+    """Remember a ``station`` query parameter in the browser session, so every page opened afterwards belongs to that station."""
+    station_id = request.args.get('station')
+    if station_id:
+        session['station'] = station_id
+
+def get_station_id() -> str:
+    """Return the station of the current request.
+
+    Acknowledgment clients name their station in the request body, browsers carry
+    it in their session.
+    """
+    station_id = request.args.get('station') or request.form.get('station')
+    if not station_id and request.is_json:
+        station_id = (request.get_json(silent=True) or {}).get('station')
+    return station_id or session.get('station', DEFAULT_STATION)
+
+def remove_stored_blocks(station: StationSession):
+    location_counts = station.clear_block_locations()
+
+    # Alle entnommenen Einheiten in einem Schritt abbuchen
+    shortages = station.controller.commit_picks(location_counts, allow_shortage=True)
+    if shortages:
+        print(f"Lagerbestand zu niedrig an Station {station.station_id}, fehlende Einheiten je Location: {shortages}")
+
+def get_ack_cursor(station: StationSession, values) -> int:
+    """Return the acknowledgment cursor a page was reached with, or the latest one."""
+    return station.acknowledge_channel.resume_cursor(values.get('ack_cursor', type=int), values.get('ack_epoch'))
+
+def parse_event_id(event_id: Optional[str]) -> Tuple[Optional[int], Optional[str]]:
+    """Split the ``<epoch>:<seq>`` id of a pushed event into cursor and epoch."""
+    if not event_id:
+        return None, None
+    epoch, _, seq = event_id.rpartition(":")
+    return (int(seq), epoch or None) if seq.isdigit() else (None, None)
+
+def publish_acknowledgment(station: StationSession, data: dict) -> Optional[dict]:
+    """Publish an acknowledgment if the station accepts its type and return the event."""
+    received_at = time.time()
+    ack_type = data.get("type")
+    direction = data.get("direction", "next")
+    trace = parse_trace(data) if TRACING_ENABLED else None
+    trace_id = trace["id"] if trace else None
+    # Written in one go with the outcome, tracing must not slow down the acknowledgment it measures
+    hops = received_hops(trace, received_at, ack_type=ack_type, direction=direction) if trace else None
+
+    settings = station.get_settings()
+    accepted = False
+
+    if ack_type == "voice" and settings.get("auto_voice_ack", False):
+        accepted = True
+        print(f"Voice acknowledgment received with direction: {direction}")
+    elif ack_type == "gesture" and settings.get("auto_gesture_ack", False):
+        accepted = True
+        print(f"Gesture acknowledgment received with direction: {direction}")
+    elif not ack_type:
+        # Direct POST request without type specification
+        accepted = True
+        print(f"Direct acknowledgment received with direction: {direction}")
+
+    if not accepted:
+        if hops:
+            station.record_trace_hops(trace_id, hops + [("rejected", time.time(), {})], create=True)
+        return None
+    return station.acknowledge_channel.publish({
+        "auto_acknowledged": True,
+        "direction": direction,
+        "ack_type": ack_type,
+        "trace_id": trace_id
+    }, hops)
+
+def get_upcoming_locations(pick_by_light_controller: PickByLightController, steps: List[Tuple], step: int, look_ahead: int) -> List[Optional[int]]:
+    """Return the bin locations of the current and following steps with one controller call, None for parts out of stock."""
+    parts = [(length, width, color) for _, _, length, width, color in steps[step-1:step-1+max(look_ahead, 1)]]
+    return pick_by_light_controller.get_block_locations(parts)
+
+
+def highlight_step(station: StationSession, steps: List[Tuple], step: int) -> Tuple[Optional[int], Dict[int, int], int]:
+    """Light the bins of a step and its look-ahead and remember the pick.
+
+    Returns the step's bin location (None if the part is out of stock), the units to take per lit bin and the look-ahead.
+    """
+    pick_by_light_controller = station.controller
+    look_ahead = station.get_settings()["look_ahead"]
+    locations = get_upcoming_locations(pick_by_light_controller, steps, step, look_ahead)
+    location = locations[0] if locations else None
+    if location is None:
+        return None, {}, look_ahead
+
+    upcoming_locations = [upcoming for upcoming in locations[:look_ahead] if upcoming is not None]
+    picks = pick_by_light_controller.show_blocks(upcoming_locations)
+    #pick_by_light_controller.remove_block(location)
+    station.store_block_location(step, location)
+    return location, picks, look_ahead
+
+def image_response(png: bytes, digest: str) -> Response:
+    """PNG response that browsers keep for good when it was requested with its content hash as ``v``."""
+    response = Response(png, mimetype='image/png')
+    response.set_etag(digest)
+    response.cache_control.public = True
+    if request.args.get('v') == digest:
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = IMAGE_MAX_AGE
+    return response.make_conditional(request)
+
+def create_blueprint(pick_by_light_controller: PickByLightController, stations: Optional[StationRegistry] = None) -> Blueprint:
     blueprint = Blueprint('blueprint', __name__)
+    if stations is None:
+        stations = StationRegistry(pick_by_light_controller)
+    blueprint.before_app_request(remember_station)
+    instrument_blueprint(blueprint)
 
-    register_auth_routes(blueprint)
-    register_blueprint_routes(blueprint, pick_by_light_controller)
-    register_control_routes(blueprint, pick_by_light_controller)
-    register_auto_acknowledge_routes(blueprint)
+    register_auth_routes(blueprint, stations)
+    register_blueprint_routes(blueprint, stations)
+    register_control_routes(blueprint, stations)
+    register_auto_acknowledge_routes(blueprint, stations)
+    register_trace_routes(blueprint, stations)
 
     return blueprint
 
-def register_auth_routes(blueprint: Blueprint) -> None:
+def register_auth_routes(blueprint: Blueprint, stations: StationRegistry) -> None:
     @blueprint.route('/log_in', methods=['POST'])
     def log_in():
         return redirect(url_for('blueprint.blueprint_get', step=1, blueprint=select_random_blueprint()))
 
     @blueprint.route('/log_off', methods=['POST'])
     def log_off():
-        state["block_locations_by_step"].clear()
+        stations.get(get_station_id()).clear_block_locations()
         return redirect(url_for('index'))
 
-def register_blueprint_routes(blueprint: Blueprint, pick_by_light_controller: PickByLightController) -> None:
+def register_blueprint_routes(blueprint: Blueprint, stations: StationRegistry) -> None:
     @blueprint.route('/blueprint', methods=['POST'])
     def blueprint_post():
         if 'step' not in request.form or 'blueprint' not in request.form:
             return redirect(url_for('index'))
         step = int(request.form['step'])
         blueprint_name = request.form['blueprint']
+        # Acknowledgments after this one are handled by the next page
+        ack_cursor = request.form.get('ack_cursor', type=int)
+        ack_epoch = request.form.get('ack_epoch')
+        trace_id = request.form.get('trace_id')
+        stations.get(get_station_id()).record_trace_hop(trace_id, "navigation", page="blueprint")
 
         if request.form.get('direction') == 'back':
-            return redirect(url_for('blueprint.blueprint_get', step=max(1, step-1), blueprint=blueprint_name))
-        return redirect(url_for('blueprint.blueprint_get', step=step+1, blueprint=blueprint_name))
+            return redirect(url_for('blueprint.blueprint_get', step=max(1, step-1), blueprint=blueprint_name, ack_cursor=ack_cursor, ack_epoch=ack_epoch, trace_id=trace_id))
+        return redirect(url_for('blueprint.blueprint_get', step=step+1, blueprint=blueprint_name, ack_cursor=ack_cursor, ack_epoch=ack_epoch, trace_id=trace_id))
 
     @blueprint.route('/blueprint', methods=['GET'])
     def blueprint_get():
@@ -75,62 +176,131 @@ def register_blueprint_routes(blueprint: Blueprint, pick_by_light_controller: Pi
         if 'step' not in request.args:
             return redirect(url_for('blueprint.blueprint_get', step=1, blueprint=blueprint_name))
         step = int(request.args.get('step', 1))
+        station = stations.get(get_station_id())
+        trace_id = request.args.get('trace_id')
 
         steps = load_blueprint(blueprint_name)
         max_steps = len(steps)
         if step > max_steps:
-            return redirect(url_for('blueprint.control_get', blueprint=blueprint_name))
+            return redirect(url_for('blueprint.control_get', blueprint=blueprint_name, ack_cursor=request.args.get('ack_cursor', type=int),
+                                    ack_epoch=request.args.get('ack_epoch'), trace_id=trace_id))
+        render_start = time.time()
 
         image = render_blueprint(steps[:step])
+        location, picks, look_ahead = highlight_step(station, steps, step)
 
-        location = pick_by_light_controller.get_block_location(length=steps[step-1][2], width=steps[step-1][3], color=steps[step-1][4])
-
-        if location is None:
-            warning = "Der benötigte Klemmbaustein ist nicht im Zwischenlager vorhanden"
-            return render_template('blueprint.html',
-                                  image=image,
-                                  step=step,
-                                  max_steps=max_steps,
-                                  blueprint=blueprint_name,
-                                  warning=warning)
-        else:
-            pick_by_light_controller.show_block(location)
-            #pick_by_light_controller.remove_block(location)
-            store_block_location(step, location)
-
+        station.record_trace_hops(trace_id, [("render_start", render_start, {"page": "blueprint"}),
+                                             ("rendered", time.time(), {})])
         return render_template('blueprint.html',
                               image=image,
                               step=step,
                               max_steps=max_steps,
-                              blueprint=blueprint_name)
+                              blueprint=blueprint_name,
+                              warning=MISSING_BLOCK_WARNING if location is None else None,
+                              picks=picks,
+                              look_ahead=look_ahead,
+                              ack_cursor=get_ack_cursor(station, request.args),
+                              ack_epoch=station.acknowledge_channel.epoch,
+                              trace_id=trace_id)
+
+    @blueprint.route('/blueprint/api/<blueprint_name>/<int:step>', methods=['GET'])
+    def blueprint_step(blueprint_name: str, step: int):
+        # Free of side effects, so pages can prefetch neighbouring steps
+        steps = load_blueprint(blueprint_name)
+        if not 1 <= step <= len(steps):
+            return jsonify({"error": f"Step {step} does not exist"}), 404
+        x, y, length, width, color = steps[step-1]
+        return jsonify({
+            "blueprint": blueprint_name,
+            "step": step,
+            "max_steps": len(steps),
+            "brick": {"x": x, "y": y, "length": length, "width": width, "color": color},
+            "image_url": url_for('blueprint.blueprint_image', blueprint_name=blueprint_name, step=step,
+                                 v=steps_digest(steps[:step])),
+            "page_url": url_for('blueprint.blueprint_get', blueprint=blueprint_name, step=step)
+        })
 
-def register_control_routes(blueprint: Blueprint, pick_by_light_controller: PickByLightController) -> None:
+    @blueprint.route('/blueprint/api/<blueprint_name>/<int:step>/highlight', methods=['POST'])
+    def blueprint_highlight(blueprint_name: str, step: int):
+        steps = load_blueprint(blueprint_name)
+        if not 1 <= step <= len(steps):
+            return jsonify({"error": f"Step {step} does not exist"}), 404
+        station = stations.get(get_station_id())
+        trace_id = (request.get_json(silent=True) or {}).get('trace_id')
+        navigation = time.time()
+
+        location, picks, look_ahead = highlight_step(station, steps, step)
+        station.record_trace_hops(trace_id, [("navigation", navigation, {"page": "viewer"}),
+                                             ("rendered", time.time(), {})])
+        return jsonify({
+            "step": step,
+            "location": location,
+            "picks": picks,
+            "look_ahead": look_ahead,
+            "warning": MISSING_BLOCK_WARNING if location is None else None
+        })
+
+    @blueprint.route('/blueprint/image/<blueprint_name>/<int:step>.png', methods=['GET'])
+    def blueprint_image(blueprint_name: str, step: int):
+        steps = load_blueprint(blueprint_name)
+        if not 1 <= step <= len(steps):
+            return jsonify({"error": f"Step {step} does not exist"}), 404
+        return image_response(render_blueprint_png(tuple(steps[:step])), steps_digest(steps[:step]))
+
+    @blueprint.route('/blueprint/image/<blueprint_name>/control_<view>.png', methods=['GET'])
+    def control_image(blueprint_name: str, view: str):
+        if view not in CONTROL_VIEWS:
+            return jsonify({"error": f"Unknown view {view}, expected one of {CONTROL_VIEWS}"}), 404
+        steps = load_blueprint(blueprint_name)
+        views = render_control_views_png(tuple(steps))
+        return image_response(views[CONTROL_VIEWS.index(view)], steps_digest(steps))
+
+    @blueprint.route('/blueprint/api/<blueprint_name>/manifest', methods=['GET'])
+    def blueprint_manifest(blueprint_name: str):
+        steps = load_blueprint(blueprint_name)
+        response = jsonify(build_manifest(blueprint_name, steps, stations.get(get_station_id()).controller))
+        # Bin locations change with the inventory, so clients revalidate and mostly get a 304
+        response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+def register_control_routes(blueprint: Blueprint, stations: StationRegistry) -> None:
     @blueprint.route('/control', methods=['POST'])
     def control_post():
         if 'step' not in request.form or 'blueprint' not in request.form:
             return redirect(url_for('index'))
         blueprint_name = request.form['blueprint']
+        ack_cursor = request.form.get('ack_cursor', type=int)
+        ack_epoch = request.form.get('ack_epoch')
+        trace_id = request.form.get('trace_id')
+        station = stations.get(get_station_id())
+        station.record_trace_hop(trace_id, "navigation", page="control")
 
         if request.form.get('direction') == 'to_last_step':
             steps = load_blueprint(blueprint_name)
             last_step = len(steps)
-            return redirect(url_for('blueprint.blueprint_get', step=last_step, blueprint=blueprint_name))
+            return redirect(url_for('blueprint.blueprint_get', step=last_step, blueprint=blueprint_name, ack_cursor=ack_cursor, ack_epoch=ack_epoch, trace_id=trace_id))
         elif request.form.get('direction') == 'to_first_step':
-            return redirect(url_for('blueprint.blueprint_get', step=1, blueprint=blueprint_name))
+            return redirect(url_for('blueprint.blueprint_get', step=1, blueprint=blueprint_name, ack_cursor=ack_cursor, ack_epoch=ack_epoch, trace_id=trace_id))
         else:
             steps = load_blueprint(blueprint_name)
             #remove_used_blocks(steps, pick_by_light_controller=pick_by_light_controller)
-            remove_stored_blocks(pick_by_light_controller)
-            return redirect(url_for('blueprint.blueprint_get', step=1, blueprint=select_random_blueprint()))
+            remove_stored_blocks(station)
+            return redirect(url_for('blueprint.blueprint_get', step=1, blueprint=select_random_blueprint(), ack_cursor=ack_cursor, ack_epoch=ack_epoch, trace_id=trace_id))
 
     @blueprint.route('/control', methods=['GET'])
     def control_get():
         if 'blueprint' not in request.args:
             return redirect(url_for('index'))
         blueprint_name = request.args['blueprint']
+        station = stations.get(get_station_id())
+        trace_id = request.args.get('trace_id')
+        render_start = time.time()
 
         steps = load_blueprint(blueprint_name)
         image_front, image_back, image_right, image_left = render_control_views(steps)
+        station.record_trace_hops(trace_id, [("render_start", render_start, {"page": "control"}),
+                                             ("rendered", time.time(), {})])
         return render_template('control.html',
                               image_front=image_front,
                               image_right=image_right,
@@ -138,42 +308,77 @@ def register_control_routes(blueprint: Blueprint, pick_by_light_controller: Pick
                               image_left=image_left,
                               step=len(steps)+1,
                               max_steps=len(steps),
-                              blueprint=blueprint_name)
+                              blueprint=blueprint_name,
+                              ack_cursor=get_ack_cursor(station, request.args),
+                              ack_epoch=station.acknowledge_channel.epoch,
+                              trace_id=trace_id)
 
 
     @blueprint.route('/control/exit', methods=['POST', 'GET'])
     def control_exit():
-        remove_stored_blocks(pick_by_light_controller)
+        remove_stored_blocks(stations.get(get_station_id()))
         return redirect(url_for('index'))
 
 
-def register_auto_acknowledge_routes(blueprint: Blueprint):
+def register_auto_acknowledge_routes(blueprint: Blueprint, stations: StationRegistry):
     @blueprint.route("/auto_acknowledge", methods=["GET"])
     def get_auto_acknowledge():
-        global state
-        print(f"GET auto_acknowledge - current state: {state}")
-
-        if not state.get("auto_acknowledged", False):
+        station = stations.get(get_station_id())
+        acknowledge_channel = station.acknowledge_channel
+        if 'cursor' in request.args:
+            # Every event after the client's cursor, in order
+            cursor = acknowledge_channel.resume_cursor(request.args.get('cursor', type=int), request.args.get('epoch'))
+            events = acknowledge_channel.read(cursor)
+            for event in events:
+                station.record_trace_hop(event.get("trace_id"), "delivered", via="poll")
+            return jsonify({
+                "auto_acknowledged": bool(events),
+                "direction": events[0]["direction"] if events else "next",
+                "events": events,
+                "cursor": events[-1]["seq"] if events else cursor,
+                "epoch": acknowledge_channel.epoch
+            })
+
+        # Cursorless clients get each event once, oldest first
+        event = acknowledge_channel.consume_next()
+        if event is None:
             return jsonify({"auto_acknowledged": False, "direction": "next"})
-
-        direction = state.get("auto_direction", "next")
-
-        # Reset state after acknowledgement has been processed
-        state["auto_acknowledged"] = False
-        state["auto_direction"] = "next"
-
-        print(f"Auto acknowledgment processed with direction: {direction}")
+        station.record_trace_hop(event.get("trace_id"), "delivered", via="poll")
 
         return jsonify({
             "auto_acknowledged": True,
-            "direction": direction
+            "direction": event["direction"],
+            "ack_type": event["ack_type"],
+            "seq": event["seq"]
         })
 
+    @blueprint.route("/auto_acknowledge/stream", methods=["GET"])
+    def stream_auto_acknowledge():
+        station = stations.get(get_station_id())
+        acknowledge_channel = station.acknowledge_channel
+        # EventSource resends the last id it saw when it reconnects
+        cursor, epoch = parse_event_id(request.headers.get("Last-Event-ID"))
+        if cursor is None:
+            cursor, epoch = request.args.get("cursor", type=int), request.args.get("epoch")
+        cursor = acknowledge_channel.resume_cursor(cursor, epoch)
+
+        def events(cursor: int):
+            yield "retry: 1000\n\n"
+            while True:
+                pending = acknowledge_channel.wait(cursor, KEEPALIVE_SECONDS)
+                if not pending:
+                    yield ": keep-alive\n\n"
+                    continue
+                for event in pending:
+                    cursor = event["seq"]
+                    station.record_trace_hop(event.get("trace_id"), "delivered", via="stream")
+                    yield f"id: {acknowledge_channel.epoch}:{cursor}\ndata: {json.dumps(event)}\n\n"
+
+        return Response(events(cursor), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
     @blueprint.route("/auto_acknowledge", methods=["POST"])
     def set_auto_acknowledge():
-        global state
-        print(f"POST auto_acknowledge - current state before: {state}")
-
         # More robust handling of request data
         if request.is_json:
             data = request.get_json(silent=True) or {}
@@ -183,41 +388,92 @@ def register_auto_acknowledge_routes(blueprint: Blueprint):
 
         print(f"Received data: {data}")
 
+        station = stations.get(get_station_id())
         ack_type = data.get("type")
         direction = data.get("direction", "next")
-
-        if ack_type == "voice" and state.get("auto_voice_ack", False):
-            state["auto_acknowledged"] = True
-            state["auto_direction"] = direction
-            print(f"Voice acknowledgment received with direction: {direction}")
-        elif ack_type == "gesture" and state.get("auto_gesture_ack", False):
-            state["auto_acknowledged"] = True
-            state["auto_direction"] = direction
-            print(f"Gesture acknowledgment received with direction: {direction}")
-        elif not ack_type:
-            # Direct POST request without type specification
-            state["auto_acknowledged"] = True
-            state["auto_direction"] = direction
-            print(f"Direct acknowledgment received with direction: {direction}")
-
-        print(f"POST auto_acknowledge - current state after: {state}")
+        event = publish_acknowledgment(station, data)
+        accepted = event is not None
 
         return jsonify({
-            "auto_acknowledged": state.get("auto_acknowledged", False),
-            "direction": state.get("auto_direction", "next"),
+            "auto_acknowledged": accepted,
+            "direction": direction,
             "ack_type": ack_type,
-            "state_debug": state
+            "station": station.station_id,
+            "seq": event["seq"] if event else None
         })
 
+    @blueprint.route("/auto_acknowledge/ingest", methods=["POST"])
+    def ingest_auto_acknowledge():
+        # One long-running request carrying a JSON object per line, read as the lines arrive.
+        # Each line is answered on the streamed response right away, with the id the client gave it.
+        def answers():
+            for line in request.stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    print(f"Ignoring malformed acknowledgment line: {line[:80]!r}")
+                    yield json.dumps({"id": None, "error": "malformed line"}) + "\n"
+                    continue
+                station = stations.get(data.get("station") or DEFAULT_STATION)
+                event = publish_acknowledgment(station, data)
+                yield json.dumps({
+                    "id": data.get("id"),
+                    "auto_acknowledged": event is not None,
+                    "station": station.station_id,
+                    "seq": event["seq"] if event else None
+                }) + "\n"
+
+        return Response(stream_with_context(answers()), mimetype="application/x-ndjson",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
     @blueprint.route("/settings/update", methods=["POST"])
     def update_settings():
-        state["auto_gesture_ack"] = "autoGestureAck" in request.form
-        state["auto_voice_ack"] = "autoVoiceAck" in request.form
+        try:
+            look_ahead = int(request.form.get("lookAhead", 1))
+        except ValueError:
+            look_ahead = 1
+        stations.get(get_station_id()).update_settings(
+            auto_gesture_ack="autoGestureAck" in request.form,
+            auto_voice_ack="autoVoiceAck" in request.form,
+            look_ahead=min(max(look_ahead, 1), MAX_LOOK_AHEAD)
+        )
         return redirect(url_for("index"))
 
     @blueprint.route("/settings/current", methods=["GET"])
     def get_current_settings():
+        station = stations.get(get_station_id())
+        settings = station.get_settings()
         return jsonify({
-            "auto_gesture_ack": state["auto_gesture_ack"],
-            "auto_voice_ack": state["auto_voice_ack"],
+            "station": station.station_id,
+            "auto_gesture_ack": settings["auto_gesture_ack"],
+            "auto_voice_ack": settings["auto_voice_ack"],
+            "look_ahead": settings["look_ahead"],
         })
+
+
+def register_trace_routes(blueprint: Blueprint, stations: StationRegistry) -> None:
+    @blueprint.route("/traces", methods=["GET"])
+    def get_traces():
+        # Only filter when asked to, the browser session's station is no default here
+        limit = min(request.args.get("limit", type=int, default=20), MAX_TRACE_RESULTS)
+        traces = stations.store.read_traces(request.args.get("station"), limit)
+        return jsonify({"traces": [summarize_trace(trace) for trace in traces]})
+
+    @blueprint.route("/traces/<trace_id>", methods=["GET"])
+    def get_trace(trace_id: str):
+        trace = stations.store.read_trace(trace_id)
+        if trace is None:
+            return jsonify({"error": f"Trace {trace_id} not found"}), 404
+        return jsonify(summarize_trace(trace))
+
+    @blueprint.route("/traces/<trace_id>/<hop>", methods=["POST"])
+    def record_trace_hop(trace_id: str, hop: str):
+        # Pages may only report their own hops, and only for traces an acknowledgment started
+        if hop not in BROWSER_HOPS:
+            return jsonify({"error": f"Unknown browser hop {hop}"}), 400
+        if not stations.get(get_station_id()).record_trace_hop(trace_id, hop):
+            return jsonify({"error": f"Trace {trace_id} not found"}), 404
+        return "", 204
@@ -2,11 +2,13 @@ from typing import List, Tuple
 import os
 import random
 import csv
+from metrics.registry import timed
 
 
 BLUEPRINT_PATH = "blueprints"
 FILE_EXTENSION = ".csv"
 
+@timed("load_blueprint")
 def load_blueprint(name: str) -> List[Tuple[int, int, int, int, str]]:
     with open(os.path.join(BLUEPRINT_PATH, name + FILE_EXTENSION), 'r', newline='') as file:
         return [(int(row[0]), int(row[1]), int(row[2]), int(row[3]), row[4]) for row in csv.reader(file)]
@@ -0,0 +1,49 @@
+import hashlib
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+from flask import url_for
+from blueprint.render import CONTROL_VIEWS
+from pick_by_light.pick_by_light_controller import PickByLightController
+
+
+def steps_digest(steps: List[Tuple]) -> str:
+    """Content hash of a list of steps, changes whenever one of them changes."""
+    return hashlib.sha1(repr(list(steps)).encode()).hexdigest()[:16]
+
+
+def normalize_part(length: int, width: int, color: str) -> Tuple[int, int, str]:
+    """Part key as the inventory stores it, the shorter side first."""
+    return (length, width, color) if length <= width else (width, length, color)
+
+
+def build_manifest(blueprint_name: str, steps: List[Tuple], pick_by_light_controller: PickByLightController) -> Dict[str, Any]:
+    """Describe a whole blueprint: its steps with bin locations and image URLs, the bill of materials and the control views."""
+    parts = Counter(normalize_part(length, width, color) for _, _, length, width, color in steps)
+    part_keys = list(parts)
+    # One inventory lookup for all parts, however many steps use them
+    locations = dict(zip(part_keys, pick_by_light_controller.get_block_locations(part_keys)))
+    blueprint_hash = steps_digest(steps)
+
+    return {
+        "blueprint": blueprint_name,
+        "hash": blueprint_hash,
+        "max_steps": len(steps),
+        "steps": [{
+            "step": step,
+            "brick": {"x": x, "y": y, "length": length, "width": width, "color": color},
+            "location": locations[normalize_part(length, width, color)],
+            "image_url": url_for('blueprint.blueprint_image', blueprint_name=blueprint_name, step=step,
+                                 v=steps_digest(steps[:step]))
+        } for step, (x, y, length, width, color) in enumerate(steps, start=1)],
+        "bill_of_materials": [{
+            "length": length,
+            "width": width,
+            "color": color,
+            "count": parts[(length, width, color)],
+            "location": locations[(length, width, color)]
+        } for length, width, color in part_keys],
+        "control_views": {
+            view: url_for('blueprint.control_image', blueprint_name=blueprint_name, view=view, v=blueprint_hash)
+            for view in CONTROL_VIEWS
+        }
+    }
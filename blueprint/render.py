@@ -4,8 +4,11 @@ import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import io
 import base64
+import threading
+from functools import lru_cache
 from typing import List, Tuple, Any, Optional
 import numpy as np
+from metrics.registry import RENDER_STAGE_SECONDS, stage
 
 STUD_RADIUS: float = 0.3
 STUD_SPACING: float = 1.0
@@ -13,6 +16,13 @@ STUD_HEIGHT: float = 0.177
 
 BRICK_HEIGHT: float = 1.211
 
+IMAGE_CACHE_SIZE: int = 256  # Rendered step images kept in memory
+CONTROL_VIEW_CACHE_SIZE: int = 16  # Blueprints whose control views are kept in memory
+CONTROL_VIEWS: Tuple[str, ...] = ("front", "back", "right", "left")
+
+# pyplot keeps global state, so figures are built one at a time
+RENDER_LOCK = threading.Lock()
+
 def draw_studs(ax: Any, x: float, y: float, width: float, height: float, color: str, alpha: float = 1.0) -> None:
     for i_j in [(i, j) for i in range(int(width/STUD_SPACING)) for j in range(int(height/STUD_SPACING))]:
         stud_x = x + (i_j[0] + 0.5) * STUD_SPACING
@@ -43,18 +53,28 @@ def setup_axes() -> Tuple[Any, Any]:
     ax.axis('off')
     return fig, ax
 
-def convert_to_base64(fig: Any) -> str:
+def convert_to_png(fig: Any) -> bytes:
     buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', pad_inches=0)
-    buf.seek(0)
-    image = base64.b64encode(buf.getvalue()).decode('utf-8')
+    fig.savefig(buf, format='png', bbox_inches='tight', pad_inches=0)
     plt.close(fig)
-    return image
+    return buf.getvalue()
+
+def convert_to_base64(fig: Any) -> str:
+    return base64.b64encode(convert_to_png(fig)).decode('utf-8')
+
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def render_blueprint_png(steps: Tuple[Tuple, ...]) -> bytes:
+    """PNG of the assembly after the given steps, cached because every step is shown again and again."""
+    with RENDER_LOCK:
+        with stage(RENDER_STAGE_SECONDS, view="blueprint", stage="setup"):
+            fig, ax = setup_axes()
+        with stage(RENDER_STAGE_SECONDS, view="blueprint", stage="draw"):
+            render_step(ax, 1, list(steps))
+        with stage(RENDER_STAGE_SECONDS, view="blueprint", stage="encode"):
+            return convert_to_png(fig)
 
 def render_blueprint(steps: List[Tuple]) -> str:
-    fig, ax = setup_axes()
-    render_step(ax, 1, steps)
-    return convert_to_base64(fig)
+    return base64.b64encode(render_blueprint_png(tuple(steps))).decode('utf-8')
 
 def create_new_layer(old_layer: Optional[np.ndarray] = None) -> np.ndarray:
     layer = np.full((10, 10), "stud", dtype=object)
@@ -97,16 +117,22 @@ def process_cell(ax: Any, cell: Any, i: int, j: int, k: int, cube_representation
         alpha = 0.1 if i <= 0 else 1.0
         draw_stud_on_layer(ax, k, j*BRICK_HEIGHT, color, alpha)
 
-def render_cube_view(cube_representation: np.ndarray) -> str:
-    fig, ax = setup_axes()
-    for i, layer in enumerate(cube_representation):
-        for j in range(layer.shape[0]):
-            for k in range(layer.shape[1]):
-                process_cell(ax, layer[j,k], i, j, k, cube_representation)
-    return convert_to_base64(fig)
-
-def render_control_views(steps: List[Tuple]) -> Tuple[str, str, str, str]:
-    cube_representation = blueprint_to_cube(steps)
+def render_cube_view(cube_representation: np.ndarray) -> bytes:
+    with RENDER_LOCK:
+        with stage(RENDER_STAGE_SECONDS, view="control", stage="setup"):
+            fig, ax = setup_axes()
+        with stage(RENDER_STAGE_SECONDS, view="control", stage="draw"):
+            for i, layer in enumerate(cube_representation):
+                for j in range(layer.shape[0]):
+                    for k in range(layer.shape[1]):
+                        process_cell(ax, layer[j,k], i, j, k, cube_representation)
+        with stage(RENDER_STAGE_SECONDS, view="control", stage="encode"):
+            return convert_to_png(fig)
+
+@lru_cache(maxsize=CONTROL_VIEW_CACHE_SIZE)
+def render_control_views_png(steps: Tuple[Tuple, ...]) -> Tuple[bytes, bytes, bytes, bytes]:
+    """PNGs of the finished assembly in the order of ``CONTROL_VIEWS``."""
+    cube_representation = blueprint_to_cube(list(steps))
     cube_representation_flipped_front = np.flip(np.transpose(cube_representation, axes=(1, 0, 2)), axis=0)
     front_view = render_cube_view(cube_representation_flipped_front)
     cube_representation_flipped_back = np.flip(np.flip(cube_representation_flipped_front, axis=0), axis=2)
@@ -117,3 +143,8 @@ def render_control_views(steps: List[Tuple]) -> Tuple[str, str, str, str]:
     left_view = render_cube_view(cube_representation_flipped_left)
 
     return front_view, back_view, right_view, left_view
+
+def render_control_views(steps: List[Tuple]) -> Tuple[str, str, str, str]:
+    front_view, back_view, right_view, left_view = (base64.b64encode(view).decode('utf-8')
+                                                    for view in render_control_views_png(tuple(steps)))
+    return front_view, back_view, right_view, left_view
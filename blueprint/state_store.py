@@ -0,0 +1,417 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from blueprint.tracing import MAX_TRACES, TraceHop
+
+RETENTION_SECONDS = 30.0  # Acknowledgments older than this are no longer delivered
+MAX_EVENTS = 64           # Acknowledgments kept per station
+PRUNE_EVERY = 32          # New traces between two prunings of the trace ring buffer
+
+
+def new_epoch() -> str:
+    """Identifier of a fresh acknowledgment log, whose sequence numbers start again at 1."""
+    return uuid.uuid4().hex[:12]
+
+
+class StateStore(ABC):
+    """Storage for the settings, pick ledger and acknowledgment log of all stations."""
+
+    # Whether other processes can change the state behind this process' back
+    shared = False
+    # Sequence numbers are only comparable within one epoch; a store that loses its
+    # acknowledgment log starts a new one, so clients know to reset their cursor
+    epoch: str
+
+    def data_version(self) -> int:
+        """A number that changes when another process writes to a shared store."""
+        return 0
+
+    @abstractmethod
+    def load_settings(self, station_id: str) -> Dict[str, Any]:
+        """Return the settings stored for a station, empty if there are none."""
+
+    @abstractmethod
+    def update_settings(self, station_id: str, settings: Dict[str, Any]) -> None:
+        """Merge the given settings into the station's settings."""
+
+    @abstractmethod
+    def store_pick(self, station_id: str, step: int, location: int) -> None:
+        """Remember the bin a step was picked from, replacing an earlier visit of the step."""
+
+    @abstractmethod
+    def pop_picks(self, station_id: str) -> List[int]:
+        """Return the bin location of every stored pick and forget them."""
+
+    @abstractmethod
+    def append_event(self, station_id: str, event: Dict[str, Any],
+                     trace_hops: Optional[List[TraceHop]] = None) -> Dict[str, Any]:
+        """Append an acknowledgment with the station's next sequence number and return it.
+
+        ``trace_hops`` start the trace of the event's ``trace_id`` in the same write,
+        followed by a ``published`` hop with the sequence number.
+        """
+
+    @abstractmethod
+    def read_events(self, station_id: str, cursor: int) -> List[Dict[str, Any]]:
+        """Return the retained acknowledgments after ``cursor`` in order."""
+
+    @abstractmethod
+    def last_seq(self, station_id: str) -> int:
+        """Return the sequence number of the station's latest acknowledgment."""
+
+    @abstractmethod
+    def consume_next_event(self, station_id: str) -> Optional[Dict[str, Any]]:
+        """Return the next acknowledgment for cursorless clients, each one only once."""
+
+    @abstractmethod
+    def append_trace_hops(self, station_id: str, trace_id: str, hops: List[TraceHop], create: bool = False) -> bool:
+        """Record when an acknowledgment trace reached some hops in one write, keeping the first time of a hop.
+
+        Only ``create`` starts a new trace; hops of unknown traces are dropped and False is returned.
+        """
+
+    @abstractmethod
+    def read_traces(self, station_id: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """Return the latest traces, newest first, optionally only those of one station."""
+
+    @abstractmethod
+    def read_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """Return a single trace with its ``trace_id``, ``station`` and list of ``hops``."""
+
+
+class MemoryStateStore(StateStore):
+    def __init__(self, retention_seconds: float = RETENTION_SECONDS, max_events: int = MAX_EVENTS,
+                 max_traces: int = MAX_TRACES) -> None:
+        """Keep all station state in the memory of this process, a new epoch on every start."""
+        self.epoch = new_epoch()
+        self.retention_seconds = retention_seconds
+        self.max_events = max_events
+        self.max_traces = max_traces
+        self.lock = threading.Lock()
+        self.settings: Dict[str, Dict[str, Any]] = {}
+        self.picks: Dict[str, Dict[int, int]] = {}
+        self.events: Dict[str, Deque[Tuple[float, Dict[str, Any]]]] = {}
+        self.last_seqs: Dict[str, int] = {}
+        self.legacy_cursors: Dict[str, int] = {}
+        self.traces: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def load_settings(self, station_id: str) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.settings.get(station_id, {}))
+
+    def update_settings(self, station_id: str, settings: Dict[str, Any]) -> None:
+        with self.lock:
+            self.settings.setdefault(station_id, {}).update(settings)
+
+    def store_pick(self, station_id: str, step: int, location: int) -> None:
+        with self.lock:
+            self.picks.setdefault(station_id, {})[step] = location
+
+    def pop_picks(self, station_id: str) -> List[int]:
+        with self.lock:
+            return list(self.picks.pop(station_id, {}).values())
+
+    def append_event(self, station_id: str, event: Dict[str, Any],
+                     trace_hops: Optional[List[TraceHop]] = None) -> Dict[str, Any]:
+        with self.lock:
+            seq = self._last_seq(station_id) + 1
+            self.last_seqs[station_id] = seq
+            event = dict(event, seq=seq)
+            self._events(station_id).append((time.monotonic(), event))
+            if trace_hops is not None and event.get("trace_id"):
+                self._append_trace_hops(station_id, event["trace_id"],
+                                        trace_hops + [("published", time.time(), {"seq": seq})], True)
+            return event
+
+    def read_events(self, station_id: str, cursor: int) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [event for event in self._retained_events(station_id) if event["seq"] > cursor]
+
+    def last_seq(self, station_id: str) -> int:
+        with self.lock:
+            return self._last_seq(station_id)
+
+    def consume_next_event(self, station_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            cursor = self.legacy_cursors.setdefault(station_id, self._last_seq(station_id))
+            for event in self._retained_events(station_id):
+                if event["seq"] > cursor:
+                    self.legacy_cursors[station_id] = event["seq"]
+                    return event
+            return None
+
+    def append_trace_hops(self, station_id: str, trace_id: str, hops: List[TraceHop], create: bool = False) -> bool:
+        with self.lock:
+            return self._append_trace_hops(station_id, trace_id, hops, create)
+
+    def _append_trace_hops(self, station_id: str, trace_id: str, hops: List[TraceHop], create: bool) -> bool:
+        trace = self.traces.get(trace_id)
+        if trace is None:
+            if not create:
+                return False
+            trace = self.traces[trace_id] = {"trace_id": trace_id, "station": station_id, "hops": {}}
+            while len(self.traces) > self.max_traces:
+                self.traces.popitem(last=False)
+        for hop, at, info in hops:
+            trace["hops"].setdefault(hop, dict(info, hop=hop, at=at))
+        return True
+
+    def read_traces(self, station_id: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        with self.lock:
+            traces = [trace for trace in reversed(self.traces.values())
+                      if station_id is None or trace["station"] == station_id][:limit]
+            return [self._copy_trace(trace) for trace in traces]
+
+    def read_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            trace = self.traces.get(trace_id)
+            return self._copy_trace(trace) if trace else None
+
+    def _copy_trace(self, trace: Dict[str, Any]) -> Dict[str, Any]:
+        return {"trace_id": trace["trace_id"], "station": trace["station"],
+                "hops": [dict(hop) for hop in trace["hops"].values()]}
+
+    def _last_seq(self, station_id: str) -> int:
+        if station_id not in self.last_seqs:
+            self.last_seqs[station_id] = 0
+        return self.last_seqs[station_id]
+
+    def _events(self, station_id: str) -> Deque[Tuple[float, Dict[str, Any]]]:
+        if station_id not in self.events:
+            self.events[station_id] = deque(maxlen=self.max_events)
+        return self.events[station_id]
+
+    def _retained_events(self, station_id: str) -> List[Dict[str, Any]]:
+        events = self._events(station_id)
+        oldest = time.monotonic() - self.retention_seconds
+        while events and events[0][0] < oldest:
+            events.popleft()
+        return [event for _, event in events]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS station_settings (
+    station_id TEXT PRIMARY KEY,
+    settings TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS station_picks (
+    station_id TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    location INTEGER NOT NULL,
+    PRIMARY KEY (station_id, step)
+);
+CREATE TABLE IF NOT EXISTS station_cursors (
+    station_id TEXT PRIMARY KEY,
+    last_seq INTEGER NOT NULL,
+    legacy_cursor INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ack_events (
+    station_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    event TEXT NOT NULL,
+    PRIMARY KEY (station_id, seq)
+);
+CREATE TABLE IF NOT EXISTS traces (
+    id INTEGER PRIMARY KEY,
+    trace_id TEXT NOT NULL UNIQUE,
+    station_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS traces_by_station ON traces (station_id, id);
+CREATE TABLE IF NOT EXISTS trace_hops (
+    trace_id TEXT NOT NULL,
+    station_id TEXT NOT NULL,
+    hop TEXT NOT NULL,
+    at REAL NOT NULL,
+    info TEXT NOT NULL,
+    PRIMARY KEY (trace_id, hop)
+);
+"""
+
+
+class SqliteStateStore(StateStore):
+    shared = True
+
+    def __init__(self, path: str, retention_seconds: float = RETENTION_SECONDS, max_events: int = MAX_EVENTS,
+                 max_traces: int = MAX_TRACES) -> None:
+        """Keep all station state in an SQLite database in WAL mode.
+
+        Any number of worker processes can open the same file. Every process and
+        thread gets its own connection, and writes that read before they update run
+        in ``BEGIN IMMEDIATE`` transactions so sequence numbers never collide.
+        """
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self.max_events = max_events
+        self.max_traces = max_traces
+        self.local = threading.local()
+        self.new_traces = 0
+
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        # Sequence numbers are persisted with the events, so the epoch lasts as long as the file
+        connection.execute("INSERT OR IGNORE INTO store_meta (key, value) VALUES ('epoch', ?)", (new_epoch(),))
+        self.epoch = connection.execute("SELECT value FROM store_meta WHERE key = 'epoch'").fetchone()[0]
+        # Hops written before traces had their own table
+        connection.execute("DELETE FROM trace_hops WHERE trace_id NOT IN (SELECT trace_id FROM traces)")
+
+    def data_version(self) -> int:
+        # Changes with every commit of another connection, without touching any table
+        return self._connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def load_settings(self, station_id: str) -> Dict[str, Any]:
+        row = self._connection().execute(
+            "SELECT settings FROM station_settings WHERE station_id = ?", (station_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def update_settings(self, station_id: str, settings: Dict[str, Any]) -> None:
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT settings FROM station_settings WHERE station_id = ?", (station_id,)).fetchone()
+            merged = dict(json.loads(row[0]) if row else {}, **settings)
+            connection.execute("INSERT OR REPLACE INTO station_settings (station_id, settings) VALUES (?, ?)",
+                               (station_id, json.dumps(merged)))
+
+    def store_pick(self, station_id: str, step: int, location: int) -> None:
+        with self._transaction() as connection:
+            connection.execute("INSERT OR REPLACE INTO station_picks (station_id, step, location) VALUES (?, ?, ?)",
+                               (station_id, step, location))
+
+    def pop_picks(self, station_id: str) -> List[int]:
+        with self._transaction() as connection:
+            rows = connection.execute(
+                "SELECT location FROM station_picks WHERE station_id = ?", (station_id,)).fetchall()
+            connection.execute("DELETE FROM station_picks WHERE station_id = ?", (station_id,))
+            return [location for (location,) in rows]
+
+    def append_event(self, station_id: str, event: Dict[str, Any],
+                     trace_hops: Optional[List[TraceHop]] = None) -> Dict[str, Any]:
+        with self._transaction() as connection:
+            seq = self._cursors(connection, station_id)[0] + 1
+            event = dict(event, seq=seq)
+            now = time.time()
+            connection.execute("INSERT INTO ack_events (station_id, seq, created_at, event) VALUES (?, ?, ?, ?)",
+                               (station_id, seq, now, json.dumps(event)))
+            connection.execute("UPDATE station_cursors SET last_seq = ? WHERE station_id = ?", (seq, station_id))
+            connection.execute("DELETE FROM ack_events WHERE station_id = ? AND (created_at < ? OR seq <= ?)",
+                               (station_id, now - self.retention_seconds, seq - self.max_events))
+            if trace_hops is not None and event.get("trace_id"):
+                self._insert_trace_hops(connection, station_id, event["trace_id"],
+                                        trace_hops + [("published", now, {"seq": seq})], True)
+            return event
+
+    def read_events(self, station_id: str, cursor: int) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT event FROM ack_events WHERE station_id = ? AND seq > ? AND created_at >= ? ORDER BY seq",
+            (station_id, cursor, time.time() - self.retention_seconds)).fetchall()
+        return [json.loads(event) for (event,) in rows]
+
+    def last_seq(self, station_id: str) -> int:
+        row = self._connection().execute(
+            "SELECT last_seq FROM station_cursors WHERE station_id = ?", (station_id,)).fetchone()
+        if row:
+            return row[0]
+        with self._transaction() as connection:
+            return self._cursors(connection, station_id)[0]
+
+    def consume_next_event(self, station_id: str) -> Optional[Dict[str, Any]]:
+        with self._transaction() as connection:
+            _, legacy_cursor = self._cursors(connection, station_id)
+            row = connection.execute(
+                "SELECT seq, event FROM ack_events WHERE station_id = ? AND seq > ? AND created_at >= ? "
+                "ORDER BY seq LIMIT 1",
+                (station_id, legacy_cursor, time.time() - self.retention_seconds)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE station_cursors SET legacy_cursor = ? WHERE station_id = ?", (row[0], station_id))
+            return json.loads(row[1])
+
+    def append_trace_hops(self, station_id: str, trace_id: str, hops: List[TraceHop], create: bool = False) -> bool:
+        with self._transaction() as connection:
+            return self._insert_trace_hops(connection, station_id, trace_id, hops, create)
+
+    def read_traces(self, station_id: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        connection = self._connection()
+        if station_id is None:
+            rows = connection.execute("SELECT trace_id FROM traces ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        else:
+            rows = connection.execute("SELECT trace_id FROM traces WHERE station_id = ? ORDER BY id DESC LIMIT ?",
+                                      (station_id, limit)).fetchall()
+        traces = [self.read_trace(trace_id) for (trace_id,) in rows]
+        return [trace for trace in traces if trace is not None]
+
+    def read_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT station_id, hop, at, info FROM trace_hops WHERE trace_id = ? ORDER BY rowid", (trace_id,)).fetchall()
+        if not rows:
+            return None
+        return {"trace_id": trace_id, "station": rows[0][0],
+                "hops": [dict(json.loads(info), hop=hop, at=at) for _, hop, at, info in rows]}
+
+    def _insert_trace_hops(self, connection: sqlite3.Connection, station_id: str, trace_id: str,
+                           hops: List[TraceHop], create: bool) -> bool:
+        if create:
+            if connection.execute("INSERT OR IGNORE INTO traces (trace_id, station_id) VALUES (?, ?)",
+                                  (trace_id, station_id)).rowcount:
+                self.new_traces += 1
+                if self.new_traces % PRUNE_EVERY == 0:
+                    self._prune_traces(connection)
+        elif connection.execute("SELECT 1 FROM traces WHERE trace_id = ?", (trace_id,)).fetchone() is None:
+            return False
+        connection.executemany("INSERT OR IGNORE INTO trace_hops (trace_id, station_id, hop, at, info) VALUES (?, ?, ?, ?, ?)",
+                               [(trace_id, station_id, hop, at, json.dumps(info)) for hop, at, info in hops])
+        return True
+
+    def _prune_traces(self, connection: sqlite3.Connection) -> None:
+        """Ring buffer: drop the traces beyond the newest ``max_traces``, found through the trace id index."""
+        row = connection.execute("SELECT id FROM traces ORDER BY id DESC LIMIT 1 OFFSET ?", (self.max_traces,)).fetchone()
+        if row is None:
+            return
+        connection.execute("DELETE FROM trace_hops WHERE trace_id IN (SELECT trace_id FROM traces WHERE id <= ?)", row)
+        connection.execute("DELETE FROM traces WHERE id <= ?", row)
+
+    def _cursors(self, connection: sqlite3.Connection, station_id: str) -> Tuple[int, int]:
+        connection.execute("INSERT OR IGNORE INTO station_cursors (station_id, last_seq, legacy_cursor) VALUES (?, 0, 0)",
+                           (station_id,))
+        return connection.execute(
+            "SELECT last_seq, legacy_cursor FROM station_cursors WHERE station_id = ?", (station_id,)).fetchone()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not be shared across a fork, so they are keyed by pid as well
+        if getattr(self.local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return self.local.connection
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._connection())
+
+
+class _Transaction:
+    """Context manager running a block in a ``BEGIN IMMEDIATE`` transaction."""
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.connection.execute("COMMIT")
+        else:
+            self.connection.execute("ROLLBACK")
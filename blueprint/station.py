@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from blueprint.acknowledge_channel import AcknowledgeChannel
+from blueprint.state_store import StateStore, MemoryStateStore
+from blueprint.tracing import ENABLED as TRACING_ENABLED, TraceHop
+from pick_by_light.pick_by_light_controller import PickByLightController
+
+DEFAULT_STATION = "default"
+
+DEFAULT_SETTINGS = {
+    "auto_gesture_ack": True,  # Enable by default for better usability
+    "auto_voice_ack": True,    # Enable by default for better usability
+    "look_ahead": 1,           # Number of steps whose bins are lit at once
+}
+
+
+@dataclass
+class StationSession:
+    """State of one assembly station, kept in the registry's state store."""
+    station_id: str
+    controller: PickByLightController
+    store: StateStore
+    acknowledge_channel: AcknowledgeChannel
+
+    def update_settings(self, **settings: Any) -> None:
+        """Change some of the station's settings."""
+        self.store.update_settings(self.station_id, settings)
+
+    def get_settings(self) -> Dict[str, Any]:
+        """Return the station's settings."""
+        return dict(DEFAULT_SETTINGS, **self.store.load_settings(self.station_id))
+
+    def store_block_location(self, step: int, location: int) -> None:
+        """Remember the bin a step was picked from, replacing an earlier visit of the step."""
+        self.store.store_pick(self.station_id, step, location)
+
+    def clear_block_locations(self) -> Counter:
+        """Forget all picks of the current build and return the units taken per location."""
+        return Counter(self.store.pop_picks(self.station_id))
+
+    def record_trace_hops(self, trace_id: Optional[str], hops: List[TraceHop], create: bool = False) -> bool:
+        """Record that an acknowledgment trace reached some hops, in one write.
+
+        Ignored for untraced acknowledgments and with tracing off. Returns whether the trace exists.
+        """
+        if not trace_id or not TRACING_ENABLED:
+            return False
+        return self.store.append_trace_hops(self.station_id, trace_id, hops, create)
+
+    def record_trace_hop(self, trace_id: Optional[str], hop: str, at: Optional[float] = None, **info: Any) -> bool:
+        """Record that an existing acknowledgment trace reached a hop."""
+        return self.record_trace_hops(trace_id, [(hop, time.time() if at is None else at, info)])
+
+
+class StationRegistry:
+    def __init__(self, default_controller: PickByLightController, store: Optional[StateStore] = None) -> None:
+        """Create station sessions on first use and bind them to their LED controller.
+
+        Stations without a controller of their own share ``default_controller``. The
+        registry lock is only held while a session is created; the state itself is
+        locked per operation by ``store``, which defaults to process memory.
+        """
+        self.default_controller = default_controller
+        self.store = store if store is not None else MemoryStateStore()
+        self.controllers: Dict[str, PickByLightController] = {}
+        self.sessions: Dict[str, StationSession] = {}
+        self.lock = threading.Lock()
+        self.shared_warned = False
+
+    def bind_controller(self, station_id: str, controller: PickByLightController) -> None:
+        """Let a station use its own LED strip and inventory."""
+        with self.lock:
+            self.controllers[station_id] = controller
+            if station_id in self.sessions:
+                self.sessions[station_id].controller = controller
+
+    def get(self, station_id: Optional[str] = None) -> StationSession:
+        """Return the session of a station, creating it if necessary."""
+        station_id = station_id or DEFAULT_STATION
+        session = self.sessions.get(station_id)
+        if session is not None:
+            return session
+
+        with self.lock:
+            if station_id not in self.sessions:
+                controller = self.controllers.get(station_id, self.default_controller)
+                sharing = [other for other, session in self.sessions.items() if session.controller is controller]
+                if sharing and not self.shared_warned:
+                    self.shared_warned = True
+                    print(f"⚠️ Station {station_id} shares the LED strip with station {sharing[0]}, their highlights "
+                          f"overwrite each other; give each station its own controller with ASSYS_STATION_CONTROLLERS")
+                self.sessions[station_id] = StationSession(station_id, controller, self.store,
+                                                           AcknowledgeChannel(self.store, station_id))
+            return self.sessions[station_id]
+
+    def station_ids(self) -> List[str]:
+        """Return the IDs of all stations seen so far."""
+        with self.lock:
+            return sorted(self.sessions)
@@ -0,0 +1,48 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+ENABLED = os.environ.get('ASSYS_TRACING', '1').lower() not in ('0', 'false', 'no')
+MAX_TRACES = 256  # Traces kept in the ring buffer of the state store
+
+# Hops of an acknowledgment in the order they happen. The client hops carry the
+# client's clock, all others the server's.
+CLIENT_HOPS = ("frame_captured", "inference_done", "speech_end", "recognized", "detected", "sent")
+SERVER_HOPS = ("received", "published", "rejected", "delivered", "navigation", "render_start", "rendered")
+BROWSER_HOPS = ("page_loaded",)
+TRACE_HOPS = CLIENT_HOPS + SERVER_HOPS + BROWSER_HOPS
+
+TraceHop = Tuple[str, float, Dict[str, Any]]  # hop, time, extra information
+
+
+def received_hops(trace: Dict[str, Any], received_at: float, **info: Any) -> List[TraceHop]:
+    """The client hops of a parsed trace followed by the server's ``received`` hop."""
+    return [(hop, at, {}) for hop, at in trace["hops"].items()] + [("received", received_at, info)]
+
+
+def parse_trace(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the trace of an acknowledgment request, None if it has no valid one."""
+    trace = data.get("trace")
+    if not isinstance(trace, dict) or not isinstance(trace.get("id"), str) or not trace["id"]:
+        return None
+    hops = trace.get("hops") if isinstance(trace.get("hops"), dict) else {}
+    return {
+        "id": trace["id"][:64],
+        "hops": {hop: float(at) for hop, at in hops.items() if hop in CLIENT_HOPS and isinstance(at, (int, float))}
+    }
+
+
+def summarize_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """Order the hops of a trace and add the milliseconds spent since the previous hop."""
+    hops = sorted(trace["hops"], key=lambda hop: TRACE_HOPS.index(hop["hop"]))
+    previous = None
+    for hop in hops:
+        hop["since_previous_ms"] = None if previous is None else round((hop["at"] - previous) * 1000, 1)
+        previous = hop["at"]
+
+    return {
+        "trace_id": trace["trace_id"],
+        "station": trace["station"],
+        "complete": any(hop["hop"] == "page_loaded" for hop in hops),
+        "total_ms": round((hops[-1]["at"] - hops[0]["at"]) * 1000, 1) if hops else None,
+        "hops": hops
+    }
@@ -0,0 +1,194 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+import cv2
+
+READ_RETRY_SECONDS = 0.01  # pause after a failed read before asking the camera again
+RELEASE_TIMEOUT = 2.0      # time the capture thread gets to finish its current read
+MOTION_WIDTH = 80          # width of the grayscale thumbnail compared between frames
+MOTION_PIXEL_DELTA = 25    # gray levels a thumbnail pixel must change to count as moving
+
+
+class CapturedFrame(NamedTuple):
+    """A camera frame with the time it was read."""
+    image: Any
+    index: int
+    captured_at: float   # time.time(), for acknowledgment traces
+    captured_tick: float  # time.perf_counter(), for measuring the frame's age
+
+
+class LatestFrameCapture:
+    def __init__(self, cap: cv2.VideoCapture) -> None:
+        """Read a camera on its own thread and hand out only the newest frame.
+
+        The thread drains the camera as fast as it delivers, so frames never pile up
+        in the driver while a frame is being processed. A frame that is replaced
+        before anybody took it counts as dropped.
+        """
+        self.cap = cap
+        # Keep the driver queue as short as the backend allows
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.condition = threading.Condition()
+        self.latest: Optional[CapturedFrame] = None
+        self.captured = 0
+        self.dropped = 0
+        self.failed_reads = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        while self.running and self.cap.isOpened():
+            success, image = self.cap.read()
+            if not success:
+                self.failed_reads += 1
+                time.sleep(READ_RETRY_SECONDS)
+                continue
+            with self.condition:
+                if self.latest is not None:
+                    self.dropped += 1
+                self.captured += 1
+                self.latest = CapturedFrame(image, self.captured, time.time(), time.perf_counter())
+                self.condition.notify()
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def read(self, timeout: Optional[float] = None) -> Optional[CapturedFrame]:
+        """Wait for a frame newer than the last one read and return it.
+
+        Returns ``None`` once the camera is closed, or if no frame arrived within ``timeout``.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.latest is not None or not self.running, timeout)
+            frame, self.latest = self.latest, None
+            return frame
+
+    def is_running(self) -> bool:
+        return self.running
+
+    def release(self) -> None:
+        """Stop the capture thread and close the camera once the thread is done with it."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout=RELEASE_TIMEOUT)
+        if self.thread.is_alive():
+            # Releasing the camera under a blocked read can crash the backend, leave it to the process exit
+            print("⚠️ Camera thread did not stop, not releasing the camera")
+            return
+        self.cap.release()
+
+
+class MotionGate:
+    def __init__(self, threshold: float = 0.01, hold_seconds: float = 1.5, idle_after: float = 30.0) -> None:
+        """Decide from a cheap frame difference whether hand inference is worth running.
+
+        Each frame is shrunk to a small blurred grayscale thumbnail and compared with
+        the previous one. Inference runs while more than ``threshold`` of the
+        thumbnail changes and for ``hold_seconds`` after the last motion or hand, so
+        a hand held still is not lost. After ``idle_after`` seconds without either
+        the station counts as idle. A threshold of 0 lets every frame through.
+
+        All times are taken from the ``now`` of the calls, so a replay can pass video
+        time; the clocks start with the first frame.
+        """
+        self.threshold = threshold
+        self.hold_seconds = hold_seconds
+        self.idle_after = idle_after
+        self.previous = None
+        self.last_motion: Optional[float] = None
+        self.last_hand: Optional[float] = None
+        self.motion = 0.0  # changed fraction of the last frame, for display
+
+    def measure_motion(self, image) -> float:
+        """Return the fraction of the thumbnail that changed since the previous frame."""
+        height, width = image.shape[:2]
+        small = cv2.resize(image, (MOTION_WIDTH, max(1, height * MOTION_WIDTH // width)), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        previous, self.previous = self.previous, gray
+        if previous is None:
+            return 1.0
+        _, changed = cv2.threshold(cv2.absdiff(gray, previous), MOTION_PIXEL_DELTA, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(changed) / changed.size
+
+    def should_infer(self, image, now: Optional[float] = None) -> bool:
+        if self.threshold <= 0:
+            return True
+        now = time.monotonic() if now is None else now
+        if self.last_motion is None:
+            self.last_motion = self.last_hand = now
+        self.motion = self.measure_motion(image)
+        if self.motion >= self.threshold:
+            self.last_motion = now
+            return True
+        return now - max(self.last_motion, self.last_hand) < self.hold_seconds
+
+    def hand_seen(self, now: Optional[float] = None) -> None:
+        self.last_hand = time.monotonic() if now is None else now
+        if self.last_motion is None:
+            self.last_motion = self.last_hand
+
+    def is_idle(self, now: Optional[float] = None) -> bool:
+        if self.threshold <= 0 or self.idle_after <= 0:
+            return False
+        if self.last_motion is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - max(self.last_motion, self.last_hand) >= self.idle_after
+
+
+class StageTimings:
+    def __init__(self, enabled: bool = True) -> None:
+        """Durations of the stages of the frame loop, summarized periodically.
+
+        Disabled timings record nothing, so a loop without reports does not collect
+        durations forever.
+        """
+        self.enabled = enabled
+        self.durations: Dict[str, List[float]] = {}
+        self.counts: Dict[str, int] = {}
+        self.frames = 0
+        self.started = time.perf_counter()
+
+    def record(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        self.durations.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def count(self, event: str) -> None:
+        if not self.enabled:
+            return
+        self.counts[event] = self.counts.get(event, 0) + 1
+
+    def frame_done(self) -> None:
+        self.frames += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        """One line with the frame rate and mean/max milliseconds per stage."""
+        elapsed = self.elapsed()
+        parts = [f"{self.frames / elapsed:.1f} fps" if elapsed > 0 else "0.0 fps"]
+        for stage, durations in self.durations.items():
+            mean_ms = sum(durations) / len(durations) * 1000
+            parts.append(f"{stage} {mean_ms:.1f}/{max(durations) * 1000:.1f} ms")
+        parts.extend(f"{event} {count}" for event, count in self.counts.items())
+        return " | ".join(parts)
+
+    def reset(self) -> None:
+        self.durations.clear()
+        self.counts.clear()
+        self.frames = 0
+        self.started = time.perf_counter()
@@ -0,0 +1,88 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import cv2
+
+BOUNDARY = "frame"
+JPEG_QUALITY = 70
+
+
+class MjpegPreview:
+    def __init__(self, port: int, fps: float = 2.0, host: str = "127.0.0.1") -> None:
+        """Serve annotated frames as an MJPEG stream, for looking at a camera that has no window.
+
+        Open ``http://<host>:<port>/`` in a browser. Frames are only encoded while
+        somebody watches, and at most ``fps`` times per second, so the preview costs
+        nothing on an unattended station.
+        """
+        self.interval = 1.0 / fps
+        self.condition = threading.Condition()
+        self.jpeg: Optional[bytes] = None
+        self.version = 0
+        self.viewers = 0
+        self.published_at = 0.0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="camera-preview", daemon=True)
+        self.thread.start()
+        print(f"Camera preview on http://{host}:{port}/")
+
+    def due(self, now: Optional[float] = None) -> bool:
+        """Whether the next frame should be annotated and published."""
+        now = time.monotonic() if now is None else now
+        return self.viewers > 0 and now - self.published_at >= self.interval
+
+    def publish(self, image) -> None:
+        success, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not success:
+            return
+        with self.condition:
+            self.jpeg = encoded.tobytes()
+            self.version += 1
+            self.published_at = time.monotonic()
+            self.condition.notify_all()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        with self.condition:
+            self.condition.notify_all()
+
+    def _handler(self):
+        preview = self
+
+        class PreviewHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path not in ("/", "/stream.mjpg"):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                with preview.condition:
+                    preview.viewers += 1
+                try:
+                    version = 0
+                    while True:
+                        with preview.condition:
+                            # The timeout notices a closed server or a viewer that went away
+                            preview.condition.wait_for(lambda: preview.version != version, timeout=5.0)
+                            jpeg, version = preview.jpeg, preview.version
+                        if jpeg is None:
+                            continue
+                        self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                         f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with preview.condition:
+                        preview.viewers -= 1
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return PreviewHandler
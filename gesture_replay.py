@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ack_client import get_acknowledge_dispatcher
+from auto_acknowledge_camera import (GestureConfig, GestureState, create_region_tracker, handle_no_hand_detected,
+                                     initialize_mediapipe_hands, process_frame, process_frame_with_hands)
+from camera_capture import MotionGate, StageTimings
+from hand_features import HandFeatures, compute_features
+from hand_trajectory import HandTrajectory
+from landmark_stream import read_landmark_stream
+
+PERCENTILES = (50, 95, 99)
+
+
+class Swipe(NamedTuple):
+    """A swipe at a time in seconds from the start of the recording."""
+    t: float
+    direction: str
+
+
+class AcknowledgmentStub:
+    def __init__(self) -> None:
+        """Local stand-in for the server that accepts every acknowledgment and keeps it."""
+        self.received: List[Dict[str, Any]] = []
+        stub = self
+
+        class StubHandler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.received.append(json.loads(body or b"{}"))
+                answer = json.dumps({"auto_acknowledged": True, "seq": len(stub.received)}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(answer)))
+                self.end_headers()
+                self.wfile.write(answer)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/auto_acknowledge"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def read_labels(path: str) -> List[Swipe]:
+    """Read labeled swipes, one ``seconds,direction`` line each (for example ``12.4,next``)."""
+    labels = []
+    with open(path) as file:
+        for line in file:
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            t, direction = [part.strip() for part in line.split(",")[:2]]
+            try:
+                labels.append(Swipe(float(t), direction))
+            except ValueError:
+                continue  # header line
+    return sorted(labels)
+
+
+def match_detections(detections: List[Swipe], labels: List[Swipe], tolerance: float) -> Dict[str, Any]:
+    """Pair each label with the earliest unused detection of the same direction within ``tolerance`` seconds."""
+    used = set()
+    matched = 0
+    for label in labels:
+        for index, detection in enumerate(detections):
+            if index not in used and detection.direction == label.direction and abs(detection.t - label.t) <= tolerance:
+                used.add(index)
+                matched += 1
+                break
+    precision = matched / len(detections) if detections else 0.0
+    recall = matched / len(labels) if labels else 0.0
+    return {
+        "labels": len(labels),
+        "detections": len(detections),
+        "true_positives": matched,
+        "false_positives": len(detections) - matched,
+        "false_negatives": len(labels) - matched,
+        "precision": round(precision, 3),
+        "recall": round(recall, 3),
+        "f1": round(2 * precision * recall / (precision + recall), 3) if precision + recall else 0.0,
+    }
+
+
+ReplayFrame = Tuple[float, Any, Optional[HandFeatures]]  # time, MediaPipe results, precomputed features
+
+
+def video_frames(path: str, config: GestureConfig, timings: StageTimings) -> Iterator[ReplayFrame]:
+    """Run hand inference on a video file, with the same motion gate and region tracking options as a live run."""
+    mp_components = initialize_mediapipe_hands(static_image_mode=config.adaptive_roi)
+    tracker = create_region_tracker(mp_components, config) if config.adaptive_roi else None
+    gate = MotionGate(config.motion_threshold, idle_after=0)
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    index = 0
+    try:
+        while True:
+            with timings.stage("decode"):
+                success, image = cap.read()
+            if not success:
+                return
+            t = index / fps
+            index += 1
+
+            with timings.stage("gate"):
+                run_inference = gate.should_infer(image, t)
+            results = None
+            if run_inference:
+                with timings.stage("inference"):
+                    results = tracker.process(image) if tracker else process_frame(image, mp_components.hands)
+                if results.multi_hand_landmarks:
+                    gate.hand_seen(t)
+            else:
+                timings.count("gated")
+            yield t, results, None
+    finally:
+        cap.release()
+
+
+def landmark_frames(path: str, timings: StageTimings) -> Iterator[ReplayFrame]:
+    """Replay a landmark stream recorded with ``auto_acknowledge_camera.py --record-landmarks``.
+
+    The hand features of all frames are computed in one batch up front.
+    """
+    with timings.stage("decode"):
+        frames = list(read_landmark_stream(path))
+    with_hands = [index for index, frame in enumerate(frames) if frame.results.multi_hand_landmarks]
+    features: List[Optional[HandFeatures]] = [None] * len(frames)
+    if with_hands:
+        start = time.perf_counter()
+        points = np.array([[tuple(landmark) for landmark in frames[index].results.multi_hand_landmarks[0].landmark]
+                           for index in with_hands])
+        batch = compute_features(points)
+        for row, index in enumerate(with_hands):
+            features[index] = batch.hand(row)
+        # Spread over the frames, comparable to the per-frame cost of a live run
+        timings.record("features", (time.perf_counter() - start) / len(with_hands))
+    for frame, frame_features in zip(frames, features):
+        yield frame.t, frame.results, frame_features
+
+
+def replay(frames: Iterator[ReplayFrame], config: GestureConfig, timings: StageTimings) -> List[Swipe]:
+    """Feed frames through the gesture logic of the live recognizer and return the swipes it fired."""
+    state = GestureState(trajectory=HandTrajectory(config.swipe_window))
+    detections = []
+    for t, results, features in frames:
+        state.frame_time = t
+        state.frame_captured_at = state.inference_done_at = time.time()
+        with timings.stage("gesture"):
+            # No image: nothing is drawn, and MediaPipe's drawing helpers are not needed
+            if results and results.multi_hand_landmarks:
+                process_frame_with_hands(None, results, None, state, config, 0, 0, features)
+            else:
+                handle_no_hand_detected(state, None, config, 0)
+        if state.last_swipe and state.last_swipe_at == t:
+            detections.append(Swipe(round(t, 3), state.last_swipe))
+        timings.frame_done()
+    return detections
+
+
+def stage_statistics(timings: StageTimings) -> Dict[str, Dict[str, float]]:
+    """Mean and percentiles in milliseconds per stage."""
+    statistics = {}
+    for stage, durations in timings.durations.items():
+        ordered = sorted(durations)
+        result = {"mean_ms": round(sum(ordered) / len(ordered) * 1000, 3)}
+        for percentile in PERCENTILES:
+            index = min(len(ordered) - 1, int(percentile / 100 * len(ordered)))
+            result[f"p{percentile}_ms"] = round(ordered[index] * 1000, 3)
+        statistics[stage] = result
+    return statistics
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Replay recorded videos or landmark streams through the gesture recognizer')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--video', type=str, help='Video file to run hand tracking and gesture detection on')
+    source.add_argument('--landmarks', type=str, help='Landmark stream recorded with --record-landmarks')
+    parser.add_argument('--labels', type=str,
+                        help='Labeled swipes, one "seconds,direction" line each, to compute precision and recall')
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help='Seconds a detection may lie from its label (default: 1.0)')
+    parser.add_argument('--swipe-threshold', '-t', type=float, default=2.0,
+                        help='Minimum scaled movement to detect a swipe (default: 2.0)')
+    parser.add_argument('--angle-threshold', '-a', type=float, default=30.0,
+                        help='Maximum angle from horizontal for swipe detection (default: 30.0 degrees)')
+    parser.add_argument('--min-fingers', '-mf', type=int, default=3,
+                        help='Minimum fingers extended for open hand detection (default: 3)')
+    parser.add_argument('--swipe-window', type=float, default=1.0,
+                        help='Seconds within which a swipe must cover the threshold (default: 1.0)')
+    parser.add_argument('--cooldown', type=float, default=3.0,
+                        help='Seconds after a swipe during which no further swipe is detected (default: 3.0)')
+    parser.add_argument('--min-velocity', type=float, default=1.0,
+                        help='Minimum current speed of the hand in the swipe direction, in hand sizes per second (default: 1.0)')
+    parser.add_argument('--motion-threshold', type=float, default=0.0,
+                        help='Motion gate as in a live run, video only (default: 0, off)')
+    parser.add_argument('--adaptive-roi', action='store_true',
+                        help='Search and track hands like a live run with --adaptive-roi, video only')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Show the messages of the recognizer for every frame')
+    parser.add_argument('--output', '-o', type=str,
+                        help='Write the results as JSON to this file')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Replay the recording and report speed and detection quality."""
+    args = parse_arguments()
+    stub = AcknowledgmentStub()
+    config = GestureConfig(
+        camera_device=-1,
+        server_url=stub.url.split("/auto_acknowledge")[0],
+        acknowledgment_url=stub.url,
+        swipe_threshold=args.swipe_threshold,
+        angle_threshold=args.angle_threshold,
+        min_fingers=args.min_fingers,
+        show_debug=False,
+        station="replay",
+        swipe_window=args.swipe_window,
+        min_velocity=args.min_velocity,
+        cooldown_seconds=args.cooldown,
+        motion_threshold=args.motion_threshold,
+        adaptive_roi=args.adaptive_roi,
+        headless=True
+    )
+
+    timings = StageTimings()
+    frames = video_frames(args.video, config, timings) if args.video else landmark_frames(args.landmarks, timings)
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, \
+            (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+        detections = replay(frames, config, timings)
+        # Wait for the last acknowledgments to reach the stub
+        get_acknowledge_dispatcher(config.acknowledgment_url, "gesture", config.station, False).close()
+    elapsed = time.perf_counter() - start
+    stub.close()
+
+    report: Dict[str, Any] = {
+        "source": args.video or args.landmarks,
+        "frames": timings.frames,
+        "seconds": round(elapsed, 3),
+        "fps": round(timings.frames / elapsed, 1) if elapsed > 0 else 0.0,
+        "stages": stage_statistics(timings),
+        "counts": dict(timings.counts),
+        "detections": [swipe._asdict() for swipe in detections],
+        "acknowledgments_received": len(stub.received),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "verbose")},
+    }
+    labels: Optional[List[Swipe]] = read_labels(args.labels) if args.labels else None
+    if labels is not None:
+        report["quality"] = match_detections(detections, labels, args.tolerance)
+
+    print(f"Replayed {report['frames']} frames in {report['seconds']:.2f} s ({report['fps']} fps)")
+    for stage, statistics in report["stages"].items():
+        print(f"  {stage:<10} " + "  ".join(f"{key[:-3]} {value:.2f} ms" for key, value in statistics.items()))
+    print(f"Swipes: {', '.join(f'{swipe.direction}@{swipe.t:.2f}s' for swipe in detections) or 'none'}"
+          f" ({report['acknowledgments_received']} acknowledgments reached the stub)")
+    if "quality" in report:
+        quality = report["quality"]
+        print(f"Precision {quality['precision']:.2f}  recall {quality['recall']:.2f}  F1 {quality['f1']:.2f} "
+              f"({quality['true_positives']} hits, {quality['false_positives']} false, {quality['false_negatives']} missed)")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
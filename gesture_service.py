@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, TextIO
+
+from auto_acknowledge_camera import (GestureConfig, add_gesture_arguments, create_gesture_config,
+                                     install_signal_handlers, print_startup_info, run_recognizer,
+                                     test_server_connection_at_startup, verify_environment)
+
+EXIT_NO_CAMERA = 3
+RESTART_DELAY = 1.0       # first delay before a dead worker is started again, doubled for each crash in a row
+MAX_RESTART_DELAY = 30.0
+HEALTHY_SECONDS = 60.0    # a worker running this long resets the delay
+STARTUP_SECONDS = 30.0    # time a new worker gets to load MediaPipe and deliver its first frame
+STOP_TIMEOUT = 10.0
+
+
+class PrefixedOutput:
+    def __init__(self, stream: TextIO, prefix: str) -> None:
+        """Put the station in front of every line a worker prints, so the shared log stays readable."""
+        self.stream = stream
+        self.prefix = prefix
+        self.line_start = True
+
+    def write(self, text: str) -> int:
+        for line in text.splitlines(keepends=True):
+            if self.line_start:
+                self.stream.write(self.prefix)
+            self.stream.write(line)
+            self.line_start = line.endswith("\n")
+        return len(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def camera_worker(config: GestureConfig, frames: Any, last_frame: Any) -> None:
+    """Recognize gestures on one camera until SIGTERM, counting frames in the shared values."""
+    sys.stdout = PrefixedOutput(sys.stdout, f"[{config.station}] ")
+    sys.stderr = PrefixedOutput(sys.stderr, f"[{config.station}] ")
+    stop = threading.Event()
+    install_signal_handlers(stop)
+
+    def count_frame() -> None:
+        with frames.get_lock():
+            frames.value += 1
+        last_frame.value = time.monotonic()
+
+    print(f"Starting camera {config.camera_device} (pid {os.getpid()})")
+    if not run_recognizer(config, stop, count_frame):
+        sys.exit(EXIT_NO_CAMERA)
+
+
+class CameraWorker:
+    def __init__(self, config: GestureConfig, context: Any) -> None:
+        """Supervised recognition process for one station and camera.
+
+        The process reports every frame through shared memory, so the supervisor
+        sees the frame rate and notices a worker that hangs as well as one that dies.
+        """
+        self.config = config
+        self.context = context
+        self.frames = context.Value('L', 0)
+        self.last_frame = context.Value('d', 0.0)
+        self.process: Optional[Any] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.restart_delay = RESTART_DELAY
+        self.restart_at: Optional[float] = None
+        self.reported_frames = 0
+        self.reported_at = time.monotonic()
+
+    @property
+    def name(self) -> str:
+        return f"{self.config.station} (camera {self.config.camera_device})"
+
+    def start(self) -> None:
+        self.last_frame.value = 0.0
+        self.process = self.context.Process(target=camera_worker, name=f"gesture-{self.config.station}",
+                                            args=(self.config, self.frames, self.last_frame))
+        self.process.start()
+        self.started_at = time.monotonic()
+        self.restart_at = None
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def is_stalled(self, now: float, stall_seconds: float) -> bool:
+        """No frame for ``stall_seconds``, or none at all within the startup time."""
+        if self.last_frame.value:
+            return now - self.last_frame.value > stall_seconds
+        return now - self.started_at > max(stall_seconds, STARTUP_SECONDS)
+
+    def stop(self, timeout: float = STOP_TIMEOUT) -> None:
+        """Ask the worker to finish its loop (SIGTERM) and kill it if it does not."""
+        if not self.is_alive():
+            return
+        self.process.terminate()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            print(f"⚠️ {self.name} did not stop, killing it")
+            self.process.kill()
+            self.process.join()
+
+    def schedule_restart(self, now: float) -> None:
+        """Restart after a delay that grows while the worker keeps failing quickly."""
+        if now - self.started_at >= HEALTHY_SECONDS:
+            self.restart_delay = RESTART_DELAY
+        self.restart_at = now + self.restart_delay
+        print(f"🔄 Restarting {self.name} in {self.restart_delay:.0f} s")
+        self.restart_delay = min(self.restart_delay * 2, MAX_RESTART_DELAY)
+
+    def supervise(self, now: float, stall_seconds: float) -> None:
+        if self.restart_at is not None:
+            if now >= self.restart_at:
+                self.restarts += 1
+                self.start()
+            return
+        if not self.is_alive():
+            code = self.process.exitcode
+            reason = "cannot read from camera" if code == EXIT_NO_CAMERA else f"exit code {code}"
+            print(f"❌ {self.name} stopped ({reason})")
+            self.schedule_restart(now)
+        elif stall_seconds > 0 and self.is_stalled(now, stall_seconds):
+            print(f"❌ {self.name} delivered no frame for {stall_seconds:.0f} s")
+            self.stop()
+            self.schedule_restart(now)
+
+    def frame_rate(self, now: float) -> float:
+        """Frames per second since the last call."""
+        frames = self.frames.value
+        fps = (frames - self.reported_frames) / (now - self.reported_at) if now > self.reported_at else 0.0
+        self.reported_frames, self.reported_at = frames, now
+        return fps
+
+    def status(self, now: float) -> str:
+        fps = self.frame_rate(now)
+        if self.restart_at is not None:
+            state = f"restarting in {max(0.0, self.restart_at - now):.0f} s"
+        elif not self.last_frame.value:
+            state = "starting"
+        else:
+            state = f"{fps:.1f} fps, up {now - self.started_at:.0f} s"
+        return f"📷 {self.name}: {state}, restarts {self.restarts}"
+
+
+def parse_camera_mapping(entries: List[str]) -> Dict[str, int]:
+    """Parse ``station=camera`` entries, for example ``station-1=0 station-2=2``."""
+    mapping: Dict[str, int] = {}
+    for entry in entries:
+        station, separator, camera = entry.partition("=")
+        station = station.strip()
+        if not separator or not station:
+            raise ValueError(f"Expected STATION=CAMERA, got '{entry}'")
+        try:
+            device = int(camera)
+        except ValueError:
+            raise ValueError(f"Camera of station '{station}' must be a device number, got '{camera}'") from None
+        if station in mapping:
+            raise ValueError(f"Station '{station}' is given twice")
+        if device in mapping.values():
+            raise ValueError(f"Camera {device} is assigned to more than one station")
+        mapping[station] = device
+    return mapping
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description='Gesture recognition for several stations, one supervised worker process per camera')
+    parser.add_argument('cameras', nargs='*', metavar='STATION=CAMERA',
+                        default=[entry for entry in os.environ.get('ASSYS_CAMERAS', '').split(',') if entry.strip()],
+                        help='Station and camera device of each worker, for example station-1=0 station-2=2 '
+                             '(default: from ASSYS_CAMERAS env, comma separated)')
+    parser.add_argument('--report-interval', type=float, default=10.0,
+                        help='Seconds between frame rate reports of all cameras (default: 10)')
+    parser.add_argument('--stall-seconds', type=float, default=15.0,
+                        help='Restart a worker that delivers no frame for this long, 0 to only restart dead ones (default: 15)')
+    add_gesture_arguments(parser, single_camera=False)
+    # Camera and station come from the mapping
+    parser.set_defaults(camera=0, station='default')
+    args = parser.parse_args()
+    try:
+        args.mapping = parse_camera_mapping(args.cameras)
+    except ValueError as e:
+        parser.error(str(e))
+    if not args.mapping:
+        parser.error('no cameras given, pass STATION=CAMERA entries or set ASSYS_CAMERAS')
+    return args
+
+
+def camera_configs(config: GestureConfig, mapping: Dict[str, int]) -> List[GestureConfig]:
+    """One configuration per camera, sharing everything but camera, station, preview port and recording."""
+    configs = []
+    for index, (station, device) in enumerate(mapping.items()):
+        record_landmarks = None
+        if config.record_landmarks:
+            base, extension = os.path.splitext(config.record_landmarks)
+            record_landmarks = f"{base}-{station}{extension or '.jsonl'}"
+        configs.append(replace(config, camera_device=device, station=station,
+                               preview_port=config.preview_port + index if config.preview_port else 0,
+                               record_landmarks=record_landmarks, headless=True))
+    return configs
+
+
+def main() -> None:
+    """Start one worker per camera and keep them running until stopped."""
+    verify_environment()
+    args = parse_arguments()
+    shared = create_gesture_config(args)
+    configs = camera_configs(shared, args.mapping)
+
+    print_startup_info(shared)
+    test_server_connection_at_startup(shared)
+    print(f"\nServing {len(configs)} stations:")
+    for config in configs:
+        preview = f", preview on port {config.preview_port}" if config.preview_port else ""
+        print(f"  {config.station}: camera {config.camera_device}{preview}")
+
+    # Workers start fresh instead of forking the supervisor with its open connections and threads
+    context = multiprocessing.get_context("spawn")
+    workers = [CameraWorker(config, context) for config in configs]
+    stop = threading.Event()
+    install_signal_handlers(stop)
+    for worker in workers:
+        worker.start()
+
+    last_report = time.monotonic()
+    try:
+        while not stop.wait(1.0):
+            now = time.monotonic()
+            for worker in workers:
+                worker.supervise(now, args.stall_seconds)
+            if args.report_interval > 0 and now - last_report >= args.report_interval:
+                # Stopping a hung worker may have taken a while
+                now = last_report = time.monotonic()
+                for worker in workers:
+                    print(worker.status(now))
+    finally:
+        print("Stopping workers...")
+        for worker in workers:
+            if worker.is_alive():
+                worker.process.terminate()
+        for worker in workers:
+            worker.stop()
+        print("Gesture service stopped.")
+
+
+if __name__ == "__main__":
+    main()
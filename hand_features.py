@@ -0,0 +1,86 @@
+from typing import Dict, NamedTuple, Tuple
+
+import numpy as np
+
+WRIST = 0
+THUMB_MCP, THUMB_TIP = 2, 4
+INDEX_MCP, MIDDLE_MCP, PINKY_MCP = 5, 9, 17
+FINGER_NAMES = ('Thumb', 'Index', 'Middle', 'Ring', 'Pinky')
+FINGER_TIPS = np.array([8, 12, 16, 20])
+FINGER_PIPS = np.array([6, 10, 14, 18])
+PALM_TRIANGLE = np.array([WRIST, INDEX_MCP, PINKY_MCP])
+PALM_TRIANGLE_NEXT = np.array([INDEX_MCP, PINKY_MCP, WRIST])
+THUMB = np.array([THUMB_TIP, THUMB_MCP])
+PALM_SIDES = np.array([INDEX_MCP, PINKY_MCP])
+CROSS_A, CROSS_B = np.array([1, 2, 0]), np.array([2, 0, 1])  # component order of a cross product
+THUMB_EXTENSION = 1.1  # the thumb tip must be this much farther from the wrist than its base
+
+
+class HandFeatures(NamedTuple):
+    """Everything the recognizer derives from the landmarks of one hand."""
+    points: np.ndarray       # (21, 3) landmarks x, y, z, normalized to the image
+    fingers: np.ndarray      # (5,) extended fingers, thumb first
+    size: float              # longest side of the wrist/index/pinky base triangle
+    center: Tuple[float, float]  # centroid of that triangle
+    palm_normal: np.ndarray  # (3,) unit normal of the palm plane, z < 0 points towards the camera
+    roll: float              # degrees the wrist-to-middle-finger axis leans from upright, clockwise positive
+
+    def finger_states(self) -> Dict[str, bool]:
+        return {name: bool(extended) for name, extended in zip(FINGER_NAMES, self.fingers)}
+
+    def extended_count(self) -> int:
+        return int(self.fingers.sum())
+
+
+class HandFeatureBatch(NamedTuple):
+    """Features of many hands at once, one row per hand."""
+    points: np.ndarray       # (N, 21, 3)
+    fingers: np.ndarray      # (N, 5)
+    size: np.ndarray         # (N,)
+    center: np.ndarray       # (N, 2)
+    palm_normal: np.ndarray  # (N, 3)
+    roll: np.ndarray         # (N,)
+
+    def hand(self, index: int) -> HandFeatures:
+        return HandFeatures(self.points[index], self.fingers[index], float(self.size[index]),
+                            (float(self.center[index, 0]), float(self.center[index, 1])),
+                            self.palm_normal[index], float(self.roll[index]))
+
+
+def landmarks_to_array(hand_landmarks) -> np.ndarray:
+    """Copy the 21 landmarks of a MediaPipe hand into a (21, 3) array, the only per-landmark access per frame."""
+    return np.array([(landmark.x, landmark.y, landmark.z) for landmark in hand_landmarks.landmark], dtype=np.float64)
+
+
+def compute_features(points: np.ndarray) -> HandFeatureBatch:
+    """Derive all hand features from landmark arrays of shape (N, 21, 3) in one vectorized pass."""
+    points = np.asarray(points, dtype=np.float64)
+    xy = points[:, :, :2]
+
+    # Hand size: longest side of the triangle between wrist, index and pinky base
+    sides = xy[:, PALM_TRIANGLE] - xy[:, PALM_TRIANGLE_NEXT]
+    size = np.sqrt((sides * sides).sum(axis=2)).max(axis=1)
+    center = xy[:, PALM_TRIANGLE].mean(axis=1)
+
+    # Fingers point up when extended, the thumb moves away from the wrist
+    fingers = np.empty((len(points), 5), dtype=bool)
+    thumb = xy[:, THUMB] - xy[:, WRIST, np.newaxis]
+    thumb_distance = np.sqrt((thumb * thumb).sum(axis=2))
+    fingers[:, 0] = thumb_distance[:, 0] > thumb_distance[:, 1] * THUMB_EXTENSION
+    fingers[:, 1:] = xy[:, FINGER_TIPS, 1] < xy[:, FINGER_PIPS, 1]
+
+    # Palm normal: cross product of wrist-to-index and wrist-to-pinky base
+    index, pinky = (points[:, PALM_SIDES] - points[:, WRIST, np.newaxis]).transpose(1, 0, 2)
+    normal = index[:, CROSS_A] * pinky[:, CROSS_B] - index[:, CROSS_B] * pinky[:, CROSS_A]
+    length = np.sqrt((normal * normal).sum(axis=1, keepdims=True))
+    palm_normal = normal / np.maximum(length, 1e-12)
+
+    axis = xy[:, MIDDLE_MCP] - xy[:, WRIST]
+    roll = np.degrees(np.arctan2(axis[:, 0], -axis[:, 1]))
+
+    return HandFeatureBatch(points, fingers, size, center, palm_normal, roll)
+
+
+def extract_features(hand_landmarks) -> HandFeatures:
+    """Features of a single MediaPipe hand."""
+    return compute_features(landmarks_to_array(hand_landmarks)[np.newaxis]).hand(0)
@@ -0,0 +1,141 @@
+import time
+from typing import Any, Optional, Tuple
+
+import cv2
+
+ROI_MARGIN = 0.6      # space around the hand box on each side, relative to the box size
+ROI_SIZE = 256        # longest side a cropped hand region is shrunk to at scale 1.0
+MIN_ROI_SIZE = 128
+MIN_ROI_PIXELS = 32   # smaller regions are not worth tracking, search the full frame instead
+REANCHOR_OFFSET = 0.15  # the crop moves once the hand center drifts this far from its center, relative to its side
+REANCHOR_SIZE = 1.35    # or once the hand grows or shrinks by this factor
+
+
+class AdaptiveScale:
+    def __init__(self, target_fps: float, min_scale: float = 0.4, max_scale: float = 1.0,
+                 step: float = 0.1, adjust_seconds: float = 1.0) -> None:
+        """Shrink the inference resolution while frames take too long, grow it again when there is time to spare.
+
+        Compares a moving average of the inference time per frame with the budget
+        of ``target_fps`` and changes the scale by ``step`` at most every
+        ``adjust_seconds``, so it does not flip back and forth.
+        """
+        self.budget = 1.0 / target_fps
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.step = step
+        self.adjust_seconds = adjust_seconds
+        self.scale = max_scale
+        self.average: Optional[float] = None
+        self.adjusted_at = time.monotonic()
+
+    def update(self, frame_seconds: float, now: Optional[float] = None) -> float:
+        """Add the inference time of a frame and return the scale for the next one."""
+        now = time.monotonic() if now is None else now
+        self.average = frame_seconds if self.average is None else 0.8 * self.average + 0.2 * frame_seconds
+        if now - self.adjusted_at < self.adjust_seconds:
+            return self.scale
+        if self.average > self.budget * 1.1 and self.scale > self.min_scale:
+            self.scale = round(max(self.min_scale, self.scale - self.step), 2)
+            self.adjusted_at = now
+        elif self.average < self.budget * 0.7 and self.scale < self.max_scale:
+            self.scale = round(min(self.max_scale, self.scale + self.step), 2)
+            self.adjusted_at = now
+        return self.scale
+
+
+class HandRegionTracker:
+    def __init__(self, detector: Any, tracker: Any, scale: AdaptiveScale) -> None:
+        """Find a hand on a downscaled frame, then follow it on a crop around its last position.
+
+        ``detector`` searches whole frames and should be a MediaPipe Hands instance in
+        static image mode. ``tracker`` runs on the crops in video mode, so it follows
+        the hand without running palm detection on every crop; the crop stays in
+        place while the hand stays near its center, and the tracker is reset whenever
+        the crop moves, since its landmarks refer to the old crop. Landmarks of
+        both are returned normalized to the full frame, so callers see no
+        difference to running MediaPipe on the original image. When the crop loses
+        the hand, the same frame is searched as a whole again.
+        """
+        self.detector = detector
+        self.tracker = tracker
+        self.scale = scale
+        self.region: Optional[Tuple[int, int, int, int]] = None  # x0, y0, x1, y1 in pixels
+        self.last_mode = "search"
+
+    def process(self, image) -> Any:
+        """Run hand inference on ``image`` (BGR) and return MediaPipe results in full-frame coordinates."""
+        if self.region is not None:
+            self.last_mode = "track"
+            results = self.track(image, self.region)
+            if results.multi_hand_landmarks:
+                region = self.hand_region(results.multi_hand_landmarks[0], image.shape)
+                if region is None or needs_reanchor(self.region, region):
+                    self.anchor(region)
+                return results
+            self.last_mode = "lost"
+
+        results = self.search(image)
+        self.anchor(self.hand_region(results.multi_hand_landmarks[0], image.shape) if results.multi_hand_landmarks else None)
+        return results
+
+    def anchor(self, region: Optional[Tuple[int, int, int, int]]) -> None:
+        """Move the crop to ``region`` and start tracking in it afresh."""
+        if region is not None and region != self.region:
+            self.tracker.reset()
+        self.region = region
+
+    def search(self, image) -> Any:
+        scale = self.scale.scale
+        if scale < 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        # Normalized landmarks do not depend on the resolution, nothing to map back
+        return self.detector.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+    def track(self, image, region: Tuple[int, int, int, int]) -> Any:
+        x0, y0, x1, y1 = region
+        crop = image[y0:y1, x0:x1]
+        longest = max(MIN_ROI_SIZE, int(ROI_SIZE * self.scale.scale))
+        if max(crop.shape[:2]) > longest:
+            factor = longest / max(crop.shape[:2])
+            crop = cv2.resize(crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        results = self.tracker.process(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+
+        height, width = image.shape[:2]
+        for hand_landmarks in results.multi_hand_landmarks or []:
+            map_to_frame(hand_landmarks, region, width, height)
+        return results
+
+    @staticmethod
+    def hand_region(hand_landmarks, shape) -> Optional[Tuple[int, int, int, int]]:
+        """Square pixel region around the hand with room for it to move until the next frame."""
+        height, width = shape[:2]
+        xs = [landmark.x * width for landmark in hand_landmarks.landmark]
+        ys = [landmark.y * height for landmark in hand_landmarks.landmark]
+        side = max(max(xs) - min(xs), max(ys) - min(ys)) * (1 + 2 * ROI_MARGIN)
+        center_x, center_y = (max(xs) + min(xs)) / 2, (max(ys) + min(ys)) / 2
+
+        x0, y0 = max(0, int(center_x - side / 2)), max(0, int(center_y - side / 2))
+        x1, y1 = min(width, int(center_x + side / 2)), min(height, int(center_y + side / 2))
+        if x1 - x0 < MIN_ROI_PIXELS or y1 - y0 < MIN_ROI_PIXELS:
+            return None
+        return x0, y0, x1, y1
+
+
+def needs_reanchor(region: Tuple[int, int, int, int], hand: Tuple[int, int, int, int]) -> bool:
+    """Whether the hand region ``hand`` moved or changed size too much to keep tracking in ``region``."""
+    side = max(region[2] - region[0], region[3] - region[1])
+    hand_side = max(hand[2] - hand[0], hand[3] - hand[1])
+    offset = max(abs((hand[0] + hand[2]) - (region[0] + region[2])), abs((hand[1] + hand[3]) - (region[1] + region[3]))) / 2
+    return offset > REANCHOR_OFFSET * side or not side / REANCHOR_SIZE <= hand_side <= side * REANCHOR_SIZE
+
+
+def map_to_frame(hand_landmarks, region: Tuple[int, int, int, int], width: int, height: int) -> None:
+    """Convert landmarks normalized to a crop into landmarks normalized to the full frame, in place."""
+    x0, y0, x1, y1 = region
+    crop_width, crop_height = x1 - x0, y1 - y0
+    for landmark in hand_landmarks.landmark:
+        landmark.x = (x0 + landmark.x * crop_width) / width
+        landmark.y = (y0 + landmark.y * crop_height) / height
+        # z uses the same scale as x
+        landmark.z = landmark.z * crop_width / width
@@ -0,0 +1,73 @@
+import math
+from collections import deque
+from typing import Deque, NamedTuple, Optional, Tuple
+
+TRAJECTORY_SECONDS = 1.0  # a swipe has to cover the threshold within this time
+TRAJECTORY_SAMPLES = 64   # enough for the window at 60 fps
+VELOCITY_SECONDS = 0.15   # recent part of the trajectory the current velocity is measured over
+
+
+class TrajectorySample(NamedTuple):
+    """Hand center and size at a point in time (monotonic seconds)."""
+    t: float
+    x: float
+    y: float
+    size: float
+
+
+class HandTrajectory:
+    def __init__(self, window_seconds: float = TRAJECTORY_SECONDS, max_samples: int = TRAJECTORY_SAMPLES) -> None:
+        """Ring buffer of the recent positions of an open hand.
+
+        Samples older than ``window_seconds`` fall out, so displacement and speed
+        always describe the last moments of the movement, whatever the frame rate.
+        """
+        self.window_seconds = window_seconds
+        self.samples: Deque[TrajectorySample] = deque(maxlen=max_samples)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def add(self, t: float, center: Tuple[float, float], size: float) -> None:
+        self.samples.append(TrajectorySample(t, center[0], center[1], size))
+        while self.samples and self.samples[0].t < t - self.window_seconds:
+            self.samples.popleft()
+
+    def clear(self) -> None:
+        self.samples.clear()
+
+    def first(self) -> Optional[TrajectorySample]:
+        return self.samples[0] if self.samples else None
+
+    def last(self) -> Optional[TrajectorySample]:
+        return self.samples[-1] if self.samples else None
+
+    def hand_size(self) -> float:
+        """Mean hand size over the window, steadier than the size of a single frame."""
+        if not self.samples:
+            return 0.0
+        return sum(sample.size for sample in self.samples) / len(self.samples)
+
+    def displacement(self) -> Tuple[float, float]:
+        """Movement from the oldest to the newest sample, in normalized image coordinates."""
+        if len(self.samples) < 2:
+            return 0.0, 0.0
+        return self.samples[-1].x - self.samples[0].x, self.samples[-1].y - self.samples[0].y
+
+    def scaled_distance(self) -> float:
+        """Length of the displacement in hand sizes."""
+        size = self.hand_size()
+        return math.hypot(*self.displacement()) / size if size > 0 else 0.0
+
+    def velocity(self, recent_seconds: float = VELOCITY_SECONDS) -> Tuple[float, float]:
+        """Current velocity in hand sizes per second, measured over the last ``recent_seconds``."""
+        if len(self.samples) < 2:
+            return 0.0, 0.0
+        end = self.samples[-1]
+        start = next((sample for sample in self.samples if sample.t >= end.t - recent_seconds), self.samples[0])
+        if start is end:
+            start = self.samples[-2]
+        duration, size = end.t - start.t, self.hand_size()
+        if duration <= 0 or size <= 0:
+            return 0.0, 0.0
+        return (end.x - start.x) / size / duration, (end.y - start.y) / size / duration
@@ -0,0 +1,132 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import speech_recognition as sr
+
+from audio_capture import SpeechDecoder
+
+SAMPLE_RATE = 16000          # Vosk models are trained on 16 kHz mono
+DEFAULT_MODEL_PATH = "models/vosk-model-small-de-0.15"
+BACKENDS = ("auto", "vosk", "google")
+
+
+class BackendUnavailable(RuntimeError):
+    """The backend cannot run on this machine (library or model missing)."""
+
+
+class KeywordBackend(ABC):
+    name = "none"
+
+    @abstractmethod
+    def recognize(self, audio: sr.AudioData) -> str:
+        """Return the recognized text in lower case, empty if nothing was understood."""
+
+    def decoder(self, sample_rate: int) -> Optional[SpeechDecoder]:
+        """A decoder for 16 bit audio at ``sample_rate`` fed while speech is cut, None if only whole utterances are recognized."""
+        return None
+
+    def describe(self) -> str:
+        return self.name
+
+
+class GoogleBackend(KeywordBackend):
+    name = "google"
+
+    def __init__(self, recognizer: sr.Recognizer) -> None:
+        """Google's free web speech API: any words, but a cloud round trip per utterance and no network, no result."""
+        self.recognizer = recognizer
+
+    def recognize(self, audio: sr.AudioData) -> str:
+        # sr.RequestError (service unreachable) is left to the caller
+        try:
+            return self.recognizer.recognize_google(audio).lower()
+        except sr.UnknownValueError:
+            return ""
+
+
+class VoskBackend(KeywordBackend):
+    name = "vosk"
+
+    def __init__(self, model_path: str, phrases: List[str]) -> None:
+        """Offline Kaldi model restricted to the wake words.
+
+        With a grammar of a dozen phrases the decoder only has to choose between
+        them (or ``[unk]``), which is far faster than real time on a Raspberry Pi.
+        Fed through ``decoder`` while the words are spoken, little is left to
+        decode at the end of speech.
+        """
+        try:
+            import vosk
+        except ImportError:
+            raise BackendUnavailable("vosk is not installed (pip install vosk)") from None
+        if not os.path.isdir(model_path):
+            raise BackendUnavailable(f"no Vosk model at {model_path} (download one from https://alphacephei.com/vosk/models)")
+
+        vosk.SetLogLevel(-1)
+        self.model_path = model_path
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+        # Words outside the model's vocabulary can never be recognized, leave them out instead of failing
+        self.missing = [phrase for phrase in phrases if any(self.model.find_word(word) < 0 for word in phrase.split())]
+        self.grammar = json.dumps([phrase for phrase in phrases if phrase not in self.missing] + ["[unk]"], ensure_ascii=False)
+        self.recognizer = self.vosk.KaldiRecognizer(self.model, SAMPLE_RATE, self.grammar)
+
+    def recognize(self, audio: sr.AudioData) -> str:
+        self.recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2))
+        return final_text(self.recognizer)
+
+    def decoder(self, sample_rate: int) -> SpeechDecoder:
+        # A recognizer of its own: it runs on the segmenter's thread; Vosk resamples to the model's rate
+        return VoskDecoder(self.vosk.KaldiRecognizer(self.model, sample_rate, self.grammar))
+
+    def describe(self) -> str:
+        return f"vosk (model {self.model_path})"
+
+
+class VoskDecoder(SpeechDecoder):
+    def __init__(self, recognizer) -> None:
+        """Feeds a Kaldi recognizer chunk by chunk while an utterance is spoken."""
+        self.recognizer = recognizer
+
+    def feed(self, data: bytes) -> None:
+        self.recognizer.AcceptWaveform(data)
+
+    def finish(self) -> str:
+        return final_text(self.recognizer)
+
+    def discard(self) -> None:
+        self.recognizer.Reset()
+
+
+def final_text(recognizer) -> str:
+    """The words of the utterance fed to ``recognizer`` without ``[unk]``; also resets it for the next one."""
+    text = json.loads(recognizer.FinalResult()).get("text", "")
+    return " ".join(word for word in text.split() if word != "[unk]")
+
+
+def wake_phrases(wake_words: Dict[str, List[str]]) -> List[str]:
+    """All wake words as one list without duplicates, as the grammar of the offline model."""
+    phrases: List[str] = []
+    for words in wake_words.values():
+        for word in words:
+            word = word.strip().lower()
+            if word and word not in phrases:
+                phrases.append(word)
+    return phrases
+
+
+def create_backend(name: str, recognizer: sr.Recognizer, wake_words: Dict[str, List[str]],
+                   model_path: str = DEFAULT_MODEL_PATH) -> KeywordBackend:
+    """Create the backend ``name``; ``auto`` prefers the offline model and falls back to Google without it."""
+    if name == "google":
+        return GoogleBackend(recognizer)
+    try:
+        return VoskBackend(model_path, wake_phrases(wake_words))
+    except BackendUnavailable as e:
+        if name == "vosk":
+            raise
+        print(f"⚠️ Offline recognition unavailable: {e}")
+        print("⚠️ Falling back to Google Speech Recognition, which needs a network connection")
+        return GoogleBackend(recognizer)
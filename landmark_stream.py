@@ -0,0 +1,55 @@
+import json
+from typing import Any, Iterator, List, NamedTuple, Optional, TextIO
+
+
+class Landmark(NamedTuple):
+    """A landmark as MediaPipe reports it, normalized to the image."""
+    x: float
+    y: float
+    z: float
+
+
+class HandLandmarks(NamedTuple):
+    """Stands in for MediaPipe's NormalizedLandmarkList."""
+    landmark: List[Landmark]
+
+
+class RecordedResults(NamedTuple):
+    """Stands in for the results of ``Hands.process``."""
+    multi_hand_landmarks: Optional[List[HandLandmarks]]
+
+
+class RecordedFrame(NamedTuple):
+    t: float  # seconds since the first recorded frame
+    results: RecordedResults
+
+
+class LandmarkRecorder:
+    def __init__(self, path: str) -> None:
+        """Write the hand landmarks of every frame as JSON lines, for replaying them without camera and model."""
+        self.file: TextIO = open(path, "w")
+        self.started: Optional[float] = None
+        self.frames = 0
+
+    def write(self, t: float, results: Any) -> None:
+        """Record the MediaPipe ``results`` (or None) of the frame captured at monotonic time ``t``."""
+        if self.started is None:
+            self.started = t
+        hands = [[[round(landmark.x, 5), round(landmark.y, 5), round(landmark.z, 5)] for landmark in hand.landmark]
+                 for hand in (results.multi_hand_landmarks if results and results.multi_hand_landmarks else [])]
+        self.file.write(json.dumps({"t": round(t - self.started, 4), "hands": hands}) + "\n")
+        self.frames += 1
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def read_landmark_stream(path: str) -> Iterator[RecordedFrame]:
+    """Yield the frames of a file written by LandmarkRecorder."""
+    with open(path) as file:
+        for line in file:
+            if not line.strip():
+                continue
+            frame = json.loads(line)
+            hands = [HandLandmarks([Landmark(*point) for point in hand]) for hand in frame["hands"]]
+            yield RecordedFrame(frame["t"], RecordedResults(hands or None))
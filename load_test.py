@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+PERCENTILES = (50, 90, 95, 99)
+STORAGE_PASSWORD = "12345"
+BIN_SPACING = 3  # LEDs per bin, locations are 0, 3, 6, ...
+MAX_REDIRECTS = 5
+
+
+class LoadStats:
+    def __init__(self) -> None:
+        """Latencies and errors per endpoint, shared by all simulated clients."""
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        with self.lock:
+            self.latencies.setdefault(name, []).append(seconds)
+
+    def record_error(self, name: str) -> None:
+        with self.lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, duration: float) -> Dict[str, Dict[str, Any]]:
+        """Throughput and latency percentiles in milliseconds per endpoint."""
+        with self.lock:
+            names = sorted(set(self.latencies) | set(self.errors))
+            results = {}
+            for name in names:
+                latencies = sorted(self.latencies.get(name, []))
+                result: Dict[str, Any] = {
+                    "count": len(latencies),
+                    "errors": self.errors.get(name, 0),
+                    "throughput_per_s": round(len(latencies) / duration, 2) if duration > 0 else 0.0,
+                }
+                if latencies:
+                    result["mean_ms"] = round(sum(latencies) / len(latencies) * 1000, 2)
+                    for percentile in PERCENTILES:
+                        result[f"p{percentile}_ms"] = round(percentile_of(latencies, percentile) * 1000, 2)
+                    result["max_ms"] = round(latencies[-1] * 1000, 2)
+                results[name] = result
+            return results
+
+
+def location_path(response: requests.Response) -> str:
+    """Path and query of a redirect's target, relative to the server URL."""
+    location = urlsplit(response.headers["Location"])
+    return location.path + (f"?{location.query}" if location.query else "")
+
+
+def percentile_of(sorted_values: List[float], percentile: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, int(round(percentile / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class StationSimulator:
+    def __init__(self, url: str, station: str, blueprint: str, stats: LoadStats, stop: threading.Event,
+                 args: argparse.Namespace) -> None:
+        """One assembly station: a display subscribed to acknowledgments, a gesture client and an operator paging through a blueprint."""
+        self.url = url
+        self.station = station
+        self.blueprint = blueprint
+        self.stats = stats
+        self.stop = stop
+        self.args = args
+        # Send and delivery time per sequence number; the stream may deliver before the POST returns
+        self.sent_at: Dict[int, float] = {}
+        self.delivered_at: Dict[int, Tuple[float, str]] = {}
+        self.ack_lock = threading.Lock()
+
+    def threads(self) -> List[threading.Thread]:
+        display = self.stream_display if self.args.display == "stream" else self.poll_display
+        return [threading.Thread(target=target, name=f"{self.station}-{target.__name__}", daemon=True)
+                for target in (display, self.gesture_client, self.operator)]
+
+    def open_session(self) -> requests.Session:
+        """Browser-like session bound to this station."""
+        session = requests.Session()
+        self.get_page(session, "/", params={"station": self.station})
+        return session
+
+    def timed(self, session: requests.Session, name: str, method: str, path: str, **kwargs: Any) -> Optional[requests.Response]:
+        # A followed redirect would be counted in the time of the request that caused it
+        kwargs.setdefault("allow_redirects", False)
+        start = time.perf_counter()
+        try:
+            response = session.request(method, self.url + path, timeout=self.args.timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            self.stats.record_error(name)
+            return None
+        if response.status_code >= 400:
+            self.stats.record_error(name)
+            return None
+        self.stats.record(name, time.perf_counter() - start)
+        return response
+
+    def get_page(self, session: requests.Session, path: str, **kwargs: Any) -> Optional[requests.Response]:
+        """GET a page and follow its redirects one by one, each timed under the path it asks for."""
+        for _ in range(MAX_REDIRECTS):
+            response = self.timed(session, f"GET {urlsplit(path).path}", "GET", path, **kwargs)
+            if response is None or not response.is_redirect:
+                return response
+            path = location_path(response)
+            kwargs = {}
+        self.stats.record_error(f"GET {urlsplit(path).path}")
+        return None
+
+    def wait(self, interval: float) -> bool:
+        """Sleep around ``interval`` with some jitter, returns False once the run is over."""
+        return not self.stop.wait(interval * random.uniform(0.8, 1.2))
+
+    def sent(self, seq: int, sent_at: float) -> None:
+        with self.ack_lock:
+            delivered = self.delivered_at.pop(seq, None)
+            if delivered is None:
+                self.sent_at[seq] = sent_at
+        if delivered is not None:
+            delivered_at, via = delivered
+            self.stats.record(f"ack delivery ({via})", delivered_at - sent_at)
+
+    def delivered(self, events: List[Dict[str, Any]], via: str) -> None:
+        now = time.perf_counter()
+        for event in events:
+            with self.ack_lock:
+                sent_at = self.sent_at.pop(event["seq"], None)
+                if sent_at is None:
+                    self.delivered_at[event["seq"]] = (now, via)
+            if sent_at is not None:
+                self.stats.record(f"ack delivery ({via})", now - sent_at)
+
+    def gesture_client(self) -> None:
+        session = requests.Session()
+        while self.wait(self.args.ack_interval):
+            payload = {"type": "gesture", "direction": "next", "station": self.station}
+            sent_at = time.perf_counter()
+            response = self.timed(session, "POST /auto_acknowledge", "POST", "/auto_acknowledge", json=payload)
+            if response is not None and response.json().get("seq"):
+                self.sent(response.json()["seq"], sent_at)
+
+    def poll_display(self) -> None:
+        session = self.open_session()
+        response = self.timed(session, "GET /auto_acknowledge", "GET", "/auto_acknowledge", params={"cursor": 0})
+        cursor = response.json()["cursor"] if response is not None else 0
+        while self.wait(self.args.poll_interval):
+            response = self.timed(session, "GET /auto_acknowledge", "GET", "/auto_acknowledge", params={"cursor": cursor})
+            if response is not None:
+                data = response.json()
+                self.delivered(data["events"], "poll")
+                cursor = data["cursor"]
+
+    def stream_display(self) -> None:
+        session = self.open_session()
+        while not self.stop.is_set():
+            start = time.perf_counter()
+            try:
+                # The server sends a keep-alive at least every 15 s, so the read timeout only hits dead connections
+                with session.get(self.url + "/auto_acknowledge/stream", stream=True,
+                                 timeout=(self.args.timeout, 30)) as response:
+                    response.raise_for_status()
+                    self.stats.record("GET /auto_acknowledge/stream (connect)", time.perf_counter() - start)
+                    for line in response.iter_lines(decode_unicode=True):
+                        if self.stop.is_set():
+                            return
+                        if line and line.startswith("data: "):
+                            self.delivered([json.loads(line[len("data: "):])], "stream")
+            except requests.exceptions.RequestException:
+                if self.stop.is_set():
+                    return
+                self.stats.record_error("GET /auto_acknowledge/stream (connect)")
+                self.stop.wait(1.0)
+
+    def operator(self) -> None:
+        session = self.open_session()
+        while not self.stop.is_set():
+            if self.args.navigation == "api":
+                self.page_through_api(session)
+            else:
+                self.page_through_html(session)
+
+    def page_through_html(self, session: requests.Session) -> None:
+        step = 1
+        response = self.get_page(session, "/blueprint", params={"blueprint": self.blueprint, "step": 1})
+        while response is not None and "/control" not in response.url and self.wait(self.args.page_interval):
+            # Same round trips as the form: POST, redirect, full page
+            response = self.timed(session, "POST /blueprint", "POST", "/blueprint",
+                                  data={"step": step, "blueprint": self.blueprint, "direction": "next"})
+            if response is None:
+                return
+            step += 1
+            # After the last step /blueprint redirects on to /control, both are timed on their own
+            response = self.get_page(session, location_path(response))
+        if response is not None and self.wait(self.args.page_interval):
+            self.timed(session, "POST /control/exit", "POST", "/control/exit")
+
+    def page_through_api(self, session: requests.Session) -> None:
+        manifest = self.timed(session, "GET /blueprint/api/<blueprint>/manifest", "GET",
+                              f"/blueprint/api/{self.blueprint}/manifest")
+        if manifest is None:
+            self.stop.wait(1.0)
+            return
+        for step in manifest.json()["steps"]:
+            if not self.wait(self.args.page_interval):
+                return
+            self.timed(session, "GET /blueprint/image/<blueprint>/<step>.png", "GET", step["image_url"])
+            self.timed(session, "POST /blueprint/api/<blueprint>/<step>/highlight", "POST",
+                       f"/blueprint/api/{self.blueprint}/{step['step']}/highlight", json={})
+        self.timed(session, "POST /control/exit", "POST", "/control/exit")
+
+
+def seed_inventory(url: str, blueprint: str, timeout: float) -> None:
+    """Put every part of the blueprint into a bin, so highlighting drives the LEDs."""
+    session = requests.Session()
+    session.post(f"{url}/storage_login", data={"password": STORAGE_PASSWORD}, timeout=timeout)
+    manifest = session.get(f"{url}/blueprint/api/{blueprint}/manifest", timeout=timeout).json()
+    location = 0
+    for part in manifest["bill_of_materials"]:
+        if part["location"] is not None:
+            continue
+        session.post(f"{url}/brick_storage", timeout=timeout, data={
+            "color": part["color"], "length": part["length"], "width": part["width"],
+            "location": location, "count": 100000
+        })
+        location += BIN_SPACING
+
+
+def start_local_server(port: int) -> subprocess.Popen:
+    """Run the application with a simulated LED strip and a throwaway inventory."""
+    env = dict(os.environ, ASSYS_SIMULATE_LEDS="1", ASSYS_INVENTORY_PATH=tempfile.mkdtemp(prefix="assys-load-"))
+    server = subprocess.Popen([sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--with-threads"],
+                              cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except requests.exceptions.RequestException:
+            if server.poll() is not None:
+                break
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Local server did not start")
+
+
+def print_summary(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"\n{'Endpoint':<52} {'count':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for name, result in results.items():
+        latencies = [f"{result[key]:>8.1f}" if key in result else f"{'-':>8}" for key in ("p50_ms", "p90_ms", "p99_ms", "max_ms")]
+        print(f"{name:<52} {result['count']:>7} {result['errors']:>5} {result['throughput_per_s']:>8.1f} {' '.join(latencies)}")
+    print("(latencies in ms)")
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Simulate many assembly stations against the server')
+    parser.add_argument('--url', '-u', type=str,
+                        default=os.environ.get('ASSYS_SERVER_URL', 'http://127.0.0.1:5000'),
+                        help='Server URL (default: from ASSYS_SERVER_URL env or http://127.0.0.1:5000)')
+    parser.add_argument('--start-server', type=int, metavar='PORT',
+                        help='Start a local instance with a simulated LED strip on this port and test it')
+    parser.add_argument('--stations', '-n', type=int, default=4,
+                        help='Number of simulated stations (default: 4)')
+    parser.add_argument('--duration', '-d', type=float, default=30.0,
+                        help='Test duration in seconds (default: 30)')
+    parser.add_argument('--blueprint', '-b', type=str, default='blueprint_0',
+                        help='Blueprint the operators build (default: blueprint_0)')
+    parser.add_argument('--display', choices=['stream', 'poll'], default='stream',
+                        help='How displays receive acknowledgments (default: stream)')
+    parser.add_argument('--navigation', choices=['page', 'api'], default='page',
+                        help='Operators page with form posts and full pages, or with the step API (default: page)')
+    parser.add_argument('--ack-interval', type=float, default=2.0,
+                        help='Seconds between gestures per station (default: 2.0)')
+    parser.add_argument('--poll-interval', type=float, default=0.5,
+                        help='Seconds between polls of polling displays (default: 0.5)')
+    parser.add_argument('--page-interval', type=float, default=1.0,
+                        help='Seconds an operator spends on a step (default: 1.0)')
+    parser.add_argument('--timeout', type=float, default=10.0,
+                        help='Request timeout in seconds (default: 10)')
+    parser.add_argument('--seed-inventory', action='store_true',
+                        help='Stock all parts of the blueprint first (always done with --start-server)')
+    parser.add_argument('--output', '-o', type=str,
+                        help='Write the results as JSON to this file')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the load test and report the results."""
+    args = parse_arguments()
+    server = None
+    url = args.url.rstrip('/')
+    if args.start_server:
+        server = start_local_server(args.start_server)
+        url = f"http://127.0.0.1:{args.start_server}"
+
+    # Set before the setup, which can fail before a single request was measured
+    stats = LoadStats()
+    started_at = datetime.now(timezone.utc)
+    duration = 0.0
+    try:
+        if args.seed_inventory or server is not None:
+            seed_inventory(url, args.blueprint, args.timeout)
+
+        stop = threading.Event()
+        stations = [StationSimulator(url, f"load-{index + 1}", args.blueprint, stats, stop, args)
+                    for index in range(args.stations)]
+        threads = [thread for station in stations for thread in station.threads()]
+
+        print(f"Simulating {args.stations} stations against {url} for {args.duration:.0f} s...")
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            stop.wait(args.duration)
+        except KeyboardInterrupt:
+            print("\nStopped early")
+        stop.set()
+        duration = time.perf_counter() - start
+        for thread in threads:
+            thread.join(timeout=2)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if duration <= 0:
+        print("No load was generated")
+        return
+    results = stats.summary(duration)
+    print_summary(results)
+
+    if args.output:
+        report = {
+            "started_at": started_at.isoformat(),
+            "duration_s": round(duration, 2),
+            "url": url,
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "url")},
+            "endpoints": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
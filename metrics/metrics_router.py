@@ -0,0 +1,11 @@
+from flask import Blueprint, Response
+from metrics.registry import MetricsRegistry, REGISTRY
+
+def create_blueprint(registry: MetricsRegistry = REGISTRY) -> Blueprint:
+    blueprint = Blueprint('metrics', __name__)
+
+    @blueprint.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    return blueprint
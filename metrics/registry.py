@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from flask import Blueprint, g, request
+
+ENABLED = os.environ.get('ASSYS_METRICS', '0').lower() in ('1', 'true', 'yes')
+
+# Upper bounds in seconds, from a LED update up to a slow matplotlib render
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """Latency histogram with one series per label combination, rendered in Prometheus text format."""
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # Per series: observations per bucket (the last one is +Inf), sum and count
+        self.series: Dict[LabelKey, List[Any]] = {}
+
+    def observe(self, seconds: float, **labels: str) -> None:
+        """Record one duration."""
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, seconds)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        """Return the exposition lines of all series."""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in sorted(self.series.items())]
+
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, observations in zip(self.buckets + (float("inf"),), counts):
+                cumulative += observations
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{format_labels(key + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(key)} {count}")
+        return lines
+
+
+def format_labels(key: LabelKey) -> str:
+    """Render label pairs as ``{name="value",...}``."""
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in key) + "}"
+
+
+def escape_label_value(value: str) -> str:
+    """Escape backslashes, quotes and line breaks in a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        """All histograms of this process."""
+        self.histograms: Dict[str, Histogram] = {}
+        self.lock = threading.Lock()
+
+    def histogram(self, name: str, description: str) -> Histogram:
+        """Return the histogram with this name, creating it on first use."""
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(name, description)
+            return self.histograms[name]
+
+    def render(self) -> str:
+        """Return all metrics in Prometheus text format."""
+        with self.lock:
+            histograms = [self.histograms[name] for name in sorted(self.histograms)]
+        lines: List[str] = []
+        for histogram in histograms:
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram("assys_request_duration_seconds", "Time spent handling a request per route.")
+RENDER_STAGE_SECONDS = REGISTRY.histogram("assys_render_stage_seconds", "Time spent per blueprint render stage.")
+OPERATION_SECONDS = REGISTRY.histogram("assys_operation_duration_seconds", "Time spent in instrumented operations.")
+
+
+@contextmanager
+def _timer(histogram: Histogram, labels: Dict[str, str]) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+_DISABLED = nullcontext()
+
+
+def stage(histogram: Histogram, **labels: str) -> Any:
+    """Time the enclosed block. Returns a shared no-op context while metrics are disabled."""
+    if not ENABLED:
+        return _DISABLED
+    return _timer(histogram, labels)
+
+
+def timed(operation: str) -> Callable[[Callable], Callable]:
+    """Decorator recording every call of a function as ``operation``. Leaves the function untouched while metrics are disabled."""
+    def decorator(function: Callable) -> Callable:
+        if not ENABLED:
+            return function
+
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                OPERATION_SECONDS.observe(time.perf_counter() - start, operation=operation)
+        return wrapper
+    return decorator
+
+
+def instrument_blueprint(blueprint: Blueprint) -> None:
+    """Record the latency of every route of a blueprint. Does nothing while metrics are disabled."""
+    if not ENABLED:
+        return
+
+    @blueprint.before_request
+    def start_timer() -> None:
+        g.metrics_started_at = time.perf_counter()
+
+    @blueprint.after_request
+    def record_latency(response: Any) -> Any:
+        started_at: Optional[float] = g.pop("metrics_started_at", None)
+        if started_at is not None:
+            # Streamed responses are measured until their first byte
+            REQUEST_SECONDS.observe(time.perf_counter() - started_at, endpoint=request.endpoint or "unknown",
+                                    method=request.method, status=str(response.status_code))
+        return response
@@ -0,0 +1,126 @@
+import math
+import threading
+import time
+from functools import lru_cache
+from typing import Any, List, NamedTuple, Optional, Tuple
+from pick_by_light.color_helper import Color, get_rgb_by_name
+from metrics.registry import OPERATION_SECONDS, stage
+
+GAMMA = 2.2
+PALETTE_LEVELS = 64
+DEFAULT_FPS = 30
+
+PULSE_PERIOD = 1.2   # seconds per pulse
+PULSE_MIN = 0.25     # lowest intensity of a pulse
+BLINK_PERIOD = 0.8   # seconds per on/off cycle
+CHASE_SPEED = 8.0    # pixels per second
+CHASE_TAIL = 0.2     # intensity of the pixels behind the chase head
+
+EFFECTS = ("static", "pulse", "blink", "chase")
+
+
+class Highlight(NamedTuple):
+    """A group of pixels lit in one color with an effect."""
+    pixels: Tuple[int, ...]
+    color_name: str
+    effect: str = "static"
+    brightness: float = 1.0  # share of the full light output, independent of the gamma correction
+
+
+@lru_cache(maxsize=None)
+def build_palette(color_name: str, levels: int = PALETTE_LEVELS, gamma: float = GAMMA) -> Tuple[int, ...]:
+    """Precompute the packed, gamma-corrected colors for every brightness level of a color."""
+    rgb = get_rgb_by_name(color_name)
+    return tuple(
+        Color(*(int(round(channel * (level / (levels - 1)) ** gamma)) for channel in rgb))
+        for level in range(levels)
+    )
+
+
+def effect_intensity(effect: str, t: float, index: int, count: int) -> float:
+    """Return the intensity (0.0 - 1.0) of pixel ``index`` out of ``count`` at time ``t``."""
+    if effect == "pulse":
+        return PULSE_MIN + (1.0 - PULSE_MIN) * (0.5 - 0.5 * math.cos(2 * math.pi * t / PULSE_PERIOD))
+    if effect == "blink":
+        return 1.0 if (t % BLINK_PERIOD) < BLINK_PERIOD / 2 else 0.0
+    if effect == "chase":
+        return 1.0 if int(t * CHASE_SPEED) % count == index else CHASE_TAIL
+    return 1.0
+
+
+class AnimationEngine:
+    def __init__(self, pixels: Any, num_pixels: int, fps: int = DEFAULT_FPS) -> None:
+        """Render highlights onto the LED strip, animating them on a fixed frame rate.
+
+        Static highlights are transmitted once by the caller and the render thread
+        sleeps until something changes. Animated frames are only sent to the strip
+        when at least one pixel differs from the last transmitted frame.
+        """
+        self.pixels = pixels
+        self.num_pixels = num_pixels
+        self.frame_interval = 1.0 / fps
+        self.highlights: List[Highlight] = []
+        self.started_at = time.monotonic()
+        self.frame: List[Optional[int]] = [None] * num_pixels  # None forces a write
+        self.condition = threading.Condition()
+
+        self.thread = threading.Thread(target=self._run, name="led-animation", daemon=True)
+        self.thread.start()
+
+    def show(self, highlights: List[Highlight], force: bool = False) -> None:
+        """Replace all highlights and transmit the first frame right away."""
+        with self.condition:
+            self.highlights = list(highlights)
+            self.started_at = time.monotonic()
+            if force:
+                self.frame = [None] * self.num_pixels
+            self._transmit(self._render(0.0))
+            self.condition.notify()
+
+    def is_animating(self) -> bool:
+        """Return whether any highlight changes over time."""
+        return any(highlight.effect != "static" for highlight in self.highlights)
+
+    def _render(self, t: float) -> List[int]:
+        frame = [0] * self.num_pixels
+        for highlight in self.highlights:
+            palette = build_palette(highlight.color_name)
+            count = len(highlight.pixels)
+            for index, pixel in enumerate(highlight.pixels):
+                # The palette raises levels to GAMMA, so the brightness is taken to its inverse first;
+                # otherwise a dimmed look-ahead bin at 0.12 would end up at 1 % of the light
+                intensity = effect_intensity(highlight.effect, t, index, count) * highlight.brightness ** (1 / GAMMA)
+                frame[pixel] = palette[int(round(intensity * (PALETTE_LEVELS - 1)))]
+        return frame
+
+    def _transmit(self, frame: List[int]) -> None:
+        changed = False
+        for pixel, color in enumerate(frame):
+            if self.frame[pixel] != color:
+                self.pixels.setPixelColor(pixel, color)
+                changed = True
+        if changed:
+            with stage(OPERATION_SECONDS, operation="pixels_show"):
+                self.pixels.show()
+            self.frame = frame
+
+    def _run(self) -> None:
+        next_frame = time.monotonic()
+        with self.condition:
+            while True:
+                if not self.is_animating():
+                    # Nothing moves, sleep until show() hands over new highlights
+                    self.condition.wait()
+                    next_frame = time.monotonic()
+                    continue
+
+                now = time.monotonic()
+                if now < next_frame:
+                    self.condition.wait(next_frame - now)
+                    continue
+
+                self._transmit(self._render(now - self.started_at))
+                next_frame += self.frame_interval
+                if next_frame < now:
+                    # Fell behind, drop the missed frames instead of catching up
+                    next_frame = now + self.frame_interval
@@ -1,33 +1,29 @@
-from rpi_ws281x import Color
+try:
+    from rpi_ws281x import Color
+except ImportError:
+    def Color(red, green, blue, white=0):
+        """Pack the color the same way rpi_ws281x does, for machines without the LED library."""
+        return (white << 24) | (red << 16) | (green << 8) | blue
 
-def get_color_by_name(color_name):
+COLORS = {
+    "red": (255, 0, 0),
+    "green": (0, 255, 0),
+    "blue": (0, 0, 255),
+    "yellow": (255, 255, 0),
+    "purple": (255, 0, 255),
+    "cyan": (0, 255, 255),
+    "white": (255, 255, 255),
+}
+DEFAULT_COLOR = (100, 100, 100)
+
+def get_rgb_by_name(color_name):
     """
-    Returns a Color object based on the given color name.
+    Returns the RGB tuple for the given color name.
 
     Args:
         color_name (str): Name of the color to retrieve
 
     Returns:
-        Color: Color object matching the given name, or a default gray color
-    """
-    if color_name == "red":
-        color = Color(255, 0, 0)
-    elif color_name == "green":
-        color = Color(0, 255, 0)
-    elif color_name == "blue":
-        color = Color(0, 0, 255)
-    elif color_name == "yellow":
-        color = Color(255, 255, 0)
-    elif color_name == "purple":
-        color = Color(255, 0, 255)
-    elif color_name == "cyan":
-        color = Color(0, 255, 255)
-    elif color_name == "white":
-        color = Color(255, 255, 255)
-    else:
-        color = Color(100, 100, 100)
-
-    return color
-    """
-    return None
+        tuple: (red, green, blue) matching the given name, or a default gray
     """
+    return COLORS.get(color_name, DEFAULT_COLOR)
@@ -0,0 +1,193 @@
+import os
+import threading
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, Tuple, Union
+from pick_by_light.pick_by_light_controller import PickByLightController
+from pick_by_light.inventory_store import InventoryStore
+
+Address = Union[str, Tuple[str, int]]
+
+DEFAULT_ADDRESS = "127.0.0.1:5001"
+DEFAULT_AUTHKEY = "assys_controller_12345"  # Für Demo-Zwecke, nur auf localhost
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+# Controller methods the service executes for its clients
+EXPOSED_METHODS = {
+    "add_block_to_location",
+    "get_block_location",
+    "get_block_locations",
+    "show_block",
+    "show_blocks",
+    "get_currently_highlighted_block",
+    "remove_block",
+    "commit_picks",
+    "cleanup",
+}
+
+
+def parse_address(address: str) -> Address:
+    """Turn ``host:port`` into a TCP address, anything else is used as a Unix socket path."""
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def parse_station_controllers(value: str) -> Dict[str, Address]:
+    """Parse ``station=address`` entries separated by commas, for example ``station-2=127.0.0.1:5002``."""
+    mapping: Dict[str, Address] = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        station, separator, address = entry.partition("=")
+        station, address = station.strip(), address.strip()
+        if not separator or not station or not address:
+            raise ValueError(f"Expected STATION=ADDRESS, got '{entry}'")
+        if station in mapping:
+            raise ValueError(f"Station '{station}' is given twice")
+        mapping[station] = parse_address(address)
+    return mapping
+
+
+def controller_authkey(address: Address) -> bytes:
+    """The shared secret from ASSYS_CONTROLLER_AUTHKEY; the demo key is only accepted on this machine."""
+    authkey = os.environ.get('ASSYS_CONTROLLER_AUTHKEY')
+    if authkey:
+        return authkey.encode()
+    if isinstance(address, tuple) and address[0] not in LOCAL_HOSTS:
+        raise ValueError(f"ASSYS_CONTROLLER_AUTHKEY must be set when the controller service is reached at "
+                         f"{address[0]}:{address[1]}, the demo key is only allowed on localhost")
+    return DEFAULT_AUTHKEY.encode()
+
+
+def handle_connection(controller: PickByLightController, connection: Connection) -> None:
+    """Execute the calls of one client until it disconnects."""
+    with connection:
+        while True:
+            try:
+                method, args, kwargs = connection.recv()
+            except (EOFError, OSError):
+                return
+
+            try:
+                if method == "blocks":
+                    result: Any = dict(controller.blocks)
+                elif method in EXPOSED_METHODS:
+                    result = getattr(controller, method)(*args, **kwargs)
+                else:
+                    raise ValueError(f"Method {method} is not available")
+                reply = ("ok", result)
+            except ValueError as e:
+                reply = ("error", str(e))
+            except Exception as e:
+                # A failing call must not take the connection of the web worker with it
+                print(f"❌ Controller call {method} failed: {e!r}")
+                reply = ("error", repr(e))
+
+            try:
+                connection.send(reply)
+            except (EOFError, OSError):
+                return
+            except Exception as e:
+                # The result could not be pickled
+                connection.send(("error", repr(e)))
+
+
+def serve(controller: PickByLightController, address: Address, authkey: bytes) -> None:
+    """Own the LED strip and inventory and serve them to the web worker processes."""
+    with Listener(address, authkey=authkey) as listener:
+        print(f"Pick-by-light controller listening on {address}")
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception as e:
+                print(f"Rejected controller client: {e}")
+                continue
+            threading.Thread(target=handle_connection, args=(controller, connection), daemon=True).start()
+
+
+class ControllerClient:
+    def __init__(self, address: Address, authkey: bytes) -> None:
+        """Stand-in for PickByLightController that forwards every call to the process owning the LED strip.
+
+        Every thread keeps its own connection, so concurrent requests do not wait for each other here.
+        """
+        self.address = address
+        self.authkey = authkey
+        self.local = threading.local()
+
+    @property
+    def blocks(self) -> Dict[int, Tuple[str, float, float, int]]:
+        return self._call("blocks")
+
+    def add_block_to_location(self, *args: Any, **kwargs: Any) -> None:
+        return self._call("add_block_to_location", *args, **kwargs)
+
+    def get_block_location(self, *args: Any, **kwargs: Any) -> Any:
+        return self._call("get_block_location", *args, **kwargs)
+
+    def get_block_locations(self, *args: Any, **kwargs: Any) -> Any:
+        return self._call("get_block_locations", *args, **kwargs)
+
+    def show_block(self, *args: Any, **kwargs: Any) -> None:
+        return self._call("show_block", *args, **kwargs)
+
+    def show_blocks(self, *args: Any, **kwargs: Any) -> Dict[int, int]:
+        return self._call("show_blocks", *args, **kwargs)
+
+    def get_currently_highlighted_block(self) -> Any:
+        return self._call("get_currently_highlighted_block")
+
+    def remove_block(self, *args: Any, **kwargs: Any) -> None:
+        return self._call("remove_block", *args, **kwargs)
+
+    def commit_picks(self, *args: Any, **kwargs: Any) -> Dict[int, int]:
+        return self._call("commit_picks", *args, **kwargs)
+
+    def cleanup(self) -> None:
+        return self._call("cleanup")
+
+    def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        try:
+            status, result = self._request(method, args, kwargs)
+        except (EOFError, OSError):
+            # The service may have been restarted, try once more on a fresh connection
+            self.local.connection = None
+            status, result = self._request(method, args, kwargs)
+
+        if status == "error":
+            raise ValueError(result)
+        return result
+
+    def _request(self, method: str, args: Any, kwargs: Any) -> Tuple[str, Any]:
+        connection = getattr(self.local, "connection", None)
+        if connection is None or getattr(self.local, "pid", None) != os.getpid():
+            connection = Client(self.address, authkey=self.authkey)
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        connection.send((method, args, kwargs))
+        return connection.recv()
+
+
+def main() -> None:
+    """Run the controller service with the configuration from the environment."""
+    controller = PickByLightController(
+        led_pin=int(os.environ.get('ASSYS_LED_PIN', '12')),
+        store=InventoryStore(os.environ.get('ASSYS_INVENTORY_PATH', 'inventory')),
+        highlight_effect=os.environ.get('ASSYS_HIGHLIGHT_EFFECT', 'static'),
+        simulate=os.environ.get('ASSYS_SIMULATE_LEDS', '0').lower() in ('1', 'true', 'yes')
+    )
+    address = parse_address(os.environ.get('ASSYS_CONTROLLER_ADDRESS', DEFAULT_ADDRESS))
+    try:
+        authkey = controller_authkey(address)
+    except ValueError as e:
+        controller.cleanup()
+        raise SystemExit(f"❌ {e}") from None
+    try:
+        serve(controller, address, authkey)
+    finally:
+        controller.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import json
+import os
+from typing import Dict, Optional, Tuple, Any
+
+Block = Tuple[str, float, float, int]  # color, length, width, count
+
+SNAPSHOT_FILE = "snapshot.json"
+LOG_FILE = "inventory.log"
+
+
+class InventoryStore:
+    def __init__(self, path: str, snapshot_interval: int = 500, sync: bool = False) -> None:
+        """Durable inventory backed by a snapshot and an append-only write-ahead log.
+
+        Every change is appended to the log as one JSON line holding the new state of
+        the touched locations. After ``snapshot_interval`` records the full inventory
+        is written to a snapshot and the log is truncated, so recovery only ever
+        replays a bounded log tail. ``sync`` additionally fsyncs every record, which
+        survives power loss at the cost of a slower pick on SD cards.
+        """
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.sync = sync
+        self.snapshot_path = os.path.join(path, SNAPSHOT_FILE)
+        self.log_path = os.path.join(path, LOG_FILE)
+        self.seq = 0
+        self.records_since_snapshot = 0
+        self.blocks: Dict[int, Block] = {}
+        self.log_file: Optional[Any] = None
+
+        os.makedirs(path, exist_ok=True)
+
+    def load(self) -> Dict[int, Block]:
+        """Recover the inventory from the latest snapshot plus the log tail."""
+        self.blocks = {}
+        self.seq = 0
+
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r") as file:
+                snapshot = json.load(file)
+            self.seq = snapshot["seq"]
+            self.blocks = {int(location): tuple(block) for location, block in snapshot["blocks"].items()}
+
+        self.records_since_snapshot = 0
+        valid_length = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn write from a crash, everything after it is lost anyway
+                        break
+                    valid_length += len(line)
+                    if record["seq"] <= self.seq:
+                        continue
+                    self._apply(record["changes"])
+                    self.seq = record["seq"]
+                    self.records_since_snapshot += 1
+
+        self.log_file = open(self.log_path, "a")
+        # Cut off a torn tail so new records do not get glued onto it
+        self.log_file.truncate(valid_length)
+        return dict(self.blocks)
+
+    def record(self, changes: Dict[int, Optional[Block]]) -> None:
+        """Append the new state of the given locations (None = removed) to the log."""
+        if not changes:
+            return
+        if self.log_file is None:
+            raise RuntimeError("Inventory store has not been loaded")
+
+        self.seq += 1
+        self._apply(changes)
+        record = {"seq": self.seq, "changes": [[location, block] for location, block in changes.items()]}
+        self.log_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.log_file.flush()
+        if self.sync:
+            os.fsync(self.log_file.fileno())
+
+        self.records_since_snapshot += 1
+        if self.records_since_snapshot >= self.snapshot_interval:
+            self.snapshot()
+
+    def snapshot(self) -> None:
+        """Write the full inventory to a new snapshot and truncate the log."""
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"seq": self.seq, "blocks": self.blocks}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # Records up to seq are covered by the snapshot now
+        if self.log_file is not None:
+            self.log_file.close()
+        self.log_file = open(self.log_path, "w")
+        self.records_since_snapshot = 0
+
+    def close(self) -> None:
+        """Flush and close the log file."""
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+    def _apply(self, changes: Any) -> None:
+        items = changes.items() if isinstance(changes, dict) else changes
+        for location, block in items:
+            if block is None:
+                self.blocks.pop(int(location), None)
+            else:
+                self.blocks[int(location)] = tuple(block)
@@ -1,14 +1,48 @@
-from rpi_ws281x import PixelStrip
-from typing import Dict, Optional, Any, Tuple
-from pick_by_light.color_helper import get_color_by_name
+import threading
+from typing import Dict, List, Optional, Any, Tuple
+from pick_by_light.animation import AnimationEngine, Highlight, EFFECTS
+from pick_by_light.inventory_store import InventoryStore
+from pick_by_light.simulated_strip import SimulatedPixelStrip
+from metrics.registry import timed
+
+LOOK_AHEAD_FALLOFF = 0.45          # Light output of a look-ahead bin relative to the one before it
+MIN_LOOK_AHEAD_BRIGHTNESS = 0.03   # Dimmer bins are hard to tell from unlit ones
+
+def look_ahead_brightness(order: int) -> float:
+    """Light output of the bin at position ``order`` of the look-ahead, one level less per position.
+
+    The current step (0) is always the brightest; up to the fifth bin every one is dimmer than the last.
+    """
+    return max(LOOK_AHEAD_FALLOFF ** order, MIN_LOOK_AHEAD_BRIGHTNESS)
+
+def load_pixel_strip_class() -> Any:
+    """Return rpi_ws281x's PixelStrip, or the simulated strip where the library is missing."""
+    try:
+        from rpi_ws281x import PixelStrip
+        return PixelStrip
+    except ImportError:
+        print("rpi_ws281x ist nicht installiert, der LED-Streifen wird simuliert")
+        return SimulatedPixelStrip
 
 class PickByLightController:
-    def __init__(self, led_pin: int = 12, num_pixels: int = 26) -> None:
-        """Initialize the light controller with the GPIO pin for the LED strip."""
+    def __init__(self, led_pin: int = 12, num_pixels: int = 26, store: Optional[InventoryStore] = None,
+                 highlight_effect: str = "static", simulate: bool = False) -> None:
+        """Initialize the light controller with the GPIO pin for the LED strip.
+
+        With ``simulate`` the strip is only kept in memory, which is also the fallback
+        when the rpi_ws281x library is not installed.
+        """
+        if highlight_effect not in EFFECTS:
+            raise ValueError(f"Unknown highlight effect {highlight_effect}, expected one of {EFFECTS}")
         self.led_pin = led_pin
+        self.highlight_effect = highlight_effect
         self.num_pixels = num_pixels
+        self.store = store
         self.blocks: Dict[int, Tuple[str, float, float, int]] = {} # location (key), color, length, width, count
+        if self.store is not None:
+            self.blocks = self.store.load()
         self.currently_highlighted: Optional[Any] = None
+        self.lock = threading.Lock()
 
         LED_FREQ_HZ = 800000  # LED signal frequency in hertz (usually 800khz)
         LED_DMA = 10          # DMA channel to use for generating signal (try 10)
@@ -16,24 +50,28 @@ class PickByLightController:
         LED_INVERT = False    # True to invert the signal (when using NPN transistor level shift)
         LED_CHANNEL = 0       # set to '1' for GPIOs 13, 19, 41, 45 or 53
 
-        self.pixels = PixelStrip(self.num_pixels, self.led_pin, LED_FREQ_HZ, LED_DMA, LED_INVERT,
+        strip_class = SimulatedPixelStrip if simulate else load_pixel_strip_class()
+        self.pixels = strip_class(self.num_pixels, self.led_pin, LED_FREQ_HZ, LED_DMA, LED_INVERT,
                               LED_BRIGHTNESS, LED_CHANNEL)
         self.pixels.begin()
+        self.animation = AnimationEngine(self.pixels, self.num_pixels)
 
         self.cleanup()
 
     def add_block_to_location(self, location: Any, length: float, width: float, color: str, count: int = 1) -> None:
         """Add a block to a specific location with its properties."""
-        if location in self.blocks:
-            raise ValueError(f"Block already exists at location {location}.")
-        if location + 2 >= self.num_pixels or location < 0:
-            raise ValueError(f"Location {location} is out of range.")
-
         # Make sure length is always longer than width
         if length > width:
             length, width = width, length
 
-        self.blocks[location] = (color, length, width, count)
+        with self.lock:
+            # Checked under the lock, so two requests cannot both claim the same location
+            if location in self.blocks:
+                raise ValueError(f"Block already exists at location {location}.")
+            if location + 2 >= self.num_pixels or location < 0:
+                raise ValueError(f"Location {location} is out of range.")
+            self.blocks[location] = (color, length, width, count)
+            self._persist({location: self.blocks[location]})
 
     def get_block_location(self, length: float, width: float, color: str) -> Optional[int]:
         """Get the location of a block with the specified properties."""
@@ -46,22 +84,48 @@ class PickByLightController:
                 return location
         return None
 
+    def get_block_locations(self, parts: List[Tuple[float, float, str]]) -> List[Optional[int]]:
+        """Get the locations of several blocks given as (length, width, color) in one call."""
+        return [self.get_block_location(length, width, color) for length, width, color in parts]
+
+    @timed("show_block")
     def show_block(self, location: int) -> None:
         """Highlight the block at the specified location by turning on the LED."""
         if location not in self.blocks:
             raise ValueError(f"No block found at location {location}")
 
         color_name = self.blocks[location][0]  # Color is the first element in the tuple
-        color = get_color_by_name(color_name)
 
-        self.cleanup()
         # Turn on 3 consecutive LEDs
-        self.pixels.setPixelColor(location, color)
-        self.pixels.setPixelColor(location + 1, color)
-        self.pixels.setPixelColor(location + 2, color)
-        self.pixels.show()
+        self.animation.show([self._highlight(location, color_name, self.highlight_effect)])
         self.currently_highlighted = location
 
+    @timed("show_blocks")
+    def show_blocks(self, locations: List[int]) -> Dict[int, int]:
+        """Highlight the blocks of several upcoming steps at once.
+
+        ``locations`` is ordered by step. Each bin is lit in the brightness of the
+        earliest step that uses it, and the number of picks per bin is returned.
+        Only the current step's bin is animated.
+        """
+        picks: Dict[int, int] = {}
+        for location in locations:
+            if location not in self.blocks:
+                raise ValueError(f"No block found at location {location}")
+            picks[location] = picks.get(location, 0) + 1
+
+        highlights = []
+        for order, location in enumerate(picks):
+            effect = self.highlight_effect if order == 0 else "static"
+            highlights.append(self._highlight(location, self.blocks[location][0], effect, look_ahead_brightness(order)))
+        self.animation.show(highlights)
+        self.currently_highlighted = locations[0] if locations else None
+        return picks
+
+    def _highlight(self, location: int, color_name: str, effect: str, brightness: float = 1.0) -> Highlight:
+        """Build the highlight covering the 3 LEDs of a bin."""
+        return Highlight((location, location + 1, location + 2), color_name, effect, brightness)
+
     def get_currently_highlighted_block(self) -> Optional[int]:
         """Return the location of the currently highlighted block."""
         if not self.currently_highlighted:
@@ -70,25 +134,68 @@ class PickByLightController:
 
     def remove_block(self, location: Any, count: int = 1) -> None:
         """Remove a highlighted block from the specified location."""
-        if location not in self.blocks:
-            raise ValueError(f"No block found at location {location}")
-
-        color, length, width, current_count = self.blocks[location]
-
-        if count < 0 or count >= current_count:
-            del self.blocks[location]
-
-            if self.currently_highlighted == location:
-                self.currently_highlighted = None
-        else:
-            new_count = current_count - count
-            self.blocks[location] = (color, length, width, new_count)
+        with self.lock:
+            if location not in self.blocks:
+                raise ValueError(f"No block found at location {location}")
+
+            color, length, width, current_count = self.blocks[location]
+
+            if count < 0 or count >= current_count:
+                del self.blocks[location]
+
+                if self.currently_highlighted == location:
+                    self.currently_highlighted = None
+                self._persist({location: None})
+            else:
+                new_count = current_count - count
+                self.blocks[location] = (color, length, width, new_count)
+                self._persist({location: self.blocks[location]})
+
+    def commit_picks(self, picks: Dict[int, int], allow_shortage: bool = False) -> Dict[int, int]:
+        """Remove the picked blocks of a whole build in one transaction.
+
+        All picks are validated before anything changes, and the missing units per
+        location are returned. If there is a shortage nothing is removed, unless
+        ``allow_shortage`` is set, in which case short locations are emptied.
+        """
+        if any(count < 0 for count in picks.values()):
+            raise ValueError("Pick counts must not be negative")
+
+        with self.lock:
+            shortages: Dict[int, int] = {}
+            for location, count in picks.items():
+                available = self.blocks[location][3] if location in self.blocks else 0
+                if count > available:
+                    shortages[location] = count - available
+
+            if shortages and not allow_shortage:
+                return shortages
+
+            changes: Dict[int, Optional[Tuple[str, float, float, int]]] = {}
+            for location, count in picks.items():
+                if count == 0 or location not in self.blocks:
+                    continue
+                color, length, width, current_count = self.blocks[location]
+                if count >= current_count:
+                    del self.blocks[location]
+                    changes[location] = None
+                    if self.currently_highlighted == location:
+                        self.currently_highlighted = None
+                else:
+                    self.blocks[location] = (color, length, width, current_count - count)
+                    changes[location] = self.blocks[location]
+
+            self._persist(changes)
+            return shortages
+
+    def _persist(self, changes: Dict[int, Optional[Tuple[str, float, float, int]]]) -> None:
+        """Write inventory changes to the store, if one is configured."""
+        if self.store is not None:
+            self.store.record(changes)
 
     def cleanup(self) -> None:
         """Clean up resources when done."""
-        for i in range(self.num_pixels):
-            self.pixels.setPixelColor(i, 0)
-        self.pixels.show()
+        self.animation.show([], force=True)
 
 
 if __name__ == "__main__":
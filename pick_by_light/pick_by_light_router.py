@@ -1,8 +1,10 @@
 from flask import Blueprint, render_template, redirect, url_for, request, session, flash
 from pick_by_light.pick_by_light_controller import PickByLightController
+from metrics.registry import instrument_blueprint
 
 def create_blueprint(pick_by_light_controller: PickByLightController) -> Blueprint:
     blueprint = Blueprint('pick_by_light', __name__)
+    instrument_blueprint(blueprint)
 
     @blueprint.route('/storage_login', methods=['GET', 'POST'])
     def storage_login():
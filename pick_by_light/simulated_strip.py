@@ -0,0 +1,42 @@
+import time
+from typing import List
+
+RESET_SECONDS = 50e-6  # Low time that latches the data into the LEDs
+BITS_PER_PIXEL = 24
+
+
+class SimulatedPixelStrip:
+    def __init__(self, num: int, pin: int, freq_hz: int = 800000, dma: int = 10, invert: bool = False,
+                 brightness: int = 255, channel: int = 0) -> None:
+        """Stand-in for rpi_ws281x.PixelStrip on machines without an LED strip.
+
+        Keeps the pixels in memory and blocks in ``show()`` as long as the real strip
+        needs to transmit a frame, so timings measured against it stay realistic.
+        """
+        self.num = num
+        self.pin = pin
+        self.brightness = brightness
+        self.pixels: List[int] = [0] * num
+        self.shown: List[int] = [0] * num  # Colors the strip would display right now
+        self.show_count = 0
+        self.transmit_seconds = num * BITS_PER_PIXEL / freq_hz + RESET_SECONDS
+
+    def begin(self) -> None:
+        pass
+
+    def numPixels(self) -> int:
+        return self.num
+
+    def setPixelColor(self, n: int, color: int) -> None:
+        self.pixels[n] = color
+
+    def getPixelColor(self, n: int) -> int:
+        return self.pixels[n]
+
+    def setBrightness(self, brightness: int) -> None:
+        self.brightness = brightness
+
+    def show(self) -> None:
+        time.sleep(self.transmit_seconds)
+        self.shown = list(self.pixels)
+        self.show_count += 1
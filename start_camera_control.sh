@@ -22,7 +22,7 @@ echo ""
 echo "Server URL: $ASSYS_SERVER_URL"
 echo ""
 echo "Swipe gestures: Right->Left = Next, Left->Right = Back"
-echo "Press 'q' in the camera window or Ctrl+C to stop"
+echo "Press 'q' in the camera window or Ctrl+C to stop (--headless: Ctrl+C)"
 echo "====================================================="
 
 # Check dependencies
@@ -36,16 +36,21 @@ if [ "$REQUIREMENTS_OK" = false ]; then
     .venv/bin/pip install opencv-python mediapipe requests
 fi
 
-# Use camera device 0 by default
-CAMERA_ARG="--camera 0"
-echo "Using camera device: 0"
-
 # Start the camera recognition script
 cd "$(dirname "$0")"
 export ASSYS_SERVER_URL
 
 # Pass any additional arguments from the command line
-.venv/bin/python3 auto_acknowledge_camera.py $CAMERA_ARG "$@"
+if [ -n "$ASSYS_CAMERAS" ]; then
+    # Several stations on this machine, one worker per camera
+    echo "Using cameras: $ASSYS_CAMERAS"
+    .venv/bin/python3 gesture_service.py "$@"
+else
+    # Use camera device 0 by default
+    CAMERA_ARG="--camera 0"
+    echo "Using camera device: 0"
+    .venv/bin/python3 auto_acknowledge_camera.py $CAMERA_ARG "$@"
+fi
 
 # Exit gracefully
 echo ""
@@ -7,6 +7,8 @@
 # export SPEECH_ENERGY_THRESHOLD="3000"
 # export SPEECH_PAUSE_THRESHOLD="0.8"
 # export SPEECH_COOLDOWN="2.0"
+# export SPEECH_BACKEND="auto"
+# export SPEECH_MODEL_PATH="models/vosk-model-small-de-0.15"
 # export SPEECH_NEXT_WORDS="next,weiter,continue,nächste,fertig,ok"
 # export SPEECH_BACK_WORDS="back,zurück,previous,vorherige,rückgängig,undo"
 
@@ -20,7 +22,7 @@ if [ ! -d ".venv" ]; then
 
     # Install required packages
     echo "Installing required packages..."
-    pip install SpeechRecognition requests pyaudio
+    pip install SpeechRecognition requests pyaudio vosk
 else
     # Activate virtual environment
     source .venv/bin/activate
@@ -40,6 +42,7 @@ echo "Starting keyword recognition service..."
 echo "Energy threshold: ${SPEECH_ENERGY_THRESHOLD:-3000}"
 echo "Pause threshold: ${SPEECH_PAUSE_THRESHOLD:-0.8}"
 echo "Cooldown period: ${SPEECH_COOLDOWN:-2.0}"
+echo "Backend: ${SPEECH_BACKEND:-auto} (model: ${SPEECH_MODEL_PATH:-models/vosk-model-small-de-0.15})"
 echo "Next words: ${SPEECH_NEXT_WORDS:-next,weiter,continue,nächste,fertig,ok}"
 echo "Back words: ${SPEECH_BACK_WORDS:-back,zurück,previous,vorherige,rückgängig,undo}"
 
@@ -30,10 +30,10 @@ def test_connection(url: str, endpoint: str = "/auto_acknowledge", verbose: bool
             print(f"Connection error: {e}")
         return False
 
-def send_gesture(url: str, direction: str = "next", verbose: bool = False) -> Optional[Dict[str, Any]]:
+def send_gesture(url: str, direction: str = "next", verbose: bool = False, station: str = "default") -> Optional[Dict[str, Any]]:
     """Send a gesture request to the auto_acknowledge endpoint."""
     full_url = f"{url}/auto_acknowledge"
-    payload = {"type": "gesture", "direction": direction}
+    payload = {"type": "gesture", "direction": direction, "station": station}
     headers = {"Content-Type": "application/json"}
     
     if verbose:
@@ -63,6 +63,8 @@ def main() -> None:
                         help='Server URL (default: from ASSYS_SERVER_URL env or http://192.168.178.130:5000)')
     parser.add_argument('--direction', '-d', type=str, choices=['next', 'back'], default='next',
                         help='Direction to send (default: next)')
+    parser.add_argument('--station', '-s', type=str, default=os.environ.get('ASSYS_STATION_ID', 'default'),
+                        help='Station to send the gesture to (default: from ASSYS_STATION_ID env or "default")')
     parser.add_argument('--verbose', '-v', action='store_true',
                         help='Verbose output')
     parser.add_argument('--test-only', '-t', action='store_true',
@@ -89,7 +91,7 @@ def main() -> None:
     
     # Send the gesture
     print(f"\nSending {args.direction} gesture...")
-    result = send_gesture(args.url, args.direction, verbose=args.verbose)
+    result = send_gesture(args.url, args.direction, verbose=args.verbose, station=args.station)
     
     if result:
         print(f"\n✅ Gesture sent successfully!")
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from camera_capture import MotionGate
+
+
+def write_clip(path: str, frames, fps: float = 30.0) -> None:
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+
+def gated_frames(path: str, gate: MotionGate):
+    """Run the gate over a video the way gesture_replay does, on video time."""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    decisions = []
+    index = 0
+    while True:
+        success, image = cap.read()
+        if not success:
+            break
+        decisions.append(gate.should_infer(image, index / fps))
+        index += 1
+    cap.release()
+    return decisions
+
+
+class MotionGateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "clip.avi")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_static_clip_is_gated_after_hold(self):
+        frame = np.full((240, 320, 3), 90, np.uint8)
+        write_clip(self.path, [frame] * 300)
+
+        decisions = gated_frames(self.path, MotionGate(threshold=0.01, hold_seconds=1.5))
+
+        self.assertEqual(len(decisions), 300)
+        self.assertTrue(all(decisions[:45]))
+        self.assertFalse(any(decisions[46:]))
+
+    def test_motion_reopens_gate(self):
+        frame = np.full((240, 320, 3), 90, np.uint8)
+        moved = frame.copy()
+        cv2.rectangle(moved, (100, 80), (220, 200), (255, 255, 255), -1)
+        write_clip(self.path, [frame] * 150 + [moved] + [moved] * 149)
+
+        decisions = gated_frames(self.path, MotionGate(threshold=0.01, hold_seconds=1.5))
+
+        self.assertFalse(decisions[149])
+        self.assertTrue(all(decisions[150:195]))
+        self.assertFalse(any(decisions[196:]))
+
+    def test_video_time_does_not_make_idle(self):
+        gate = MotionGate(threshold=0.01, idle_after=30.0)
+        self.assertFalse(gate.is_idle(0.0))
+        gate.should_infer(np.zeros((240, 320, 3), np.uint8), 5.0)
+        self.assertFalse(gate.is_idle(34.0))
+        self.assertTrue(gate.is_idle(35.0))
+
+
+if __name__ == "__main__":
+    unittest.main()